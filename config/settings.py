@@ -55,7 +55,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.ReplicaReadMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -96,11 +98,66 @@ DATABASES = {
     'USER': os.environ.get('POSTGRES_USER'),
     'PASSWORD': os.environ.get('POSTGRES_PASSWORD'),
     'HOST': os.environ.get('POSTGRES_HOST'),
-    'PORT': '5432',
+    'PORT': os.environ.get('POSTGRES_PORT', '5432'),
     'OPTIONS': {'sslmode': 'require'},
   }
 }
 
+# Connection reuse, see DATABASE_POOL_MODE:
+#   'persistent' keeps one health-checked connection per worker thread, so a
+#                warm lambda skips the TCP and TLS handshake per request;
+#   'pgbouncer'  does the same against PgBouncer in transaction pooling mode,
+#                where server-side cursors cannot outlive a transaction;
+#   'off'        opens a new connection per request.
+DATABASE_POOL_MODE = os.environ.get('DATABASE_POOL_MODE', 'persistent')
+if DATABASE_POOL_MODE == 'off':
+    DATABASES['default']['CONN_MAX_AGE'] = 0
+else:
+    DATABASES['default']['CONN_MAX_AGE'] = int(
+        os.environ.get('POSTGRES_CONN_MAX_AGE', 60)
+    )
+    DATABASES['default']['CONN_HEALTH_CHECKS'] = True
+if DATABASE_POOL_MODE == 'pgbouncer':
+    DATABASES['default']['DISABLE_SERVER_SIDE_CURSORS'] = True
+
+# Read replicas: one alias per host in POSTGRES_REPLICA_HOSTS. Safe requests
+# read from them, see core.routers and core.middleware.
+DATABASE_REPLICAS = []
+for index, host in enumerate(
+    filter(None, os.environ.get('POSTGRES_REPLICA_HOSTS', '').split(',')),
+    start=1,
+):
+    alias = f'replica_{index}'
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        'HOST': host.strip(),
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['core.routers.PrimaryReplicaRouter']
+DATABASE_REPLICA_PIN_SECONDS = int(
+    os.environ.get('DATABASE_REPLICA_PIN_SECONDS', 5)
+)
+
+
+# Caches
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ.get('REDIS_URL'),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -120,6 +177,39 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Password hashing
+# https://docs.djangoproject.com/en/4.2/topics/auth/passwords/
+# PASSWORD_HASHER picks the hasher for new passwords. The other hashers
+# still verify existing hashes, which are rehashed with the chosen hasher
+# and parameters on the tenant's next login.
+
+PASSWORD_HASHER = os.environ.get('PASSWORD_HASHER', 'pbkdf2')
+PASSWORD_HASHER_PARAMS = {
+    'argon2': {
+        'time_cost': int(os.environ.get('ARGON2_TIME_COST', 2)),
+        'memory_cost': int(os.environ.get('ARGON2_MEMORY_COST', 19456)),
+        'parallelism': int(os.environ.get('ARGON2_PARALLELISM', 1)),
+    },
+    'scrypt': {
+        'work_factor': int(os.environ.get('SCRYPT_WORK_FACTOR', 2 ** 14)),
+        'block_size': int(os.environ.get('SCRYPT_BLOCK_SIZE', 8)),
+        'parallelism': int(os.environ.get('SCRYPT_PARALLELISM', 1)),
+    },
+}
+PASSWORD_HASHER_CHOICES = {
+    'pbkdf2': 'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'argon2': 'core.hashers.TunedArgon2PasswordHasher',
+    'scrypt': 'core.hashers.TunedScryptPasswordHasher',
+}
+PASSWORD_HASHERS = [
+    PASSWORD_HASHER_CHOICES[PASSWORD_HASHER],
+    *(
+        path for name, path in PASSWORD_HASHER_CHOICES.items()
+        if name != PASSWORD_HASHER
+    ),
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+]
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/4.2/topics/i18n/
@@ -147,8 +237,159 @@ AUTH_USER_MODEL = 'core.User'
 
 REST_FRAMEWORK = {
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
+    'DEFAULT_THROTTLE_CLASSES': ['core.throttling.TenantRateThrottle'],
+}
+
+# Per-tenant token bucket throttles, see core.throttling. Rates are
+# '<requests>/<period>' per view scope and tenant tier: buckets hold that
+# many requests and refill completely once per period.
+API_THROTTLE = {
+    'ALIAS': 'default',
+    'LEASE_FRACTION': float(os.environ.get('API_THROTTLE_LEASE_FRACTION', 0.05)),
+    'LEASE_TTL': float(os.environ.get('API_THROTTLE_LEASE_TTL', 1)),
+    'RATES': {
+        'items': {
+            'free': '600/min',
+            'standard': '3000/min',
+            'premium': '30000/min',
+        },
+        'tenants': {
+            'free': '60/min',
+            'standard': '300/min',
+            'premium': '3000/min',
+        },
+        'login': {
+            'anonymous': '30/min',
+        },
+        # Opening item event streams, which reconnect every MAX_AGE.
+        'events': {
+            'free': '30/min',
+            'standard': '120/min',
+            'premium': '600/min',
+        },
+    },
+}
+
+# Cache of serialized item responses, see items.cache
+ITEMS_RESPONSE_CACHE = {
+    'ALIAS': 'default',
+    'TIMEOUT': int(os.environ.get('ITEMS_RESPONSE_CACHE_TIMEOUT', 300)),
+    'LOCK_TIMEOUT': 10,
+    'WAIT': 2,
+}
+
+# In-process cache of authenticated API tokens, see core.authentication
+TOKEN_AUTH_CACHE = {
+    'MAX_SIZE': int(os.environ.get('TOKEN_AUTH_CACHE_SIZE', 10000)),
+    'TIMEOUT': int(os.environ.get('TOKEN_AUTH_CACHE_TIMEOUT', 60)),
+}
+
+# API token lifetime and rotation, see core.models.AuthToken. Revocations
+# reach other processes within REVOCATION_REFRESH seconds.
+AUTH_TOKEN = {
+    'LIFETIME': int(os.environ.get('AUTH_TOKEN_LIFETIME', 7 * 24 * 3600)),
+    'ROTATE_AFTER': int(os.environ.get('AUTH_TOKEN_ROTATE_AFTER', 24 * 3600)),
+    'REVOCATION_REFRESH': int(
+        os.environ.get('AUTH_TOKEN_REVOCATION_REFRESH', 5)
+    ),
+    'PURGE_BATCH_SIZE': int(os.environ.get('AUTH_TOKEN_PURGE_BATCH_SIZE', 1000)),
 }
 
+# Per-request metrics, see core.metrics. When METRICS_TOKEN is set the
+# /metrics endpoint requires it as a bearer token; without it, /metrics is
+# only served with DEBUG on or to the addresses listed in INTERNAL_IPS.
+INTERNAL_IPS = [ip for ip in os.environ.get('INTERNAL_IPS', '').split(',') if ip]
+
+REQUEST_METRICS = {
+    'ENABLED': os.environ.get('REQUEST_METRICS', '1') == '1',
+    'TOKEN': os.environ.get('METRICS_TOKEN', ''),
+}
+
+# Batched purge of deactivated tenants, see core.purge
+TENANT_PURGE = {
+    'BATCH_SIZE': int(os.environ.get('TENANT_PURGE_BATCH_SIZE', 1000)),
+    'PAUSE': float(os.environ.get('TENANT_PURGE_PAUSE', 0.1)),
+}
+
+# Optional partitioning of the item table on PostgreSQL, see
+# core.partitioning: '' keeps one table, 'hash' splits it into PARTITIONS
+# tables by tenant, 'range' into monthly created_at partitions created
+# PREMAKE months ahead. Applied by migrating or `manage.py partition_items`.
+ITEMS_PARTITIONING = {
+    'METHOD': os.environ.get('ITEMS_PARTITIONING', ''),
+    'PARTITIONS': int(os.environ.get('ITEMS_PARTITIONS', 16)),
+    'PREMAKE': int(os.environ.get('ITEMS_PARTITIONS_PREMAKE', 3)),
+    'BATCH_SIZE': int(os.environ.get('ITEMS_PARTITIONING_BATCH_SIZE', 5000)),
+    'PAUSE': float(os.environ.get('ITEMS_PARTITIONING_PAUSE', 0)),
+    'LOCK_TIMEOUT': float(os.environ.get('ITEMS_PARTITIONING_LOCK_TIMEOUT', 5)),
+}
+
+# Background tasks, see core.tasks. Failed tasks are retried after
+# RETRY_DELAY seconds, doubling per attempt; tasks running longer than
+# TIMEOUT seconds are assumed lost with their worker and run again.
+TASKS = {
+    'BACKEND': os.environ.get('TASKS_BACKEND', 'core.tasks.DatabaseBackend'),
+    'MAX_ATTEMPTS': int(os.environ.get('TASKS_MAX_ATTEMPTS', 5)),
+    'RETRY_DELAY': float(os.environ.get('TASKS_RETRY_DELAY', 10)),
+    'RETRY_MAX_DELAY': float(os.environ.get('TASKS_RETRY_MAX_DELAY', 3600)),
+    'TIMEOUT': int(os.environ.get('TASKS_TIMEOUT', 3600)),
+    'BATCH_SIZE': int(os.environ.get('TASKS_BATCH_SIZE', 10)),
+    'POLL_INTERVAL': float(os.environ.get('TASKS_POLL_INTERVAL', 1)),
+}
+
+# Publish/subscribe between API processes, see core.pubsub. The in-memory
+# backend only reaches subscribers of the publishing process.
+PUBSUB = {
+    'BACKEND': os.environ.get('PUBSUB_BACKEND', 'core.pubsub.PostgresBackend'),
+    'CHANNEL': os.environ.get('PUBSUB_CHANNEL', 'api_events'),
+    'RECONNECT_DELAY': 5,
+}
+
+# Server-sent events of item changes, see items.events. Only served by
+# the ASGI application.
+ITEMS_EVENTS = {
+    'PATH': '/api/items/events/',
+    'HEARTBEAT': int(os.environ.get('ITEMS_EVENTS_HEARTBEAT', 15)),
+    'MAX_AGE': int(os.environ.get('ITEMS_EVENTS_MAX_AGE', 300)),
+    'RETRY': int(os.environ.get('ITEMS_EVENTS_RETRY', 3)),
+    'MAX_CONNECTIONS': int(os.environ.get('ITEMS_EVENTS_MAX_CONNECTIONS', 10000)),
+    'MAX_TENANT_CONNECTIONS': int(
+        os.environ.get('ITEMS_EVENTS_MAX_TENANT_CONNECTIONS', 100)
+    ),
+}
+
+# Limits of the bulk item endpoint, see items.bulk
+ITEMS_BULK_BATCH_SIZE = int(os.environ.get('ITEMS_BULK_BATCH_SIZE', 500))
+ITEMS_BULK_MAX_ROWS = int(os.environ.get('ITEMS_BULK_MAX_ROWS', 10000))
+
+# Page sizes of the item change feed, see items.changes
+ITEMS_CHANGES_PAGE_SIZE = int(os.environ.get('ITEMS_CHANGES_PAGE_SIZE', 100))
+ITEMS_CHANGES_MAX_PAGE_SIZE = int(
+    os.environ.get('ITEMS_CHANGES_MAX_PAGE_SIZE', 1000)
+)
+
+# Rows fetched per server-side cursor round trip by the item export
+ITEMS_EXPORT_CHUNK_SIZE = int(os.environ.get('ITEMS_EXPORT_CHUNK_SIZE', 2000))
+
+# Maintain per-tenant item summaries on writes so stats are O(1)
+ITEMS_STATS_SUMMARY = os.environ.get('ITEMS_STATS_SUMMARY', '') == '1'
+
+# Tenant isolation: 'shared' keeps every tenant's items in core_item,
+# 'schema' moves tenants with a ready TenantSchema into their own
+# PostgreSQL schema using django-tenants, see tenants.schemas
+TENANCY_MODE = os.environ.get('TENANCY_MODE', 'shared')
+TENANT_MODEL = 'tenants.TenantSchema'
+
+if TENANCY_MODE == 'schema':
+    for database in DATABASES.values():
+        database['ENGINE'] = 'django_tenants.postgresql_backend'
+    SHARED_APPS = ['django_tenants', *INSTALLED_APPS]
+    TENANT_APPS = ['core']
+    INSTALLED_APPS = SHARED_APPS
+    TENANT_SYNC_ROUTER = 'tenants.routers.ItemSchemaRouter'
+    DATABASE_ROUTERS = [TENANT_SYNC_ROUTER, *DATABASE_ROUTERS]
+    MIDDLEWARE = ['tenants.middleware.TenantSchemaMiddleware', *MIDDLEWARE]
+
 SPECTACULAR_SETTINGS = {
     'TITLE': 'Multi Tenants API',
     'DESCRIPTION': 'API for Multi Tenants and their Items',
@@ -20,11 +20,14 @@ from django.views.generic.base import RedirectView
 
 from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView
 
+from core.views import metrics
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/schema/', SpectacularAPIView.as_view(), name='api-schema'),
     path('api/docs/', SpectacularSwaggerView.as_view(url_name='api-schema'), name='api-docs'),
     path('api/tenants/', include('tenants.urls'), name='tenants'),
     path('api/items/', include('items.urls'), name='items'),
+    path('metrics', metrics, name='metrics'),
     path('', RedirectView.as_view(url='api/docs/')),
 ]
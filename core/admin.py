@@ -18,12 +18,16 @@ class UserAdmin(BaseUserAdmin):
                     'is_active',
                     'is_staff',
                     'is_superuser',
+                    'tier',
                 )
             }
         ),
-        (_('Important dates'), {'fields': ('last_login',)}),
+        (
+            _('Important dates'),
+            {'fields': ('last_login', 'deactivated_at', 'purged_at')},
+        ),
     )
-    readonly_fields = ['last_login']
+    readonly_fields = ['last_login', 'deactivated_at', 'purged_at']
 
     add_fieldsets = (
         (None, {
@@ -41,5 +45,14 @@ class UserAdmin(BaseUserAdmin):
     )
 
 
+class QueuedTaskAdmin(admin.ModelAdmin):
+    """Define the admin pages for queued background tasks."""
+    list_display = ['name', 'queue', 'status', 'attempts', 'run_at']
+    list_filter = ['status', 'queue']
+    search_fields = ['name']
+    readonly_fields = ['locked_by', 'locked_at', 'last_error', 'created_at']
+
+
 admin.site.register(models.User, UserAdmin)
 admin.site.register(models.Item)
+admin.site.register(models.QueuedTask, QueuedTaskAdmin)
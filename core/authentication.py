@@ -0,0 +1,297 @@
+"""
+Authentication classes shared by the API apps.
+"""
+import copy
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.exceptions import AuthenticationFailed
+
+from core.models import AuthToken
+
+
+class TokenCache:
+    """Bounded, thread-safe LRU of authenticated tokens with a TTL.
+
+    Entries are keyed by the SHA-256 digest of the token key so raw keys are
+    never held in memory, and indexed by user id so that every token of a
+    user can be dropped at once. The cache is per process; tokens revoked
+    by another worker are caught by `RevokedTokenIndex`.
+    """
+
+    def __init__(self, max_size=None, timeout=None):
+        options = getattr(settings, 'TOKEN_AUTH_CACHE', {})
+        self.max_size = max_size or options.get('MAX_SIZE', 10000)
+        self.timeout = timeout or options.get('TIMEOUT', 60)
+        self._entries = OrderedDict()
+        self._user_digests = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def digest(key):
+        """Return the cache key for a raw token key."""
+        return hashlib.sha256(key.encode()).hexdigest()
+
+    def get(self, key):
+        """Return the cached `(user, token)` pair for a key, or `None`."""
+        digest = self.digest(key)
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    self._discard(digest)
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(digest)
+            self.hits += 1
+            return entry[1], entry[2]
+
+    def set(self, key, user, token):
+        """Cache the `(user, token)` pair authenticated by a key."""
+        digest = self.digest(key)
+        with self._lock:
+            self._discard(digest)
+            self._entries[digest] = (
+                time.monotonic() + self.timeout,
+                copy.copy(user),
+                token,
+            )
+            self._user_digests.setdefault(user.pk, set()).add(digest)
+            while len(self._entries) > self.max_size:
+                self._discard(next(iter(self._entries)))
+
+    def invalidate(self, key):
+        """Drop the entry for a token key."""
+        with self._lock:
+            self._discard(self.digest(key))
+
+    def invalidate_user(self, user_id):
+        """Drop every entry authenticating the given user."""
+        with self._lock:
+            for digest in list(self._user_digests.get(user_id, ())):
+                self._discard(digest)
+
+    def clear(self):
+        """Drop all entries and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self._user_digests.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        """Return the hit/miss counters and current size."""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'size': len(self._entries),
+            }
+
+    def _discard(self, digest):
+        entry = self._entries.pop(digest, None)
+        if entry is None:
+            return
+
+        user_id = entry[1].pk
+        digests = self._user_digests.get(user_id)
+        if digests is not None:
+            digests.discard(digest)
+            if not digests:
+                del self._user_digests[user_id]
+
+
+token_cache = TokenCache()
+
+
+class RevokedTokenIndex:
+    """In-process set of revoked token ids, refreshed incrementally.
+
+    Cached tokens are checked against this index instead of the database.
+    At most every `refresh_interval` seconds one indexed query loads the
+    tokens revoked since the previous refresh, overlapping it to catch
+    slow commits, and entries of expired tokens are dropped, so the index
+    only holds revoked tokens that would otherwise still be valid.
+
+    Tracking starts on first use: tokens revoked before then were never
+    cached by this process and are rejected by the database lookup.
+    """
+    overlap = timedelta(seconds=30)
+
+    def __init__(self, refresh_interval=None):
+        options = getattr(settings, 'AUTH_TOKEN', {})
+        if refresh_interval is None:
+            refresh_interval = options.get('REVOCATION_REFRESH', 5)
+        self.refresh_interval = refresh_interval
+        self._revoked = {}
+        self._since = None
+        self._next_refresh = 0.0
+        self._lock = threading.Lock()
+
+    def __contains__(self, token):
+        # Matching the expiry too keeps a recycled id from looking revoked.
+        return self._revoked.get(token.pk) == token.expires_at
+
+    def __len__(self):
+        return len(self._revoked)
+
+    def add(self, token_id, expires_at):
+        """Record a token revoked by this process."""
+        with self._lock:
+            self._revoked[token_id] = expires_at
+
+    def is_due(self):
+        """Return whether `refresh_if_due()` would refresh."""
+        return time.monotonic() >= self._next_refresh
+
+    def refresh_if_due(self):
+        """Load new revocations if the refresh interval has passed."""
+        with self._lock:
+            if not self.is_due():
+                return
+            self._next_refresh = time.monotonic() + self.refresh_interval
+            since, self._since = self._since, timezone.now()
+            if since is None:
+                return
+
+        now = timezone.now()
+        revoked = AuthToken.objects.filter(
+            revoked_at__gte=since - self.overlap,
+            expires_at__gt=now,
+        ).values_list('pk', 'expires_at')
+        with self._lock:
+            self._revoked.update(revoked)
+            for token_id, expires_at in list(self._revoked.items()):
+                if expires_at <= now:
+                    del self._revoked[token_id]
+
+    def clear(self):
+        """Forget all revocations and start tracking afresh."""
+        with self._lock:
+            self._revoked.clear()
+            self._since = None
+            self._next_refresh = 0.0
+
+
+revoked_tokens = RevokedTokenIndex()
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Token authentication that resolves tokens from `token_cache`.
+
+    A cache hit authenticates the request without touching the database:
+    expiry is checked on the cached token and revocation against
+    `revoked_tokens`. Each hit returns a copy of the cached user, so views
+    that modify `request.user` cannot leak changes into other requests.
+
+    The copy may be up to `TOKEN_AUTH_CACHE['TIMEOUT']` seconds old: a
+    user changed by another process, including its deactivation, is only
+    seen once the entry expires (revoked tokens are caught sooner, within
+    `AUTH_TOKEN['REVOCATION_REFRESH']`). Views writing the user reload it
+    first, and saves in this process drop its entries.
+    """
+    model = AuthToken
+    cache = token_cache
+    revocations = revoked_tokens
+
+    def authenticate_credentials(self, key):
+        self.revocations.refresh_if_due()
+        cached = self.cache.get(key)
+        if cached is not None:
+            user, token = cached
+            self.check_token(key, token)
+            self.check_user(key, user)
+            return copy.copy(user), token
+
+        user, token = super().authenticate_credentials(key)
+        self.check_token(key, token)
+        self.cache.set(key, user, token)
+        return user, token
+
+    def check_token(self, key, token):
+        """Reject a revoked or expired token and drop it from the cache."""
+        if token.revoked_at is not None or token in self.revocations:
+            self.cache.invalidate(key)
+            raise AuthenticationFailed(_('Token has been revoked.'))
+        if token.is_expired:
+            self.cache.invalidate(key)
+            raise AuthenticationFailed(_('Token has expired.'))
+
+    def check_user(self, key, user):
+        """Reject a cached token of a tenant deactivated since it was cached."""
+        if not user.is_active:
+            self.cache.invalidate(key)
+            raise AuthenticationFailed(_('User inactive or deleted.'))
+
+    async def aauthenticate(self, request):
+        """Async counterpart of `authenticate()` for async views."""
+        key = _TokenKeyParser().authenticate(request)
+        if key is None:
+            return None
+        return await self.aauthenticate_credentials(key)
+
+    async def aauthenticate_credentials(self, key):
+        """Async counterpart of `authenticate_credentials()`."""
+        if self.revocations.is_due():
+            await sync_to_async(self.revocations.refresh_if_due)()
+        cached = self.cache.get(key)
+        if cached is not None:
+            user, token = cached
+            self.check_token(key, token)
+            self.check_user(key, user)
+            return copy.copy(user), token
+
+        model = self.get_model()
+        try:
+            token = await model.objects.select_related('user').aget(key=key)
+        except model.DoesNotExist:
+            raise AuthenticationFailed(_('Invalid token.'))
+
+        if not token.user.is_active:
+            raise AuthenticationFailed(_('User inactive or deleted.'))
+
+        self.check_token(key, token)
+        self.cache.set(key, token.user, token)
+        return token.user, token
+
+
+class _TokenKeyParser(TokenAuthentication):
+    """Parse and validate the token header, returning the raw key."""
+
+    def authenticate_credentials(self, key):
+        return key
+
+
+def get_token_user(request):
+    """Return the user authenticated by a request's token, or `None`.
+
+    Lets middleware identify the tenant before DRF runs; the lookup fills
+    the token cache, so DRF's own authentication is then a cache hit.
+    """
+    try:
+        credentials = CachedTokenAuthentication().authenticate(request)
+    except AuthenticationFailed:
+        return None
+
+    return credentials[0] if credentials else None
+
+
+async def aget_token_user(request):
+    """Async counterpart of `get_token_user()`."""
+    try:
+        credentials = await CachedTokenAuthentication().aauthenticate(request)
+    except AuthenticationFailed:
+        return None
+
+    return credentials[0] if credentials else None
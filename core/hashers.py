@@ -0,0 +1,35 @@
+"""
+Password hashers with parameters tuned through settings.
+"""
+from django.conf import settings
+from django.contrib.auth.hashers import (
+    Argon2PasswordHasher,
+    ScryptPasswordHasher,
+)
+
+
+class TunedHasherMixin:
+    """Read a hasher's cost parameters from `PASSWORD_HASHER_PARAMS`.
+
+    Hashes made with other parameters still verify; `must_update()` then
+    reports them, so Django rehashes the password on the next login.
+    """
+
+    def __init__(self):
+        params = settings.PASSWORD_HASHER_PARAMS.get(self.algorithm, {})
+        for name, value in params.items():
+            setattr(self, name, value)
+
+
+class TunedArgon2PasswordHasher(TunedHasherMixin, Argon2PasswordHasher):
+    """Argon2id with `time_cost`, `memory_cost` and `parallelism` from settings."""
+
+
+class TunedScryptPasswordHasher(TunedHasherMixin, ScryptPasswordHasher):
+    """scrypt with `work_factor`, `block_size` and `parallelism` from settings."""
+
+    def __init__(self):
+        super().__init__()
+        # OpenSSL caps scrypt at 32 MiB by default; leave room for larger
+        # work factors (the required memory is 128 * n * r * p bytes).
+        self.maxmem = 256 * self.work_factor * self.block_size * self.parallelism
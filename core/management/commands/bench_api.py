@@ -0,0 +1,193 @@
+"""
+Load test the main API routes and report latency percentiles as JSON.
+"""
+import asyncio
+import json
+import time
+from decimal import Decimal
+
+from asgiref.sync import ThreadSensitiveContext, sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, connections
+from django.test import AsyncClient, override_settings
+from django.urls import reverse
+
+from core.models import AuthToken, Item
+
+
+PASSWORD = 'bench-api-password'
+
+
+def percentile(latencies, p):
+    """Return the nearest-rank `p` percentile of sorted latencies in ms."""
+    index = min(len(latencies) - 1, int(len(latencies) * p))
+    return round(latencies[index] * 1000, 3)
+
+
+class Command(BaseCommand):
+    """Drive the token, item list and profile routes with concurrent clients.
+
+    Seeds `--tenants` tenants through `create_user()` with `--items` items
+    each, bulk inserted, then sends `--requests` requests per route through
+    the full ASGI stack in-process, spread over the tenants. As behind an
+    ASGI server, each request runs its sync code in a thread of its own,
+    so up to `--concurrency` requests do database work at once; the seeded
+    data is therefore committed, and deleted again at the end. Throttles
+    are disabled for the run.
+
+    The JSON report holds req/s and p50/p95/p99 latency per route, for
+    comparing runs across commits.
+    """
+    help = 'Load test the API routes and report latencies as JSON.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--tenants',
+            type=int,
+            default=10,
+            help='Number of tenants to seed.',
+        )
+        parser.add_argument(
+            '--items',
+            type=int,
+            default=1000,
+            help='Number of items to seed per tenant.',
+        )
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=500,
+            help='Number of requests per route.',
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=20,
+            help='Number of concurrent clients.',
+        )
+        parser.add_argument(
+            '--page-size',
+            type=int,
+            default=100,
+            help='Items per listed page.',
+        )
+        parser.add_argument(
+            '--output',
+            help='Write the report to this file instead of stdout.',
+        )
+
+    def handle(self, *args, **options):
+        allowed_hosts = [*settings.ALLOWED_HOSTS, 'testserver']
+        throttle = {**settings.API_THROTTLE, 'RATES': {}}
+        with override_settings(ALLOWED_HOSTS=allowed_hosts, API_THROTTLE=throttle):
+            tenants = []
+            try:
+                self.seed(tenants, options['tenants'], options['items'])
+                routes = {
+                    'token': self.login_request(tenants),
+                    'items': self.get_request(
+                        reverse('items:item-list'),
+                        tenants,
+                        {'page_size': options['page_size']},
+                    ),
+                    'me': self.get_request(reverse('tenants:me'), tenants),
+                }
+                # Not `async_to_sync()`: it would run every sync view of the
+                # load in this thread, one at a time.
+                results = {
+                    name: asyncio.run(self.load(send, options))
+                    for name, send in routes.items()
+                }
+            finally:
+                get_user_model().objects.filter(
+                    pk__in=[tenant.pk for tenant, _token in tenants],
+                ).delete()
+
+        report = json.dumps({
+            'database': connection.vendor,
+            'tenants': options['tenants'],
+            'items_per_tenant': options['items'],
+            'concurrency': options['concurrency'],
+            'routes': results,
+        }, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                output.write(report + '\n')
+        else:
+            self.stdout.write(report)
+
+    def seed(self, tenants, tenant_count, item_count):
+        """Create the tenants with their items, adding `(tenant, token)`s."""
+        for number in range(tenant_count):
+            tenant = get_user_model().objects.create_user(
+                email=f'bench-api-{number}@example.com',
+                password=PASSWORD,
+            )
+            Item.objects.bulk_create(
+                [
+                    Item(tenant=tenant, name=f'Item {i}', price=Decimal(i) / 100)
+                    for i in range(item_count)
+                ],
+                batch_size=1000,
+            )
+            tenants.append((tenant, AuthToken.objects.issue(tenant)))
+
+    def login_request(self, tenants):
+        """Return a coroutine function logging in the nth tenant."""
+        url = reverse('tenants:token')
+
+        async def send(client, number):
+            tenant, _token = tenants[number % len(tenants)]
+            return await client.post(
+                url,
+                {'email': tenant.email, 'password': PASSWORD},
+            )
+        return send
+
+    def get_request(self, url, tenants, params=None):
+        """Return a coroutine function reading `url` as the nth tenant."""
+        async def send(client, number):
+            _tenant, token = tenants[number % len(tenants)]
+            return await client.get(
+                url,
+                params,
+                headers={'Authorization': f'Token {token.key}'},
+            )
+        return send
+
+    async def load(self, send, options):
+        """Send the requests of one route and return its statistics."""
+        client = AsyncClient()
+        semaphore = asyncio.Semaphore(options['concurrency'])
+        latencies = []
+        errors = 0
+
+        async def timed(number):
+            nonlocal errors
+            # A context per request gives its sync code a thread of its own,
+            # as Django's ASGI handler does.
+            async with semaphore, ThreadSensitiveContext():
+                try:
+                    start = time.perf_counter()
+                    res = await send(client, number)
+                    latencies.append(time.perf_counter() - start)
+                    if res.status_code >= 400:
+                        errors += 1
+                finally:
+                    await sync_to_async(connections.close_all)()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(timed(n) for n in range(options['requests'])))
+        elapsed = time.perf_counter() - start
+
+        latencies.sort()
+        return {
+            'requests': len(latencies),
+            'errors': errors,
+            'req_per_s': round(len(latencies) / elapsed, 1),
+            'p50_ms': percentile(latencies, 0.50),
+            'p95_ms': percentile(latencies, 0.95),
+            'p99_ms': percentile(latencies, 0.99),
+        }
@@ -0,0 +1,64 @@
+"""
+Benchmark the database connection overhead of a request.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from django.core.signals import request_finished, request_started
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+class Command(BaseCommand):
+    """Compare per-request time with and without persistent connections.
+
+    Each simulated request fires the same `request_started` and
+    `request_finished` signals Django's handlers do, which is where
+    connections are closed or health-checked, and runs one trivial query.
+    """
+    help = 'Benchmark per-request database connection overhead.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=200,
+            help='Number of simulated requests per mode.',
+        )
+        parser.add_argument(
+            '--database',
+            default=DEFAULT_DB_ALIAS,
+            help='Database alias to benchmark.',
+        )
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        max_age = connection.settings_dict['CONN_MAX_AGE'] or 60
+        requests = options['requests']
+
+        fresh = self.measure(connection, 0, requests)
+        persistent = self.measure(connection, max_age, requests)
+
+        self.stdout.write(f'new connection per request: {fresh * 1000:.2f} ms/request')
+        self.stdout.write(
+            f'CONN_MAX_AGE={max_age}: {persistent * 1000:.2f} ms/request '
+            f'({fresh / persistent:.1f}x)'
+        )
+
+    def measure(self, connection, max_age, requests):
+        """Return the mean seconds per request with the given max age."""
+        settings_dict = connection.settings_dict
+        original = settings_dict['CONN_MAX_AGE']
+        connection.close()
+        settings_dict['CONN_MAX_AGE'] = max_age
+        try:
+            start = time.perf_counter()
+            for _request in range(requests):
+                request_started.send(sender=self.__class__)
+                with connection.cursor() as cursor:
+                    cursor.execute('SELECT 1')
+                    cursor.fetchone()
+                request_finished.send(sender=self.__class__)
+            return (time.perf_counter() - start) / requests
+        finally:
+            settings_dict['CONN_MAX_AGE'] = original
+            connection.close()
@@ -0,0 +1,69 @@
+"""
+Benchmark login throughput per password hasher.
+"""
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import Client, override_settings
+from django.urls import reverse
+
+
+class Command(BaseCommand):
+    """Report logins/sec of the token endpoint for each hasher.
+
+    Logins run one after another in this process, so the rate is per
+    core. Tenants are created inside a transaction that is rolled back at
+    the end, so the database is left untouched.
+    """
+    help = 'Benchmark login throughput per password hasher.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--hashers',
+            nargs='+',
+            choices=list(settings.PASSWORD_HASHER_CHOICES),
+            default=list(settings.PASSWORD_HASHER_CHOICES),
+            help='Hashers to benchmark.',
+        )
+        parser.add_argument(
+            '--logins',
+            type=int,
+            default=20,
+            help='Number of logins per hasher.',
+        )
+
+    def handle(self, *args, **options):
+        allowed_hosts = [*settings.ALLOWED_HOSTS, 'testserver']
+        # Measure the endpoint itself, not the tenant throttles.
+        throttle = {**settings.API_THROTTLE, 'RATES': {}}
+        with transaction.atomic(), override_settings(
+            ALLOWED_HOSTS=allowed_hosts,
+            API_THROTTLE=throttle,
+        ):
+            for name in options['hashers']:
+                path = settings.PASSWORD_HASHER_CHOICES[name]
+                with override_settings(PASSWORD_HASHERS=[path]):
+                    rate = self.measure(name, options['logins'])
+                self.stdout.write(f'{name}: {rate:,.1f} logins/s per core')
+
+            transaction.set_rollback(True)
+
+    def measure(self, name, logins):
+        """Return the logins/sec of a tenant hashed with the active hasher."""
+        payload = {
+            'email': f'bench-logins-{name}@example.com',
+            'password': 'bench-password',
+        }
+        get_user_model().objects.create_user(**payload)
+        client = Client()
+        url = reverse('tenants:token')
+
+        start = time.perf_counter()
+        for _login in range(logins):
+            res = client.post(url, payload)
+            if res.status_code != 200:
+                raise RuntimeError(f'{url} returned {res.status_code}')
+        return logins / (time.perf_counter() - start)
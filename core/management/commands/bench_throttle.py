@@ -0,0 +1,98 @@
+"""
+Benchmark the per-request overhead of the tenant throttle.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from core.models import User
+from core.throttling import TenantRateThrottle
+
+
+class BenchView:
+    """Stand-in view with its own throttle scope."""
+    throttle_scope = 'bench'
+
+
+class Command(BaseCommand):
+    """Compare the throttle with and without leasing tokens locally.
+
+    Calls `allow_request()` directly for a few tenants, once with leases
+    of a single token, which costs a cache round trip per request, and
+    once with the configured `LEASE_FRACTION`.
+    """
+    help = 'Benchmark the per-request overhead of the tenant throttle.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=10000,
+            help='Number of throttled requests per mode.',
+        )
+        parser.add_argument(
+            '--tenants',
+            type=int,
+            default=10,
+            help='Number of tenants the requests are spread over.',
+        )
+        parser.add_argument(
+            '--rate',
+            default='100000/min',
+            help='Rate of each tenant, high enough not to refuse requests.',
+        )
+        parser.add_argument(
+            '--cache',
+            default=settings.API_THROTTLE.get('ALIAS', 'default'),
+            help='Cache alias holding the shared buckets.',
+        )
+
+    def handle(self, *args, **options):
+        factory = APIRequestFactory()
+        requests = []
+        for pk in range(1, options['tenants'] + 1):
+            request = Request(factory.get('/'))
+            request.user = User(pk=pk, tier=User.Tier.STANDARD)
+            requests.append(request)
+
+        single = self.measure(requests, options, 0)
+        leased = self.measure(
+            requests,
+            options,
+            settings.API_THROTTLE['LEASE_FRACTION'],
+        )
+
+        self.stdout.write(
+            f'cache round trip per request: {single * 1e6:.1f} us/request'
+        )
+        self.stdout.write(
+            f'LEASE_FRACTION={settings.API_THROTTLE["LEASE_FRACTION"]}: '
+            f'{leased * 1e6:.1f} us/request ({single / leased:.1f}x)'
+        )
+
+    def measure(self, requests, options, fraction):
+        """Return the mean seconds `allow_request()` takes per request."""
+        config = {
+            **settings.API_THROTTLE,
+            'ALIAS': options['cache'],
+            'LEASE_FRACTION': fraction,
+            'RATES': {'bench': {User.Tier.STANDARD: options['rate']}},
+        }
+        view = BenchView()
+        with override_settings(API_THROTTLE=config):
+            caches[options['cache']].delete_many([
+                f'throttle:bench:{request.user.pk}' for request in requests
+            ])
+            TenantRateThrottle.clear()
+            start = time.perf_counter()
+            for number in range(options['requests']):
+                request = requests[number % len(requests)]
+                TenantRateThrottle().allow_request(request, view)
+            elapsed = time.perf_counter() - start
+            TenantRateThrottle.clear()
+        return elapsed / options['requests']
@@ -0,0 +1,92 @@
+"""
+Verify that item queries of the API read a single partition.
+"""
+from datetime import date
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import RequestFactory
+from django.urls import reverse
+from rest_framework.request import Request
+
+from core.models import Item
+from core.partitioning import (
+    RANGE,
+    add_months,
+    list_partitions,
+    partition_method,
+    scanned_partitions,
+)
+from items.views import ItemViewSet
+
+
+class Command(BaseCommand):
+    """Explain `ItemViewSet` queries of some tenants and count partitions.
+
+    The querysets of `ItemViewSet.get_queryset` are checked for
+    `--tenants` tenants. Hash partitions prune on the tenant alone, so
+    both the list and the detail lookup are checked. Range partitions
+    only prune on creation time: the list is checked filtered to the
+    current month, and the detail lookup, which has no creation time to
+    prune on and always reads every partition, is skipped. Fails if any
+    checked query would read more than one partition.
+    """
+    help = (
+        'Check that item queries are pruned to a single partition: the '
+        'list and detail queries with hash partitioning, the list filtered '
+        'to the current month with range partitioning.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--tenants',
+            type=int,
+            default=5,
+            help='Number of tenants to check.',
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('Partitioning requires PostgreSQL.')
+
+        table = Item._meta.db_table
+        method = partition_method(connection, table)
+        if not method:
+            raise CommandError(f'{table} is not partitioned.')
+        partitions = [name for name, *_rest in list_partitions(connection, table)]
+
+        params = {}
+        if method == RANGE:
+            month = add_months(date.today(), 0)
+            params = {
+                'created_after': month.isoformat(),
+                'created_before': add_months(month, 1).isoformat(),
+            }
+
+        failed = False
+        tenants = get_user_model().objects.order_by('pk')[:options['tenants']]
+        for tenant in tenants:
+            view = self.get_view(tenant, params)
+            querysets = {'list': view.filter_queryset(view.get_queryset())}
+            if method != RANGE:
+                querysets['detail'] = view.get_queryset().filter(pk=0)
+            for name, queryset in querysets.items():
+                scanned = scanned_partitions(queryset, partitions)
+                self.stdout.write(
+                    f'{tenant.email} {name}: {len(scanned)} partitions '
+                    f'({", ".join(scanned)})'
+                )
+                failed = failed or len(scanned) > 1
+
+        if failed:
+            raise CommandError('Some item queries read more than one partition.')
+        self.stdout.write(
+            f'Item queries are pruned to one of {len(partitions)} partitions.'
+        )
+
+    def get_view(self, tenant, params):
+        """Return an `ItemViewSet` listing items of `tenant` with `params`."""
+        request = Request(RequestFactory().get(reverse('items:item-list'), params))
+        request.user = tenant
+        return ItemViewSet(request=request, action='list', format_kwarg=None)
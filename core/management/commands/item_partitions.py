@@ -0,0 +1,85 @@
+"""
+List and maintain the partitions of the item table.
+"""
+from datetime import date
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from core.models import Item
+from core.partitioning import (
+    RANGE,
+    add_months,
+    create_month_partitions,
+    detach_month_partitions,
+    list_partitions,
+    partition_method,
+)
+
+
+class Command(BaseCommand):
+    """List the partitions of `core_item`, and keep range partitions ahead.
+
+    With range partitioning this is meant to run regularly, e.g. daily:
+    `--create-ahead` attaches the coming months before rows arrive for
+    them, otherwise they land in the default partition. Rows already
+    there are moved into the month's partition when it is attached,
+    while the default partition is locked. `--detach-before` removes
+    whole months from the table, and with `--drop` deletes them.
+    """
+    help = 'List, create and detach partitions of the item table.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--create-ahead',
+            type=int,
+            metavar='MONTHS',
+            help=(
+                'Attach missing monthly partitions up to this many months '
+                'ahead, moving their rows out of the default partition.'
+            ),
+        )
+        parser.add_argument(
+            '--detach-before',
+            type=date.fromisoformat,
+            metavar='YYYY-MM-DD',
+            help='Detach monthly partitions ending on or before this date.',
+        )
+        parser.add_argument(
+            '--drop',
+            action='store_true',
+            help='Drop the detached partitions.',
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('Partitioning requires PostgreSQL.')
+
+        table = Item._meta.db_table
+        method = partition_method(connection, table)
+        if not method:
+            raise CommandError(f'{table} is not partitioned.')
+        changes = options['create_ahead'] is not None or options['detach_before']
+        if changes and method != RANGE:
+            raise CommandError('Only range partitions can be created or detached.')
+
+        lock_timeout = settings.ITEMS_PARTITIONING['LOCK_TIMEOUT']
+        if options['create_ahead'] is not None:
+            until = add_months(date.today(), options['create_ahead'])
+            for name in create_month_partitions(connection, table, until, lock_timeout):
+                self.stdout.write(f'Attached {name}.')
+        if options['detach_before']:
+            verb = 'Dropped' if options['drop'] else 'Detached'
+            for name in detach_month_partitions(
+                connection,
+                table,
+                options['detach_before'],
+                drop=options['drop'],
+                lock_timeout=lock_timeout,
+            ):
+                self.stdout.write(f'{verb} {name}.')
+
+        self.stdout.write(f'{table} has {method} partitions:')
+        for name, bound, rows, size in list_partitions(connection, table):
+            self.stdout.write(f'  {name}: {bound}, ~{rows} rows, {size} bytes')
@@ -0,0 +1,74 @@
+"""
+Convert the item table to a partitioned table, or back, while in use.
+"""
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from core.models import Item
+from core.partitioning import HASH, RANGE, ItemTableRebuild
+
+
+class Command(BaseCommand):
+    """Rebuild `core_item` online with the requested partitioning.
+
+    Defaults come from `settings.ITEMS_PARTITIONING`; see
+    `core.partitioning.ItemTableRebuild` for how the table stays in use.
+    Nothing is done if the table is laid out as requested already.
+    """
+    help = 'Partition the item table by tenant hash or creation month.'
+
+    def add_arguments(self, parser):
+        options = settings.ITEMS_PARTITIONING
+        parser.add_argument(
+            '--method',
+            choices=[HASH, RANGE, 'none'],
+            default=options['METHOD'] or 'none',
+            help='Partitioning method; "none" makes it a plain table.',
+        )
+        parser.add_argument(
+            '--partitions',
+            type=int,
+            default=options['PARTITIONS'],
+            help='Number of hash partitions.',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=options['BATCH_SIZE'],
+            help='Number of rows copied per batch.',
+        )
+        parser.add_argument(
+            '--pause',
+            type=float,
+            default=options['PAUSE'],
+            help='Seconds to sleep between batches.',
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('Partitioning requires PostgreSQL.')
+        if settings.TENANCY_MODE == 'schema':
+            raise CommandError('Partitioning requires TENANCY_MODE "shared".')
+
+        table = Item._meta.db_table
+        rebuild = ItemTableRebuild(
+            connection,
+            table,
+            '' if options['method'] == 'none' else options['method'],
+            partitions=options['partitions'],
+            premake=settings.ITEMS_PARTITIONING['PREMAKE'],
+            batch_size=options['batch_size'],
+            pause=options['pause'],
+            lock_timeout=settings.ITEMS_PARTITIONING['LOCK_TIMEOUT'],
+        )
+        if not rebuild.needed():
+            self.stdout.write(f'{table} is {rebuild.describe()} already.')
+            return
+
+        for copied, last_id, max_id in rebuild.run():
+            if options['verbosity'] > 1:
+                self.stdout.write(
+                    f'Copied {copied} rows, up to id {last_id} of {max_id}.'
+                )
+        self.stdout.write(f'Rebuilt {table} as {rebuild.describe()}.')
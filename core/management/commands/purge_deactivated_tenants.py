@@ -0,0 +1,44 @@
+"""
+Delete the data of deactivated tenants.
+"""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from core.purge import TenantPurge
+
+
+class Command(BaseCommand):
+    """Purge every deactivated tenant that still has data, in batches.
+
+    Safe to interrupt: tenants are only marked purged once all of their
+    items and tokens are gone, and a rerun continues with what is left.
+    """
+    help = 'Delete the items and tokens of deactivated tenants in batches.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=settings.TENANT_PURGE['BATCH_SIZE'],
+            help='Number of rows deleted per batch.',
+        )
+        parser.add_argument(
+            '--pause',
+            type=float,
+            default=settings.TENANT_PURGE['PAUSE'],
+            help='Seconds to sleep between batches.',
+        )
+
+    def handle(self, *args, **options):
+        tenants = get_user_model().objects.pending_purge().order_by('deactivated_at')
+        purged = 0
+        for tenant in tenants.iterator():
+            purge = TenantPurge(tenant, options['batch_size'], options['pause'])
+            for name, deleted, total in purge.run():
+                if options['verbosity'] > 1:
+                    self.stdout.write(f'{tenant.email}: {deleted}/{total} {name}')
+            self.stdout.write(f'Purged {tenant.email}.')
+            purged += 1
+
+        self.stdout.write(f'Purged {purged} deactivated tenants.')
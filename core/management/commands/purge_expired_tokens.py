@@ -0,0 +1,44 @@
+"""
+Delete expired API tokens.
+"""
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.models import AuthToken
+
+
+class Command(BaseCommand):
+    """Delete expired tokens in small batches.
+
+    Each batch is its own short statement, so the purge never holds locks
+    on a large part of the token table and can be interrupted and rerun
+    at any time.
+    """
+    help = 'Delete expired API tokens in batches.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=settings.AUTH_TOKEN['PURGE_BATCH_SIZE'],
+            help='Number of tokens deleted per batch.',
+        )
+        parser.add_argument(
+            '--pause',
+            type=float,
+            default=0,
+            help='Seconds to sleep between batches.',
+        )
+
+    def handle(self, *args, **options):
+        total = 0
+        for deleted in AuthToken.objects.purge_expired(options['batch_size']):
+            total += deleted
+            if options['verbosity'] > 1:
+                self.stdout.write(f'Deleted {deleted} tokens ({total} so far).')
+            if options['pause']:
+                time.sleep(options['pause'])
+
+        self.stdout.write(f'Purged {total} expired tokens.')
@@ -0,0 +1,113 @@
+"""
+Run background tasks from the database queue.
+"""
+import multiprocessing
+import signal
+import threading
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from core.tasks import Worker
+
+
+class Command(BaseCommand):
+    """Run a pool of worker threads, optionally in several processes.
+
+    Each of the `--processes` processes runs `--threads` workers, each
+    claiming up to `--batch-size` tasks at a time. Threads suit tasks that
+    mostly wait on the database; CPU-bound tasks need processes. SIGINT
+    and SIGTERM stop the workers once their current batch is done.
+    """
+    help = 'Run background tasks from the database queue.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processes',
+            type=int,
+            default=1,
+            help='Number of worker processes.',
+        )
+        parser.add_argument(
+            '--threads',
+            type=int,
+            default=1,
+            help='Number of worker threads per process.',
+        )
+        parser.add_argument(
+            '--queue',
+            action='append',
+            dest='queues',
+            help='Queue to take tasks from; repeat for several. '
+                 'Defaults to "default".',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=settings.TASKS['BATCH_SIZE'],
+            help='Number of tasks claimed at a time.',
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=settings.TASKS['POLL_INTERVAL'],
+            help='Seconds to wait when the queue is empty.',
+        )
+        parser.add_argument(
+            '--burst',
+            action='store_true',
+            help='Exit once the queue is empty.',
+        )
+
+    def handle(self, *args, **options):
+        if options['processes'] > 1:
+            context = multiprocessing.get_context('fork')
+            stop = context.Event()
+            handlers = self.handle_signals(stop)
+            # Forked processes must not share the parent's connections.
+            connections.close_all()
+            processes = [
+                context.Process(target=self.run_threads, args=(stop, options))
+                for _number in range(options['processes'])
+            ]
+            for process in processes:
+                process.start()
+            for process in processes:
+                process.join()
+        else:
+            stop = threading.Event()
+            handlers = self.handle_signals(stop)
+            self.run_threads(stop, options)
+        for signum, handler in handlers.items():
+            signal.signal(signum, handler)
+
+    def handle_signals(self, stop):
+        """Set `stop` on SIGINT and SIGTERM, returning the previous handlers."""
+        return {
+            signum: signal.signal(signum, lambda signum, frame: stop.set())
+            for signum in (signal.SIGINT, signal.SIGTERM)
+        }
+
+    def run_threads(self, stop, options):
+        """Run the worker threads of this process until they stop."""
+        workers = [
+            threading.Thread(
+                target=self.run_worker,
+                args=(stop, options),
+                name=f'worker-{number}',
+            )
+            for number in range(options['threads'])
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+    def run_worker(self, stop, options):
+        # Created in its thread, which the worker is named after.
+        worker = Worker(
+            queues=options['queues'] or ['default'],
+            batch_size=options['batch_size'],
+        )
+        worker.run(stop, options['poll_interval'], options['burst'])
@@ -0,0 +1,265 @@
+"""
+Per-request performance metrics of the API.
+
+`RequestMetricsMiddleware` opens a `RequestRecord` for every request; the
+database query recorder and `timed_serializer()` add to the record of the
+request they run in, found through a context variable, so no view has to
+pass it around. Finished records are logged to the `api.metrics` logger,
+tagged with tenant and view, and aggregated per view into histograms that
+`registry.render()` exposes in the Prometheus text format.
+"""
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+
+logger = logging.getLogger('api.metrics')
+
+_current = ContextVar('request_record', default=None)
+
+
+class RequestRecord:
+    """Measurements of a single request."""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.duration = 0.0
+        self.db_queries = 0
+        self.db_time = 0.0
+        self.serializer_time = 0.0
+        self.response_size = None
+        self.tenant_id = None
+        self.view = None
+        self.status = None
+
+    def finish(self, request, response):
+        """Stop the clock and tag the record with what served the request."""
+        self.duration = time.perf_counter() - self.start
+        self.status = response.status_code
+        self.view = get_view_name(request)
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated:
+            self.tenant_id = user.pk
+        if not response.streaming:
+            self.response_size = len(response.content)
+
+    def server_timing(self):
+        """Return the `Server-Timing` header value of the record."""
+        return ', '.join([
+            f'total;dur={self.duration * 1000:.1f}',
+            f'db;dur={self.db_time * 1000:.1f};desc="{self.db_queries} queries"',
+            f'serializer;dur={self.serializer_time * 1000:.1f}',
+        ])
+
+    def as_dict(self):
+        return {
+            'view': self.view,
+            'tenant_id': self.tenant_id,
+            'status': self.status,
+            'duration': self.duration,
+            'db_queries': self.db_queries,
+            'db_time': self.db_time,
+            'serializer_time': self.serializer_time,
+            'response_size': self.response_size,
+        }
+
+
+@contextmanager
+def recording():
+    """Collect the metrics of the code in the block into a new record."""
+    record = RequestRecord()
+    token = _current.set(record)
+    try:
+        yield record
+    finally:
+        _current.reset(token)
+
+
+def current_record():
+    """Return the record of the running request, if any."""
+    return _current.get()
+
+
+def get_view_name(request):
+    """Return `ViewClass.action` for viewsets, else the view's class name."""
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unresolved'
+    func = match.func
+    view_class = getattr(func, 'cls', None) or getattr(func, 'view_class', None)
+    if view_class is None:
+        return getattr(func, '__name__', 'unknown')
+    actions = getattr(func, 'actions', None)
+    if actions and request.method.lower() in actions:
+        return f'{view_class.__name__}.{actions[request.method.lower()]}'
+    return view_class.__name__
+
+
+def record_query(execute, sql, params, many, context):
+    """Database execute wrapper adding each query to the current record.
+
+    Installed once on every connection rather than per request: database
+    work of async views runs in `sync_to_async` threads whose connections
+    the middleware never sees, while the context variable follows it
+    there.
+    """
+    record = _current.get()
+    if record is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        record.db_queries += 1
+        record.db_time += time.perf_counter() - start
+
+
+def install_query_recorder(connection):
+    """Add `record_query` to the execute wrappers of a connection."""
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+@contextmanager
+def timed_serializer():
+    """Add the time spent in the block, less queries, to serializer time.
+
+    Serializers often evaluate lazy querysets; that part is already
+    counted as database time.
+    """
+    record = _current.get()
+    if record is None:
+        yield
+        return
+    start = time.perf_counter()
+    db_time = record.db_time
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        record.serializer_time += elapsed - (record.db_time - db_time)
+
+
+class TimedSerializerMixin:
+    """Count the time taken by a serializer's `data` as serializer time."""
+
+    @property
+    def data(self):
+        with timed_serializer():
+            return super().data
+
+
+class Histogram:
+    """Cumulative histogram in the Prometheus sense."""
+
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        """Yield `(le, count)` pairs including the `+Inf` bucket."""
+        total = 0
+        for bound, count in zip((*self.buckets, float('inf')), self.counts):
+            total += count
+            yield bound, total
+
+
+class MetricsRegistry:
+    """Per-view histograms of finished requests of this process.
+
+    Each worker process keeps its own registry, so `/metrics` reports the
+    worker that served the scrape; Prometheus sums them per instance.
+    Tenants are deliberately not a label, which would make the number of
+    series grow with the number of tenants; per-tenant analysis uses the
+    logged records instead.
+    """
+    metrics = (
+        (
+            'duration',
+            'api_request_duration_seconds',
+            'Wall time of API requests.',
+            (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+        ),
+        (
+            'db_time',
+            'api_request_db_seconds',
+            'Database time of API requests.',
+            (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+        ),
+        (
+            'db_queries',
+            'api_request_db_queries',
+            'Database queries of API requests.',
+            (0, 1, 2, 3, 5, 10, 20, 50, 100),
+        ),
+        (
+            'serializer_time',
+            'api_request_serializer_seconds',
+            'Serializer time of API requests.',
+            (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1),
+        ),
+        (
+            'response_size',
+            'api_response_size_bytes',
+            'Size of API response bodies.',
+            (100, 1000, 10000, 100000, 1000000, 10000000),
+        ),
+    )
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views = {}
+
+    def observe(self, record):
+        """Add a finished record to the histograms of its view."""
+        with self._lock:
+            histograms = self._views.get(record.view)
+            if histograms is None:
+                histograms = self._views[record.view] = {
+                    attr: Histogram(buckets)
+                    for attr, _name, _help, buckets in self.metrics
+                }
+            for attr, histogram in histograms.items():
+                value = getattr(record, attr)
+                if value is not None:
+                    histogram.observe(value)
+
+    def render(self):
+        """Return every histogram in the Prometheus text format."""
+        lines = []
+        with self._lock:
+            for attr, name, help_text, _buckets in self.metrics:
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} histogram')
+                for view, histograms in sorted(self._views.items()):
+                    histogram = histograms[attr]
+                    label = f'view="{view}"'
+                    for bound, count in histogram.cumulative():
+                        le = '+Inf' if bound == float('inf') else f'{bound:g}'
+                        lines.append(f'{name}_bucket{{{label},le="{le}"}} {count}')
+                    lines.append(f'{name}_sum{{{label}}} {histogram.sum:g}')
+                    lines.append(f'{name}_count{{{label}}} {histogram.count}')
+        return '\n'.join(lines) + '\n'
+
+    def clear(self):
+        with self._lock:
+            self._views.clear()
+
+
+registry = MetricsRegistry()
+
+
+def report(record):
+    """Log a finished record and add it to the registry."""
+    registry.observe(record)
+    logger.debug('%s %s', record.view, record.status, extra=record.as_dict())
@@ -0,0 +1,146 @@
+"""
+Middleware shared by the API apps.
+"""
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+
+from core import metrics
+from core.authentication import aget_token_user, get_token_user
+from core.routers import replica_reads
+
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+def primary_pin_key(tenant_id):
+    """Return the cache key pinning a tenant's reads to the primary."""
+    return f'db:primary:{tenant_id}'
+
+
+class ReplicaReadMiddleware:
+    """Route safe requests to read replicas, keeping read-your-writes.
+
+    Unsafe requests run entirely on the primary. After one, reads stay on
+    the primary for `DATABASE_REPLICA_PIN_SECONDS`, tracked two ways: a
+    cookie pins the client that wrote, and a cache entry pins every client
+    of the tenant that wrote. Clients without cookies can also send the
+    `X-Read-Primary` header.
+
+    The middleware runs natively in both the sync and the async request
+    path, so it adds no thread hop in front of async views.
+    """
+    cookie_name = 'read_primary'
+    header_name = 'X-Read-Primary'
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not settings.DATABASE_REPLICAS:
+            return self.get_response(request)
+
+        tenant = get_token_user(request)
+        is_write = request.method not in SAFE_METHODS
+        use_replicas = not (
+            is_write
+            or self.is_client_pinned(request)
+            or tenant is not None and cache.get(primary_pin_key(tenant.pk))
+        )
+        with replica_reads(use_replicas):
+            response = self.get_response(request)
+
+        if is_write:
+            self.pin_client(response)
+            if tenant is not None:
+                cache.set(primary_pin_key(tenant.pk), 1, self.pin_seconds)
+        return response
+
+    async def __acall__(self, request):
+        if not settings.DATABASE_REPLICAS:
+            return await self.get_response(request)
+
+        tenant = await aget_token_user(request)
+        is_write = request.method not in SAFE_METHODS
+        use_replicas = not (
+            is_write
+            or self.is_client_pinned(request)
+            or tenant is not None and await cache.aget(primary_pin_key(tenant.pk))
+        )
+        with replica_reads(use_replicas):
+            response = await self.get_response(request)
+
+        if is_write:
+            self.pin_client(response)
+            if tenant is not None:
+                await cache.aset(primary_pin_key(tenant.pk), 1, self.pin_seconds)
+        return response
+
+    @property
+    def pin_seconds(self):
+        return settings.DATABASE_REPLICA_PIN_SECONDS
+
+    def is_client_pinned(self, request):
+        """Return whether the client asked to read from the primary."""
+        return (
+            self.cookie_name in request.COOKIES
+            or bool(request.headers.get(self.header_name))
+        )
+
+    def pin_client(self, response):
+        """Pin the client that just wrote to the primary."""
+        response.set_cookie(
+            self.cookie_name,
+            '1',
+            max_age=self.pin_seconds,
+            httponly=True,
+            samesite='Lax',
+        )
+
+
+class RequestMetricsMiddleware:
+    """Measure every request and report it to `core.metrics`.
+
+    Records wall time, database queries and time, serializer time and
+    response size, adds them to the response as a `Server-Timing` header
+    and feeds the per-view histograms served at `/metrics`. It goes first
+    in `MIDDLEWARE` so the wall time covers the other middleware too.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not settings.REQUEST_METRICS['ENABLED']:
+            return self.get_response(request)
+
+        with metrics.recording() as record:
+            response = self.get_response(request)
+        return self.finish(record, request, response)
+
+    async def __acall__(self, request):
+        if not settings.REQUEST_METRICS['ENABLED']:
+            return await self.get_response(request)
+
+        with metrics.recording() as record:
+            response = await self.get_response(request)
+        return self.finish(record, request, response)
+
+    def finish(self, record, request, response):
+        record.finish(request, response)
+        if not response.streaming:
+            response.headers['Server-Timing'] = record.server_timing()
+        metrics.report(record)
+        return response
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.7 on 2026-10-18 11:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_item'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='item',
+            index=models.Index(fields=['tenant', 'id'], name='item_tenant_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='item',
+            index=models.Index(fields=['tenant', 'created_at', 'id'], name='item_tenant_created_idx'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.7 on 2026-10-18 11:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_user_versions'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='item',
+            index=models.Index(fields=['tenant', 'price', 'id'], name='item_tenant_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='item',
+            index=models.Index(fields=['tenant', 'name', 'id'], name='item_tenant_name_idx'),
+        ),
+    ]
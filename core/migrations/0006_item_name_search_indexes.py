@@ -0,0 +1,42 @@
+# Indexes for item name search that only exist on PostgreSQL.
+
+from django.db import migrations
+
+
+CREATE_INDEXES = [
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    'CREATE INDEX CONCURRENTLY IF NOT EXISTS item_tenant_name_prefix_idx '
+    'ON core_item (tenant_id, name varchar_pattern_ops)',
+    'CREATE INDEX CONCURRENTLY IF NOT EXISTS item_name_trgm_idx '
+    'ON core_item USING gin (UPPER(name) gin_trgm_ops)',
+]
+
+DROP_INDEXES = [
+    'DROP INDEX CONCURRENTLY IF EXISTS item_name_trgm_idx',
+    'DROP INDEX CONCURRENTLY IF EXISTS item_tenant_name_prefix_idx',
+]
+
+
+def run_on_postgresql(statements):
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor != 'postgresql':
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('core', '0005_item_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            run_on_postgresql(CREATE_INDEXES),
+            run_on_postgresql(DROP_INDEXES),
+        ),
+    ]
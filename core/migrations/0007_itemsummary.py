@@ -0,0 +1,27 @@
+# Generated by Django 4.2.7 on 2026-10-18 11:25
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_item_name_search_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ItemSummary',
+            fields=[
+                ('tenant', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='item_summary', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('count', models.PositiveBigIntegerField(default=0)),
+                ('total_price', models.FloatField(default=0)),
+                ('min_price', models.FloatField(null=True)),
+                ('max_price', models.FloatField(null=True)),
+                ('bounds_stale', models.BooleanField(default=False)),
+                ('items_version', models.PositiveBigIntegerField(default=0)),
+            ],
+        ),
+    ]
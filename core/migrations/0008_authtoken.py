@@ -0,0 +1,54 @@
+# Generated by Django 4.2.7 on 2026-10-18 11:41
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.utils import timezone
+
+
+def copy_drf_tokens(apps, schema_editor):
+    """Carry existing non-expiring tokens over with a fresh lifetime."""
+    Token = apps.get_model('authtoken', 'Token')
+    AuthToken = apps.get_model('core', 'AuthToken')
+    expires_at = timezone.now() + timedelta(
+        seconds=settings.AUTH_TOKEN['LIFETIME'],
+    )
+    AuthToken.objects.bulk_create(
+        [
+            AuthToken(key=token.key, user_id=token.user_id, expires_at=expires_at)
+            for token in Token.objects.iterator()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authtoken', '0003_tokenproxy'),
+        ('core', '0007_itemsummary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuthToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=40, unique=True)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('expires_at', models.DateTimeField()),
+                ('revoked_at', models.DateTimeField(blank=True, null=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='auth_tokens', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['expires_at'], name='authtoken_expires_idx'), models.Index(condition=models.Q(('revoked_at__isnull', False)), fields=['revoked_at'], name='authtoken_revoked_idx')],
+            },
+        ),
+        migrations.RunPython(
+            copy_drf_tokens,
+            migrations.RunPython.noop,
+            hints={'model_name': 'authtoken'},
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-18 11:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_authtoken'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='tier',
+            field=models.CharField(choices=[('free', 'Free'), ('standard', 'Standard'), ('premium', 'Premium')], default='standard', max_length=20),
+        ),
+    ]
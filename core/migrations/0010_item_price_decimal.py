@@ -0,0 +1,138 @@
+# Expand step of moving item prices from float to decimal: add the
+# decimal column, keep it in sync with the float column on PostgreSQL,
+# backfill it in short batches and check that it is filled.
+
+from django.db import migrations, models
+from django.db.models.functions import Cast, Round
+
+
+BATCH_SIZE = 1000
+
+SYNC_TRIGGER = 'core_item_sync_price_decimal'
+
+NOT_NULL_CHECK = 'core_item_price_decimal_not_null'
+
+
+def create_sync_trigger(apps, schema_editor):
+    """Fill the decimal price of every row written by the float-only code.
+
+    With the trigger in place before the backfill starts, no row can be
+    left without a decimal price, so the swap needs no final pass.
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    table = schema_editor.quote_name(apps.get_model('core', 'Item')._meta.db_table)
+    schema_editor.execute(
+        f'CREATE OR REPLACE FUNCTION {SYNC_TRIGGER}() RETURNS trigger AS $$ '
+        'BEGIN NEW.price_decimal := round(NEW.price::numeric, 2); '
+        'RETURN NEW; END; $$ LANGUAGE plpgsql'
+    )
+    schema_editor.execute(
+        f'CREATE TRIGGER {SYNC_TRIGGER} BEFORE INSERT OR UPDATE OF price '
+        f'ON {table} FOR EACH ROW EXECUTE FUNCTION {SYNC_TRIGGER}()'
+    )
+
+
+def drop_sync_trigger(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    table = schema_editor.quote_name(apps.get_model('core', 'Item')._meta.db_table)
+    schema_editor.execute(f'DROP TRIGGER IF EXISTS {SYNC_TRIGGER} ON {table}')
+    schema_editor.execute(f'DROP FUNCTION IF EXISTS {SYNC_TRIGGER}()')
+
+
+def backfill_prices(apps, schema_editor):
+    """Copy float prices into the decimal column one id range at a time.
+
+    The migration is not atomic, so every batch commits on its own and
+    only locks its own rows. Rows already copied are skipped, so an
+    interrupted backfill resumes where it stopped.
+    """
+    Item = apps.get_model('core', 'Item')
+    items = Item.objects.using(schema_editor.connection.alias)
+    decimal_price = Cast(
+        Round('price', 2),
+        models.DecimalField(max_digits=12, decimal_places=2),
+    )
+
+    last_id = 0
+    while True:
+        batch = items.filter(id__gt=last_id)
+        bounds = batch.order_by('id').values_list('id', flat=True)
+        upper = next(iter(bounds[BATCH_SIZE - 1:BATCH_SIZE]), None)
+        if upper is not None:
+            batch = batch.filter(id__lte=upper)
+        batch.filter(price_decimal__isnull=True).update(price_decimal=decimal_price)
+        if upper is None:
+            break
+        last_id = upper
+
+
+def add_not_null_check(apps, schema_editor):
+    """Check the decimal price is filled, without blocking the table.
+
+    The constraint is added `NOT VALID`, which only takes a brief lock,
+    and validated separately, which scans the table without blocking
+    reads or writes. `SET NOT NULL` in the swap then relies on it instead
+    of scanning the table under an exclusive lock (PostgreSQL 12+).
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    table = schema_editor.quote_name(apps.get_model('core', 'Item')._meta.db_table)
+    schema_editor.execute(
+        f'ALTER TABLE {table} ADD CONSTRAINT {NOT_NULL_CHECK} '
+        'CHECK (price_decimal IS NOT NULL) NOT VALID'
+    )
+
+
+def validate_not_null_check(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    table = schema_editor.quote_name(apps.get_model('core', 'Item')._meta.db_table)
+    schema_editor.execute(f'ALTER TABLE {table} VALIDATE CONSTRAINT {NOT_NULL_CHECK}')
+
+
+def drop_not_null_check(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    table = schema_editor.quote_name(apps.get_model('core', 'Item')._meta.db_table)
+    schema_editor.execute(
+        f'ALTER TABLE {table} DROP CONSTRAINT IF EXISTS {NOT_NULL_CHECK}'
+    )
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('core', '0009_user_tier'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='item',
+            name='price_decimal',
+            field=models.DecimalField(decimal_places=2, max_digits=12, null=True),
+        ),
+        migrations.RunPython(
+            create_sync_trigger,
+            drop_sync_trigger,
+            hints={'model_name': 'item'},
+        ),
+        migrations.RunPython(
+            backfill_prices,
+            migrations.RunPython.noop,
+            hints={'model_name': 'item'},
+        ),
+        migrations.RunPython(
+            add_not_null_check,
+            drop_not_null_check,
+            hints={'model_name': 'item'},
+        ),
+        migrations.RunPython(
+            validate_not_null_check,
+            migrations.RunPython.noop,
+            hints={'model_name': 'item'},
+        ),
+    ]
@@ -0,0 +1,103 @@
+# Contract step of moving item prices from float to decimal: replace the
+# float column with the decimal one, which 0010 keeps filled.
+
+from importlib import import_module
+
+from django.db import migrations, models
+from django.db.models import F
+from django.db.models.functions import Cast, Round
+
+
+expand = import_module('core.migrations.0010_item_price_decimal')
+
+
+def stop_syncing_prices(apps, schema_editor):
+    """Drop the sync trigger, or on other databases copy missing prices.
+
+    On PostgreSQL the trigger and the validated check of 0010 guarantee
+    every row has a decimal price, so nothing is scanned: the swap below
+    only changes the catalog, holding its lock for a moment. It is
+    dropped in the same transaction as the float column it reads.
+    """
+    if schema_editor.connection.vendor == 'postgresql':
+        expand.drop_sync_trigger(apps, schema_editor)
+        return
+    Item = apps.get_model('core', 'Item')
+    Item.objects.using(schema_editor.connection.alias).filter(
+        price_decimal__isnull=True,
+    ).update(
+        price_decimal=Cast(
+            Round('price', 2),
+            models.DecimalField(max_digits=12, decimal_places=2),
+        ),
+    )
+
+
+def copy_prices_back(apps, schema_editor):
+    """Restore float prices from the decimal column and resume syncing."""
+    Item = apps.get_model('core', 'Item')
+    Item.objects.using(schema_editor.connection.alias).update(
+        price=Cast(F('price_decimal'), models.FloatField()),
+    )
+    expand.create_sync_trigger(apps, schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_item_price_decimal'),
+    ]
+
+    operations = [
+        # Nullable first, so that reversing recreates the float column
+        # empty and fills it before making it required again.
+        migrations.AlterField(
+            model_name='item',
+            name='price',
+            field=models.FloatField(null=True),
+        ),
+        migrations.RunPython(
+            stop_syncing_prices,
+            copy_prices_back,
+            hints={'model_name': 'item'},
+        ),
+        migrations.RemoveIndex(
+            model_name='item',
+            name='item_tenant_price_idx',
+        ),
+        migrations.RemoveField(
+            model_name='item',
+            name='price',
+        ),
+        migrations.RenameField(
+            model_name='item',
+            old_name='price_decimal',
+            new_name='price',
+        ),
+        # Proven by the validated check, which is no longer needed after.
+        migrations.AlterField(
+            model_name='item',
+            name='price',
+            field=models.DecimalField(decimal_places=2, max_digits=12),
+        ),
+        migrations.RunPython(
+            expand.drop_not_null_check,
+            migrations.RunPython.noop,
+            hints={'model_name': 'item'},
+        ),
+        migrations.AlterField(
+            model_name='itemsummary',
+            name='max_price',
+            field=models.DecimalField(decimal_places=2, max_digits=12, null=True),
+        ),
+        migrations.AlterField(
+            model_name='itemsummary',
+            name='min_price',
+            field=models.DecimalField(decimal_places=2, max_digits=12, null=True),
+        ),
+        migrations.AlterField(
+            model_name='itemsummary',
+            name='total_price',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=18),
+        ),
+    ]
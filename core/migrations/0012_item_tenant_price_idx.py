@@ -0,0 +1,54 @@
+# Recreate the (tenant, price) index on the decimal price column without
+# blocking writes on PostgreSQL.
+
+from django.db import migrations, models
+
+
+INDEX = models.Index(
+    fields=['tenant', 'price', 'id'],
+    name='item_tenant_price_idx',
+)
+
+
+def add_index(apps, schema_editor):
+    Item = apps.get_model('core', 'Item')
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(
+            INDEX.create_sql(Item, schema_editor, concurrently=True)
+        )
+    else:
+        schema_editor.add_index(Item, INDEX)
+
+
+def remove_index(apps, schema_editor):
+    Item = apps.get_model('core', 'Item')
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(
+            INDEX.remove_sql(Item, schema_editor, concurrently=True)
+        )
+    else:
+        schema_editor.remove_index(Item, INDEX)
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('core', '0011_item_price_swap'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunPython(
+                    add_index,
+                    remove_index,
+                    hints={'model_name': 'item'},
+                ),
+            ],
+            state_operations=[
+                migrations.AddIndex(model_name='item', index=INDEX),
+            ],
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.7 on 2026-10-18 12:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_item_tenant_price_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='deactivated_at',
+            field=models.DateTimeField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='purged_at',
+            field=models.DateTimeField(editable=False, null=True),
+        ),
+    ]
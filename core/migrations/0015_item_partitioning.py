@@ -0,0 +1,38 @@
+# Optional online conversion of core_item to a partitioned table, see
+# core.partitioning. Only runs on PostgreSQL in shared tenancy mode, when
+# ITEMS_PARTITIONING['METHOD'] is set; reversing makes it a plain table.
+
+from django.conf import settings
+from django.db import migrations
+
+from core.partitioning import ItemTableRebuild
+
+
+def rebuild(method):
+    def run(apps, schema_editor):
+        connection = schema_editor.connection
+        if connection.vendor != 'postgresql' or settings.TENANCY_MODE == 'schema':
+            return
+        table = apps.get_model('core', 'Item')._meta.db_table
+        table_rebuild = ItemTableRebuild.from_settings(connection, table, method)
+        if table_rebuild.needed():
+            for _progress in table_rebuild.run():
+                pass
+    return run
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('core', '0014_queuedtask'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            rebuild(None),
+            rebuild(''),
+            hints={'model_name': 'item'},
+        ),
+    ]
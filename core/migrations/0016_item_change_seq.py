@@ -0,0 +1,123 @@
+# Per-tenant change sequence of items for the change feed, see
+# items.changes: add the column and the tombstone table, number existing
+# rows in short batches and index the sequence without blocking writes.
+# Rows written meanwhile by processes still running the previous code
+# are numbered by items.changes.number_late_items() when next synced.
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+import django.db.models.deletion
+
+from core.partitioning import partition_method
+
+
+BATCH_SIZE = 1000
+
+INDEX = models.Index(
+    fields=['tenant', 'change_seq'],
+    name='item_tenant_change_seq_idx',
+)
+
+
+def number_items(apps, schema_editor):
+    """Number existing items by id and move every tenant's sequence past them.
+
+    Ids are unique and grow with creation, so they are a valid sequence
+    to start from; raising each tenant's items version to its largest
+    item id makes every later change sort after them. Batches commit on
+    their own and numbered rows are skipped, so an interrupted run
+    resumes where it stopped.
+    """
+    alias = schema_editor.connection.alias
+    Item = apps.get_model('core', 'Item')
+    User = apps.get_model('core', 'User')
+    items = Item.objects.using(alias)
+
+    last_id = 0
+    while True:
+        batch = items.filter(id__gt=last_id)
+        bounds = batch.order_by('id').values_list('id', flat=True)
+        upper = next(iter(bounds[BATCH_SIZE - 1:BATCH_SIZE]), None)
+        if upper is not None:
+            batch = batch.filter(id__lte=upper)
+        batch.filter(change_seq__isnull=True).update(change_seq=models.F('id'))
+        if upper is None:
+            break
+        last_id = upper
+
+    last_item_id = items.filter(tenant=OuterRef('pk')).order_by('-id')
+    User.objects.using(alias).update(
+        items_version=Greatest(
+            'items_version',
+            Coalesce(Subquery(last_item_id.values('id')[:1]), 0),
+        ),
+    )
+
+
+def add_index(apps, schema_editor):
+    Item = apps.get_model('core', 'Item')
+    connection = schema_editor.connection
+    # Indexes of partitioned tables cannot be built concurrently.
+    if (
+        connection.vendor == 'postgresql'
+        and not partition_method(connection, Item._meta.db_table)
+    ):
+        schema_editor.execute(
+            INDEX.create_sql(Item, schema_editor, concurrently=True)
+        )
+    else:
+        schema_editor.add_index(Item, INDEX)
+
+
+def remove_index(apps, schema_editor):
+    Item = apps.get_model('core', 'Item')
+    schema_editor.remove_index(Item, INDEX)
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('core', '0015_item_partitioning'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='item',
+            name='change_seq',
+            field=models.PositiveBigIntegerField(editable=False, null=True),
+        ),
+        migrations.CreateModel(
+            name='ItemTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('item_id', models.PositiveBigIntegerField()),
+                ('change_seq', models.PositiveBigIntegerField()),
+                ('deleted_at', models.DateTimeField(auto_now_add=True)),
+                ('tenant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['tenant', 'change_seq'], name='itemtombstone_tenant_seq_idx')],
+            },
+        ),
+        migrations.RunPython(
+            number_items,
+            migrations.RunPython.noop,
+            hints={'model_name': 'item'},
+        ),
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunPython(
+                    add_index,
+                    remove_index,
+                    hints={'model_name': 'item'},
+                ),
+            ],
+            state_operations=[
+                migrations.AddIndex(model_name='item', index=INDEX),
+            ],
+        ),
+    ]
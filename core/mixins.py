@@ -0,0 +1,84 @@
+"""
+View mixins shared by the API apps.
+"""
+import hashlib
+
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+
+class ConditionalGetMixin:
+    """Answer conditional GET requests before doing any real work.
+
+    Views provide cheap validators through `get_validators()` and call
+    `get_not_modified_response()` first thing in their read actions. When
+    the request's `If-None-Match`/`If-Modified-Since` headers still match, a
+    304 is returned without evaluating the queryset or rendering anything;
+    otherwise the `ETag` and `Last-Modified` headers are added to the
+    response.
+    """
+    validators = None
+    version = None
+
+    def get_validators(self, request):
+        """Return a `(version, last_modified)` pair for the resource.
+
+        `version` is any value that changes whenever the response would,
+        `last_modified` an aware datetime or `None`.
+        """
+        raise NotImplementedError('`get_validators()` must be implemented.')
+
+    def get_not_modified_response(self, request):
+        """Return a 304 response if the client's copy is current, else `None`."""
+        version, last_modified = self.get_validators(request)
+        self.version = version
+        key = '|'.join([
+            str(version),
+            request.get_full_path(),
+            request.META.get('HTTP_ACCEPT', ''),
+        ])
+        etag = quote_etag(hashlib.sha1(key.encode()).hexdigest())
+        timestamp = int(last_modified.timestamp()) if last_modified else None
+        self.validators = (etag, timestamp)
+
+        return get_conditional_response(
+            request,
+            etag=etag,
+            last_modified=timestamp,
+        )
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if self.validators is not None and response.status_code in (200, 304):
+            etag, timestamp = self.validators
+            response.headers.setdefault('ETag', etag)
+            if timestamp is not None:
+                response.headers.setdefault('Last-Modified', http_date(timestamp))
+        return response
+
+
+class RateLimitHeadersMixin:
+    """Add the `RateLimit-*` headers of the request's throttles.
+
+    Throttles such as `core.throttling.TenantRateThrottle` record the most
+    restrictive limit on the request; the headers follow the IETF
+    RateLimit header fields draft, `RateLimit-Reset` being in seconds.
+    """
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        for name, value in get_rate_limit_headers(request._request).items():
+            response.headers[name] = value
+        return response
+
+
+def get_rate_limit_headers(request):
+    """Return the `RateLimit-*` headers of a Django `request`."""
+    rate_limit = getattr(request, 'rate_limit', None)
+    if rate_limit is None:
+        return {}
+    return {
+        'RateLimit-Limit': str(rate_limit.limit),
+        'RateLimit-Remaining': str(rate_limit.remaining),
+        'RateLimit-Reset': str(rate_limit.reset),
+    }
@@ -1,14 +1,29 @@
 """
 Database models
 """
+import binascii
+import os
+from datetime import timedelta
+from functools import partial
+
 from django.conf import settings
-from django.db import models
+from django.db import models, router, transaction
+from django.db.models import Case, Value, When
+from django.db.models.functions import Coalesce, Greatest, Least
+from django.utils import timezone
 from django.contrib.auth.models import (
     AbstractBaseUser,
     BaseUserManager,
     PermissionsMixin,
 )
 
+from core.pubsub import publish
+
+
+def items_channel(tenant_id):
+    """Return the pub/sub channel announcing a tenant's item changes."""
+    return f'items.{tenant_id}'
+
 
 class UserManager(BaseUserManager):
     """Manager for users."""
@@ -32,18 +47,128 @@ class UserManager(BaseUserManager):
 
         return user
 
+    def get_by_natural_key(self, email):
+        """Return the user with an email and its current token.
+
+        `authenticate()` looks users up through this on login, so the token
+        view can hand out an existing token without another query. The
+        `current_token_key` and `current_token_expires_at` annotations are
+        `None` when a new token has to be issued.
+        """
+        current_token = AuthToken.objects.current().filter(
+            user=models.OuterRef('pk'),
+        ).order_by('-created')[:1]
+        return self.annotate(
+            current_token_key=models.Subquery(current_token.values('key')),
+            current_token_expires_at=models.Subquery(
+                current_token.values('expires_at'),
+            ),
+        ).get(**{self.model.USERNAME_FIELD: email})
+
+    def touch_items(self, tenant_id, count=1):
+        """Record that `count` items of a tenant have changed."""
+        self.filter(pk=tenant_id).update(
+            items_version=models.F('items_version') + count,
+            items_modified_at=timezone.now(),
+        )
+
+    def next_item_seq(self, tenant_id, count=1):
+        """Allocate change sequence numbers for `count` item changes.
+
+        The items version doubles as the tenant's change sequence: it is
+        bumped by `count` and the new value returned, so the changes get
+        the numbers from `returned - count + 1` to `returned`. The update
+        locks the tenant row until the caller's transaction ends, so the
+        changes of a tenant commit in sequence order. Once they have, the
+        new number is published on the tenant's `items_channel()`.
+        """
+        # Callers reading from a replica, such as `GET` requests, still
+        # have to bump and read the number on the primary.
+        using = self._db or router.db_for_write(self.model)
+        manager = self.db_manager(using)
+        with transaction.atomic(using=using):
+            manager.touch_items(tenant_id, count)
+            seq = manager.filter(pk=tenant_id).values_list(
+                'items_version',
+                flat=True,
+            ).get()
+            transaction.on_commit(
+                partial(publish, items_channel(tenant_id), {'seq': seq}),
+                using=using,
+                robust=True,
+            )
+        return seq
+
+    def pending_purge(self):
+        """Return deactivated tenants whose data has not been purged yet."""
+        return self.filter(deactivated_at__isnull=False, purged_at__isnull=True)
+
+    def get_items_version(self, tenant_id):
+        """Return the `(items_version, items_modified_at)` of a tenant."""
+        return self.filter(pk=tenant_id).values_list(
+            'items_version',
+            'items_modified_at',
+        ).get()
+
 
 class User(AbstractBaseUser, PermissionsMixin):
     """User in the system."""
 
+    class Tier(models.TextChoices):
+        FREE = 'free', 'Free'
+        STANDARD = 'standard', 'Standard'
+        PREMIUM = 'premium', 'Premium'
+
     email = models.EmailField(max_length=255, unique=True)
     name = models.CharField(max_length=255)
     is_active = models.BooleanField(default=True)
     is_staff = models.BooleanField(default=False)
+    tier = models.CharField(
+        max_length=20,
+        choices=Tier.choices,
+        default=Tier.STANDARD,
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+    items_version = models.PositiveBigIntegerField(default=0, editable=False)
+    items_modified_at = models.DateTimeField(null=True, editable=False)
+    deactivated_at = models.DateTimeField(null=True, editable=False)
+    purged_at = models.DateTimeField(null=True, editable=False)
 
     objects = UserManager()
 
     USERNAME_FIELD = 'email'
+    # Changed only by `UserManager.touch_items()` with `F()` updates, so a
+    # save of an out of date instance cannot roll the version back and
+    # hand out change sequence numbers again.
+    counter_fields = ('items_version', 'items_modified_at')
+
+    def save(self, *args, **kwargs):
+        """Save the user, leaving the item counters of an existing row alone."""
+        if (
+            not self._state.adding
+            and kwargs.get('update_fields') is None
+            and not kwargs.get('force_insert')
+        ):
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.counter_fields
+            ]
+        super().save(*args, **kwargs)
+
+    def deactivate(self):
+        """Deactivate the tenant right away, leaving its data to the purge.
+
+        Revoking the tokens makes every process stop authenticating the
+        tenant within `AUTH_TOKEN['REVOCATION_REFRESH']` seconds; the items
+        and tokens are deleted later by `core.purge.TenantPurge`.
+        """
+        now = timezone.now()
+        with transaction.atomic():
+            self.is_active = False
+            self.deactivated_at = now
+            self.save(update_fields=['is_active', 'deactivated_at', 'updated_at'])
+            AuthToken.objects.valid().filter(user=self).update(revoked_at=now)
+
 
 class Item(models.Model):
     """Item to be stored in the database."""
@@ -53,8 +178,352 @@ class Item(models.Model):
     )
     name = models.CharField(max_length=255)
     description = models.TextField(blank=True, null=True)
-    price = models.FloatField()
+    price = models.DecimalField(max_digits=12, decimal_places=2)
     created_at = models.DateTimeField(auto_now_add=True, editable=False)
+    # Position of the item's last change in the tenant's change feed; only
+    # rows written before the feed existed and not backfilled are null.
+    change_seq = models.PositiveBigIntegerField(null=True, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['tenant', 'id'], name='item_tenant_id_idx'),
+            models.Index(
+                fields=['tenant', 'created_at', 'id'],
+                name='item_tenant_created_idx',
+            ),
+            models.Index(
+                fields=['tenant', 'price', 'id'],
+                name='item_tenant_price_idx',
+            ),
+            models.Index(
+                fields=['tenant', 'name', 'id'],
+                name='item_tenant_name_idx',
+            ),
+            models.Index(
+                fields=['tenant', 'change_seq'],
+                name='item_tenant_change_seq_idx',
+            ),
+        ]
 
     def __str__(self):
         return self.name
+
+    def save(self, *args, **kwargs):
+        """Save the item under the next change sequence number of its tenant."""
+        using = kwargs.get('using') or router.db_for_write(type(self), instance=self)
+        if kwargs.get('update_fields') is not None:
+            kwargs['update_fields'] = {*kwargs['update_fields'], 'change_seq'}
+        with transaction.atomic(using=using):
+            self.change_seq = User.objects.db_manager(using).next_item_seq(
+                self.tenant_id,
+            )
+            super().save(*args, **kwargs)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Remember the loaded price so updates can adjust item summaries."""
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_price = instance.__dict__.get('price')
+        return instance
+
+
+class ItemTombstone(models.Model):
+    """Deleted item, kept so the tenant's change feed can report it.
+
+    Deleting an item removes its row and with it its `change_seq`, so the
+    deletion is recorded here under a sequence number of its own.
+    Tombstones are kept until the tenant is purged.
+    """
+    tenant = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+    )
+    item_id = models.PositiveBigIntegerField()
+    change_seq = models.PositiveBigIntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['tenant', 'change_seq'],
+                name='itemtombstone_tenant_seq_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f'Item {self.item_id} (deleted)'
+
+
+class ItemSummaryManager(models.Manager):
+    """Manager for item summaries."""
+
+    def refresh(self, tenant_id):
+        """Recompute and save the summary of a tenant from its items."""
+        # Read the version first: a write racing with the aggregate then
+        # leaves the summary behind the tenant and it is rebuilt again.
+        items_version = User.objects.filter(
+            pk=tenant_id,
+        ).values_list('items_version', flat=True).get()
+        stats = Item.objects.filter(tenant_id=tenant_id).aggregate(
+            count=models.Count('id'),
+            total_price=models.Sum('price'),
+            min_price=models.Min('price'),
+            max_price=models.Max('price'),
+        )
+        summary, _created = self.update_or_create(
+            tenant_id=tenant_id,
+            defaults={
+                'count': stats['count'],
+                'total_price': stats['total_price'] or 0,
+                'min_price': stats['min_price'],
+                'max_price': stats['max_price'],
+                'bounds_stale': False,
+                'items_version': items_version,
+            },
+        )
+        return summary
+
+    def get_current(self, tenant_id):
+        """Return an up-to-date summary, refreshing it if needed."""
+        summary = self.filter(tenant_id=tenant_id).select_related('tenant').first()
+        if (
+            summary is None
+            or summary.bounds_stale
+            or summary.items_version != summary.tenant.items_version
+        ):
+            summary = self.refresh(tenant_id)
+        return summary
+
+    def apply_change(self, tenant_id, count=0, price_delta=0, added_price=None,
+                     removed_price=None):
+        """Adjust a tenant's summary for one item change in O(1).
+
+        `added_price` is a price that now exists and may extend the bounds;
+        `removed_price` one that no longer does and, if it was a bound,
+        marks the bounds stale. Summaries that do not exist yet are left
+        alone and built in full on the next read.
+        """
+        updates = {
+            'count': models.F('count') + count,
+            'total_price': models.F('total_price') + price_delta,
+            'items_version': models.Subquery(
+                User.objects.filter(
+                    pk=models.OuterRef('tenant_id'),
+                ).values('items_version')[:1]
+            ),
+        }
+        if added_price is not None:
+            updates['min_price'] = Least(
+                Coalesce('min_price', Value(added_price)),
+                Value(added_price),
+            )
+            updates['max_price'] = Greatest(
+                Coalesce('max_price', Value(added_price)),
+                Value(added_price),
+            )
+        if removed_price is not None:
+            updates['bounds_stale'] = Case(
+                When(
+                    models.Q(min_price=removed_price)
+                    | models.Q(max_price=removed_price),
+                    then=Value(True),
+                ),
+                default=models.F('bounds_stale'),
+            )
+
+        self.filter(tenant_id=tenant_id).update(**updates)
+
+
+class ItemSummary(models.Model):
+    """Incrementally maintained aggregate of a tenant's items.
+
+    `items_version` is the tenant's items version the summary reflects;
+    a mismatch means item writes were missed and the summary is rebuilt.
+    """
+    tenant = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='item_summary',
+    )
+    count = models.PositiveBigIntegerField(default=0)
+    total_price = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+    min_price = models.DecimalField(max_digits=12, decimal_places=2, null=True)
+    max_price = models.DecimalField(max_digits=12, decimal_places=2, null=True)
+    bounds_stale = models.BooleanField(default=False)
+    items_version = models.PositiveBigIntegerField(default=0)
+
+    objects = ItemSummaryManager()
+
+
+class AuthTokenManager(models.Manager):
+    """Manager for API tokens."""
+
+    def issue(self, user):
+        """Create and return a new token for a user."""
+        lifetime = settings.AUTH_TOKEN['LIFETIME']
+        return self.create(
+            user=user,
+            key=self.model.generate_key(),
+            expires_at=timezone.now() + timedelta(seconds=lifetime),
+        )
+
+    def valid(self):
+        """Return tokens that are neither expired nor revoked."""
+        return self.filter(revoked_at__isnull=True, expires_at__gt=timezone.now())
+
+    def current(self):
+        """Return valid tokens young enough to be handed out again on login.
+
+        Older tokens keep working until they expire, but a login then
+        issues a new one, so clients that log in regularly rotate keys.
+        """
+        rotate_after = settings.AUTH_TOKEN['ROTATE_AFTER']
+        return self.valid().filter(
+            created__gt=timezone.now() - timedelta(seconds=rotate_after),
+        )
+
+    def rotate(self, token):
+        """Revoke a token and return a new one for the same user."""
+        with transaction.atomic():
+            token.revoke()
+            return self.issue(token.user)
+
+    def purge_expired(self, batch_size):
+        """Delete expired tokens in batches, yielding each batch's size."""
+        expired = self.filter(expires_at__lte=timezone.now()).order_by('pk')
+        while True:
+            ids = list(expired.values_list('pk', flat=True)[:batch_size])
+            if not ids:
+                return
+            self.filter(pk__in=ids).delete()
+            yield len(ids)
+
+
+class AuthToken(models.Model):
+    """Expiring API token of a tenant.
+
+    Tokens expire `AUTH_TOKEN['LIFETIME']` seconds after being issued and
+    can be revoked earlier, e.g. when rotated.
+    """
+    key = models.CharField(max_length=40, unique=True)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='auth_tokens',
+    )
+    created = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField()
+    revoked_at = models.DateTimeField(null=True, blank=True)
+
+    objects = AuthTokenManager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['expires_at'], name='authtoken_expires_idx'),
+            models.Index(
+                fields=['revoked_at'],
+                name='authtoken_revoked_idx',
+                condition=models.Q(revoked_at__isnull=False),
+            ),
+        ]
+
+    def __str__(self):
+        return self.key
+
+    @staticmethod
+    def generate_key():
+        return binascii.hexlify(os.urandom(20)).decode()
+
+    @property
+    def is_expired(self):
+        return self.expires_at <= timezone.now()
+
+    def revoke(self):
+        """Stop accepting the token."""
+        self.revoked_at = timezone.now()
+        self.save(update_fields=['revoked_at'])
+
+
+class QueuedTaskManager(models.Manager):
+    """Manager for queued tasks."""
+
+    def claim(self, worker, queues, limit, timeout):
+        """Lock up to `limit` due tasks for `worker` and return them.
+
+        Rows are selected with `FOR UPDATE SKIP LOCKED`, so concurrent
+        workers claim disjoint tasks without waiting on each other. The
+        update checks again that the tasks are due, which keeps claims
+        exclusive on databases without row locks, such as SQLite. Tasks
+        left running for more than `timeout` seconds belong to a worker
+        that died and are claimed again.
+        """
+        now = timezone.now()
+        due = self.filter(queue__in=queues).filter(
+            models.Q(status=QueuedTask.Status.QUEUED, run_at__lte=now)
+            | models.Q(
+                status=QueuedTask.Status.RUNNING,
+                locked_at__lt=now - timedelta(seconds=timeout),
+            )
+        )
+        with transaction.atomic(using=self.db):
+            ids = list(
+                due.select_for_update(skip_locked=True)
+                .order_by('run_at')
+                .values_list('pk', flat=True)[:limit]
+            )
+            if not ids:
+                return []
+            due.filter(pk__in=ids).update(
+                status=QueuedTask.Status.RUNNING,
+                locked_by=worker,
+                locked_at=now,
+                attempts=models.F('attempts') + 1,
+            )
+        return list(
+            self.filter(pk__in=ids, locked_by=worker, locked_at=now)
+            .order_by('run_at')
+        )
+
+
+class QueuedTask(models.Model):
+    """Call of a background task waiting in the database queue.
+
+    Rows are deleted once the task succeeds; tasks that failed
+    `max_attempts` times are kept with their last error. See core.tasks.
+    """
+
+    class Status(models.TextChoices):
+        QUEUED = 'queued', 'Queued'
+        RUNNING = 'running', 'Running'
+        FAILED = 'failed', 'Failed'
+
+    name = models.CharField(max_length=255)
+    queue = models.CharField(max_length=64, default='default')
+    args = models.JSONField(default=list)
+    kwargs = models.JSONField(default=dict)
+    status = models.CharField(
+        max_length=10,
+        choices=Status.choices,
+        default=Status.QUEUED,
+    )
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=1)
+    run_at = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=255, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    objects = QueuedTaskManager()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['queue', 'status', 'run_at'],
+                name='queuedtask_due_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.name} ({self.status})'
@@ -0,0 +1,518 @@
+"""
+Optional declarative partitioning of the item table on PostgreSQL.
+
+Items can be partitioned by hash of `tenant_id` or by `created_at` range.
+Every item query of the API filters on the tenant, so with hash
+partitioning each one is planned against a single partition, and vacuum
+work and index sizes are bounded by the partition rather than by the
+largest tenant. Range partitioning keeps each month together and lets old
+months be detached whole, but tenant queries are only pruned when they
+also filter on the creation time.
+
+`ItemTableRebuild` converts the live table to either layout, or back to a
+plain table; `item_partitions` maintains range partitions and
+`check_item_partitions` verifies that item queries are pruned.
+"""
+import json
+import re
+import time
+from contextlib import contextmanager
+from datetime import date
+
+from django.conf import settings
+from django.db import OperationalError, transaction
+
+
+HASH = 'hash'
+RANGE = 'range'
+METHODS = ('', HASH, RANGE)
+STRATEGIES = {'h': HASH, 'r': RANGE}
+PARTITION_KEYS = {HASH: 'tenant_id', RANGE: 'created_at'}
+
+LOCK_NOT_AVAILABLE = '55P03'
+MAX_NAME_LENGTH = 63
+
+INDEX_DEFINITION = re.compile(r'^(CREATE (?:UNIQUE )?INDEX )\S+ ON (?:ONLY )?\S+ ')
+MONTH_PARTITION = re.compile(r'_y(\d{4})m(\d{2})$')
+
+
+class IncompleteCopy(Exception):
+    """The rebuilt table does not hold every row of the table it replaces."""
+
+
+def partition_method(connection, table):
+    """Return how `table` is partitioned, or `''` for a plain table."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT partstrat FROM pg_partitioned_table '
+            'WHERE partrelid = to_regclass(%s)',
+            [table],
+        )
+        row = cursor.fetchone()
+    return STRATEGIES.get(row[0], row[0]) if row else ''
+
+
+def list_partitions(connection, table):
+    """Return `(name, bound, estimated rows, bytes)` of each partition."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT c.relname, pg_get_expr(c.relpartbound, c.oid), '
+            'GREATEST(c.reltuples, 0)::bigint, pg_total_relation_size(c.oid) '
+            'FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid '
+            'WHERE i.inhparent = to_regclass(%s) ORDER BY c.relname',
+            [table],
+        )
+        return cursor.fetchall()
+
+
+def add_months(day, months):
+    """Return the first day of the month `months` after that of `day`."""
+    index = day.year * 12 + day.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def month_partitions(table, start, end):
+    """Yield `(name, lower, upper)` of the months from `start` to `end`."""
+    month = add_months(start, 0)
+    while month <= end:
+        following = add_months(month, 1)
+        yield f'{table}_y{month.year}m{month.month:02d}', month, following
+        month = following
+
+
+def month_bound(month):
+    return f"'{month.isoformat()} 00:00:00+00'"
+
+
+def temporary_name(name, suffix):
+    """Return `name` with `suffix`, within PostgreSQL's name length."""
+    return name[:MAX_NAME_LENGTH - len(suffix)] + suffix
+
+
+def rewrite_index_definition(definition, name, table):
+    """Return an index definition from `pg_get_indexdef()` for another table."""
+    return INDEX_DEFINITION.sub(
+        lambda match: f'{match[1]}{name} ON {table} ', definition, count=1,
+    )
+
+
+def scanned_partitions(queryset, partitions):
+    """Return the sorted names of the `partitions` a queryset's plan reads."""
+    plan = json.loads(queryset.explain(format='json'))
+    relations = set()
+    nodes = [entry['Plan'] for entry in plan]
+    while nodes:
+        node = nodes.pop()
+        if 'Relation Name' in node:
+            relations.add(node['Relation Name'])
+        nodes.extend(node.get('Plans', []))
+    return sorted(relations & set(partitions))
+
+
+@contextmanager
+def short_lock(connection, lock_timeout):
+    """Open a transaction waiting at most `lock_timeout` seconds per lock.
+
+    Waiting for a lock queues every later query of the table behind the
+    waiting statement, so statements needing strong locks give up early
+    instead and are retried by `with_retries()`.
+    """
+    with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+        cursor.execute(f'SET LOCAL lock_timeout = {int(lock_timeout * 1000)}')
+        yield cursor
+
+
+def with_retries(function, attempts=10, pause=1):
+    """Call `function` until it does not time out waiting for a lock."""
+    for attempt in range(1, attempts + 1):
+        try:
+            return function()
+        except OperationalError as exc:
+            pgcode = getattr(exc.__cause__, 'pgcode', None)
+            if pgcode != LOCK_NOT_AVAILABLE or attempt == attempts:
+                raise
+            time.sleep(pause)
+
+
+class ItemTableRebuild:
+    """Rebuild the item table as partitioned, or plain, while it is in use.
+
+    1. An empty copy of the table is created with the new layout, its
+       partitions, and every index and foreign key of the table under a
+       temporary name.
+    2. A trigger applies each write to the table to the copy as well.
+    3. Existing rows are copied in batches of `batch_size` ids. Each batch
+       is its own short transaction and share-locks its source rows, so a
+       concurrent write lands in the copy either through the batch or
+       through the trigger.
+    4. The row counts of both tables are compared in one snapshot.
+    5. In one short transaction the largest ids of both tables are
+       compared again, the copy takes over the id sequence and the
+       table's name, and the old table is dropped. A copy found
+       incomplete raises `IncompleteCopy` and leaves the table as it is.
+
+    Reads and writes go on throughout, except during the swap, whose lock
+    is only waited for `lock_timeout` seconds at a time. PostgreSQL
+    requires the primary key of a partitioned table to contain the
+    partition key, so it becomes `(id, <partition key>)`; ids stay unique
+    as they come from one sequence. An interrupted rebuild starts over.
+    """
+    suffix = '_rebuild'
+
+    def __init__(self, connection, table, method, partitions=16, premake=3,
+                 batch_size=5000, pause=0, lock_timeout=5):
+        if method not in METHODS:
+            raise ValueError(f'Unknown partitioning method "{method}".')
+        self.connection = connection
+        self.table = table
+        self.method = method
+        self.partitions = partitions
+        self.premake = premake
+        self.batch_size = batch_size
+        self.pause = pause
+        self.lock_timeout = lock_timeout
+        self.new = temporary_name(table, self.suffix)
+        self.sequence = f'{table}_id_seq'
+        self.new_sequence = temporary_name(self.sequence, self.suffix)
+        self.function = temporary_name(f'{table}_sync', self.suffix)
+        self.renames = []
+
+    @classmethod
+    def from_settings(cls, connection, table, method=None):
+        """Return a rebuild configured by `settings.ITEMS_PARTITIONING`."""
+        options = settings.ITEMS_PARTITIONING
+        if method is None:
+            method = options['METHOD']
+        return cls(
+            connection,
+            table,
+            method,
+            partitions=options['PARTITIONS'],
+            premake=options['PREMAKE'],
+            batch_size=options['BATCH_SIZE'],
+            pause=options['PAUSE'],
+            lock_timeout=options['LOCK_TIMEOUT'],
+        )
+
+    def describe(self):
+        if self.method == HASH:
+            return f'{self.partitions} hash partitions of tenant_id'
+        if self.method == RANGE:
+            return 'monthly range partitions of created_at'
+        return 'a plain table'
+
+    def needed(self):
+        """Return whether the table is not laid out as requested yet."""
+        current = partition_method(self.connection, self.table)
+        if current != self.method:
+            return True
+        if current == HASH:
+            return len(list_partitions(self.connection, self.table)) != self.partitions
+        return False
+
+    def run(self):
+        """Rebuild the table, yielding `(copied, last id, max id)` per batch."""
+        self.clean_up()
+        self.create()
+        with_retries(self.install_trigger)
+        yield from self.copy()
+        self.verify()
+        with_retries(self.swap)
+        self.execute(f'ANALYZE {self.quote(self.table)}')
+
+    def quote(self, name):
+        return self.connection.ops.quote_name(name)
+
+    def execute(self, sql, params=None):
+        with self.connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchall() if cursor.description else None
+
+    def clean_up(self):
+        """Drop what an interrupted rebuild left behind."""
+        self.execute(
+            f'DROP TRIGGER IF EXISTS {self.quote(self.function)} '
+            f'ON {self.quote(self.table)}'
+        )
+        self.execute(f'DROP FUNCTION IF EXISTS {self.quote(self.function)}()')
+        self.execute(f'DROP TABLE IF EXISTS {self.quote(self.new)}')
+        self.execute(f'DROP SEQUENCE IF EXISTS {self.quote(self.new_sequence)}')
+
+    def create(self):
+        """Create the empty copy with its partitions, indexes and keys."""
+        table, new = self.quote(self.table), self.quote(self.new)
+        key = PARTITION_KEYS.get(self.method)
+        self.renames = []
+        partition_by = ''
+        if key:
+            partition_by = f' PARTITION BY {self.method.upper()} ({self.quote(key)})'
+        self.execute(
+            f'CREATE TABLE {new} (LIKE {table} INCLUDING DEFAULTS '
+            f'INCLUDING CONSTRAINTS INCLUDING STORAGE){partition_by}'
+        )
+        self.execute(f'ALTER TABLE {new} ALTER COLUMN id DROP DEFAULT')
+        self.execute(f'CREATE SEQUENCE {self.quote(self.new_sequence)} AS bigint')
+
+        primary_key = ', '.join(self.quote(column) for column in ['id', key] if column)
+        for name, definition in self.constraints():
+            temporary = temporary_name(name, self.suffix)
+            if definition.startswith('PRIMARY KEY'):
+                definition = f'PRIMARY KEY ({primary_key})'
+            self.execute(
+                f'ALTER TABLE {new} ADD CONSTRAINT {self.quote(temporary)} {definition}'
+            )
+            self.renames.append(
+                f'ALTER TABLE {{table}} RENAME CONSTRAINT {self.quote(temporary)} '
+                f'TO {self.quote(name)}'
+            )
+
+        for name, bound in self.partition_bounds():
+            self.execute(f'CREATE TABLE {self.quote(name)} PARTITION OF {new} {bound}')
+
+        for name, definition in self.indexes():
+            temporary = temporary_name(name, self.suffix)
+            self.execute(
+                rewrite_index_definition(definition, self.quote(temporary), new)
+            )
+            self.renames.append(
+                f'ALTER INDEX {self.quote(temporary)} RENAME TO {self.quote(name)}'
+            )
+
+    def constraints(self):
+        """Return the names and definitions of the primary and foreign keys."""
+        return self.execute(
+            'SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint '
+            "WHERE conrelid = to_regclass(%s) AND contype IN ('p', 'f') "
+            'ORDER BY contype DESC, conname',
+            [self.table],
+        )
+
+    def indexes(self):
+        """Return the names and definitions of the other indexes."""
+        return self.execute(
+            'SELECT i.relname, pg_get_indexdef(i.oid) FROM pg_index x '
+            'JOIN pg_class i ON i.oid = x.indexrelid '
+            'WHERE x.indrelid = to_regclass(%s) AND NOT x.indisprimary '
+            'ORDER BY i.relname',
+            [self.table],
+        )
+
+    def partition_bounds(self):
+        """Return the names and bound clauses of the partitions to create.
+
+        Hash partitions are named after their modulus, so rebuilding into
+        a different number of them does not clash with the current ones.
+        Range partitions cover the month of the oldest row up to `premake`
+        months ahead, with a default partition for anything else.
+        """
+        if self.method == HASH:
+            return [
+                (
+                    f'{self.table}_h{self.partitions}_{remainder}',
+                    f'FOR VALUES WITH (MODULUS {self.partitions}, '
+                    f'REMAINDER {remainder})',
+                )
+                for remainder in range(self.partitions)
+            ]
+        if self.method == RANGE:
+            today = date.today()
+            oldest = self.execute(
+                f'SELECT created_at FROM {self.quote(self.table)} ORDER BY id LIMIT 1'
+            )
+            start = oldest[0][0].date() if oldest else today
+            bounds = [
+                (
+                    name,
+                    f'FOR VALUES FROM ({month_bound(lower)}) TO ({month_bound(upper)})',
+                )
+                for name, lower, upper in month_partitions(
+                    self.table, start, add_months(today, self.premake),
+                )
+            ]
+            return [*bounds, (f'{self.table}_default', 'DEFAULT')]
+        return []
+
+    def install_trigger(self):
+        """Apply every later write of the table to the copy as well."""
+        key = PARTITION_KEYS.get(self.method)
+        match = 'id = OLD.id'
+        if key:
+            match += f' AND {self.quote(key)} = OLD.{self.quote(key)}'
+        function = self.quote(self.function)
+        with short_lock(self.connection, self.lock_timeout) as cursor:
+            cursor.execute(
+                f'CREATE FUNCTION {function}() RETURNS trigger '
+                f'LANGUAGE plpgsql AS $$ BEGIN '
+                f"IF TG_OP <> 'INSERT' THEN "
+                f'DELETE FROM {self.quote(self.new)} WHERE {match}; '
+                f'END IF; '
+                f"IF TG_OP <> 'DELETE' THEN "
+                f'INSERT INTO {self.quote(self.new)} SELECT NEW.*; '
+                f'END IF; '
+                f'RETURN NULL; END $$'
+            )
+            cursor.execute(
+                f'CREATE TRIGGER {function} AFTER INSERT OR UPDATE OR DELETE '
+                f'ON {self.quote(self.table)} '
+                f'FOR EACH ROW EXECUTE FUNCTION {function}()'
+            )
+
+    def copy(self):
+        """Copy the rows that existed when the trigger was installed."""
+        table, new = self.quote(self.table), self.quote(self.new)
+        [(first_id, max_id)] = self.execute(f'SELECT MIN(id), MAX(id) FROM {table}')
+        if first_id is None:
+            return
+        copied, last_id = 0, first_id - 1
+        while last_id < max_id:
+            upper = self.execute(
+                f'SELECT id FROM {table} WHERE id > %s ORDER BY id OFFSET %s LIMIT 1',
+                [last_id, self.batch_size - 1],
+            )
+            upper_id = min(upper[0][0], max_id) if upper else max_id
+            with transaction.atomic(using=self.connection.alias):
+                with self.connection.cursor() as cursor:
+                    cursor.execute(
+                        f'WITH batch AS (SELECT * FROM {table} '
+                        f'WHERE id > %s AND id <= %s FOR SHARE) '
+                        f'INSERT INTO {new} SELECT * FROM batch ON CONFLICT DO NOTHING',
+                        [last_id, upper_id],
+                    )
+                    copied += cursor.rowcount
+            last_id = upper_id
+            yield copied, last_id, max_id
+            if self.pause:
+                time.sleep(self.pause)
+
+    def verify(self):
+        """Raise `IncompleteCopy` unless both tables hold as many rows.
+
+        The trigger writes to the copy in the transaction of each write to
+        the table, so counts taken in one snapshot match while writes go
+        on; this reads both tables, but without blocking anything.
+        """
+        table, new = self.quote(self.table), self.quote(self.new)
+        [(rows, copied)] = self.execute(
+            f'SELECT (SELECT COUNT(*) FROM {table}), (SELECT COUNT(*) FROM {new})'
+        )
+        if rows != copied:
+            raise IncompleteCopy(f'{self.new} has {copied} of {rows} rows.')
+
+    def swap(self):
+        """Replace the table with the copy in one short transaction."""
+        table, new = self.quote(self.table), self.quote(self.new)
+        with short_lock(self.connection, self.lock_timeout) as cursor:
+            cursor.execute(f'LOCK TABLE {table} IN ACCESS EXCLUSIVE MODE')
+            # Cheap on both primary keys; catches writes the trigger missed
+            # since `verify()`.
+            cursor.execute(
+                f'SELECT (SELECT MAX(id) FROM {table}), (SELECT MAX(id) FROM {new})'
+            )
+            last_id, last_copied_id = cursor.fetchone()
+            if last_id != last_copied_id:
+                raise IncompleteCopy(
+                    f'{self.new} ends at id {last_copied_id}, not {last_id}.'
+                )
+            cursor.execute(
+                'SELECT setval(%s::regclass, '
+                "nextval(pg_get_serial_sequence(%s, 'id')))",
+                [self.new_sequence, self.table],
+            )
+            cursor.execute(f'DROP TABLE {table}')
+            cursor.execute(f'DROP FUNCTION {self.quote(self.function)}()')
+            cursor.execute(f'ALTER TABLE {new} RENAME TO {table}')
+            cursor.execute(
+                f'ALTER SEQUENCE {self.quote(self.new_sequence)} '
+                f'RENAME TO {self.quote(self.sequence)}'
+            )
+            cursor.execute(
+                f'ALTER SEQUENCE {self.quote(self.sequence)} OWNED BY {table}.id'
+            )
+            cursor.execute(
+                f'ALTER TABLE {table} ALTER COLUMN id '
+                f'SET DEFAULT nextval(%s::regclass)',
+                [self.sequence],
+            )
+            for rename in self.renames:
+                cursor.execute(rename.format(table=table))
+
+
+def create_month_partitions(connection, table, until, lock_timeout=5):
+    """Attach the missing monthly partitions from now to `until`.
+
+    Each partition is created as a table of its own and then attached,
+    which unlike `CREATE TABLE ... PARTITION OF` does not block queries
+    of the partitioned table. Rows of the month already in the default
+    partition are moved into the new one in the same transaction; the
+    default partition is locked and scanned meanwhile, so partitions
+    should be created before their month starts. Returns the names of
+    the new partitions.
+    """
+    quote = connection.ops.quote_name
+    partitions = list_partitions(connection, table)
+    existing = {name for name, *_rest in partitions}
+    default = next(
+        (name for name, bound, *_rest in partitions if bound == 'DEFAULT'),
+        None,
+    )
+    created = []
+    for name, lower, upper in month_partitions(table, date.today(), until):
+        if name in existing:
+            continue
+
+        def attach():
+            with short_lock(connection, lock_timeout) as cursor:
+                cursor.execute(
+                    f'CREATE TABLE {quote(name)} (LIKE {quote(table)} '
+                    f'INCLUDING DEFAULTS INCLUDING CONSTRAINTS INCLUDING STORAGE)'
+                )
+                if default:
+                    # Attaching fails while the default partition holds
+                    # rows of the month, and locks it exclusively anyway.
+                    cursor.execute(
+                        f'LOCK TABLE {quote(default)} IN ACCESS EXCLUSIVE MODE'
+                    )
+                    cursor.execute(
+                        f'WITH moved AS (DELETE FROM {quote(default)} '
+                        f'WHERE created_at >= {month_bound(lower)} '
+                        f'AND created_at < {month_bound(upper)} RETURNING *) '
+                        f'INSERT INTO {quote(name)} SELECT * FROM moved'
+                    )
+                cursor.execute(
+                    f'ALTER TABLE {quote(table)} ATTACH PARTITION {quote(name)} '
+                    f'FOR VALUES FROM ({month_bound(lower)}) TO ({month_bound(upper)})'
+                )
+
+        with_retries(attach)
+        created.append(name)
+    return created
+
+
+def detach_month_partitions(connection, table, before, drop=False, lock_timeout=5):
+    """Detach, and optionally drop, the monthly partitions ending by `before`.
+
+    Returns the names of the detached partitions. Their items are no
+    longer served by the API; detached tables can be archived and dropped
+    later.
+    """
+    quote = connection.ops.quote_name
+    detached = []
+    for name, *_rest in list_partitions(connection, table):
+        match = MONTH_PARTITION.search(name)
+        if match is None:
+            continue
+        month = date(int(match[1]), int(match[2]), 1)
+        if add_months(month, 1) > before:
+            continue
+
+        def detach():
+            with short_lock(connection, lock_timeout) as cursor:
+                cursor.execute(
+                    f'ALTER TABLE {quote(table)} DETACH PARTITION {quote(name)}'
+                )
+                if drop:
+                    cursor.execute(f'DROP TABLE {quote(name)}')
+
+        with_retries(detach)
+        detached.append(name)
+    return detached
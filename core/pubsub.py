@@ -0,0 +1,221 @@
+"""
+In-process publish/subscribe for pushing events to connected clients.
+
+`publish()` hands a JSON serializable message for a channel to the
+backend named by `settings.PUBSUB['BACKEND']`, which delivers it to the
+`hub` of every process serving the API:
+
+- `PostgresBackend` sends messages with `NOTIFY`; each process LISTENs on
+  one dedicated connection, from a thread started with the first
+  subscription.
+- `InMemoryBackend` delivers to the publishing process only, and is meant
+  for tests, development and single process deployments.
+
+The hub wakes the channel's subscriptions on their event loops. A
+subscription keeps only the latest message, so an idle client costs a
+coroutine and an `asyncio.Event`, and a slow one sees the most recent
+state instead of a backlog. Messages are not persisted: a client must be
+able to catch up from its own state, like the item change feed allows.
+"""
+import asyncio
+import json
+import logging
+import select
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import connections
+from django.utils.module_loading import import_string
+
+
+logger = logging.getLogger('api.pubsub')
+
+_backends = {}
+
+
+class Subscription:
+    """Latest message of a channel, awaited by one client."""
+
+    def __init__(self, hub, channel):
+        self.hub = hub
+        self.channel = channel
+        self.loop = asyncio.get_running_loop()
+        self.message = None
+        self._event = asyncio.Event()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def deliver(self, message):
+        """Keep `message` and wake the client; called on the event loop."""
+        self.message = message
+        self._event.set()
+
+    async def get(self, timeout=None):
+        """Return the next message, or `None` after `timeout` seconds."""
+        try:
+            await asyncio.wait_for(self._event.wait(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        self._event.clear()
+        return self.message
+
+    def close(self):
+        self.hub.unsubscribe(self)
+
+
+def _deliver(subscriptions, message):
+    for subscription in subscriptions:
+        subscription.deliver(message)
+
+
+class Hub:
+    """Subscriptions of this process, by channel.
+
+    Messages may be dispatched from any thread: they are handed to each
+    subscribed event loop with a single `call_soon_threadsafe()`.
+    """
+
+    def __init__(self):
+        self.channels = defaultdict(set)
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def subscribe(self, channel):
+        """Subscribe the running event loop to `channel`."""
+        get_backend().start()
+        subscription = Subscription(self, channel)
+        with self._lock:
+            self.channels[channel].add(subscription)
+            self.count += 1
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self.channels.get(subscription.channel, set())
+            if subscription in subscriptions:
+                subscriptions.remove(subscription)
+                self.count -= 1
+                if not subscriptions:
+                    del self.channels[subscription.channel]
+
+    def subscribers(self, channel):
+        """Return the number of subscriptions to `channel` in this process."""
+        with self._lock:
+            return len(self.channels.get(channel, ()))
+
+    def dispatch(self, channel, message):
+        """Deliver `message` to this process's subscriptions of `channel`."""
+        with self._lock:
+            subscriptions = list(self.channels.get(channel, ()))
+        by_loop = defaultdict(list)
+        for subscription in subscriptions:
+            by_loop[subscription.loop].append(subscription)
+        for loop, loop_subscriptions in by_loop.items():
+            try:
+                loop.call_soon_threadsafe(_deliver, loop_subscriptions, message)
+            except RuntimeError:
+                # The loop closed; its subscriptions are going away.
+                pass
+
+
+hub = Hub()
+
+
+def get_backend():
+    """Return the backend configured in `settings.PUBSUB['BACKEND']`."""
+    path = settings.PUBSUB['BACKEND']
+    backend = _backends.get(path)
+    if backend is None:
+        backend = _backends[path] = import_string(path)()
+    return backend
+
+
+def publish(channel, message):
+    """Publish `message` to the subscribers of `channel` in every process."""
+    get_backend().publish(channel, message)
+
+
+def subscribe(channel):
+    """Return a subscription of the running event loop to `channel`."""
+    return hub.subscribe(channel)
+
+
+class InMemoryBackend:
+    """Deliver messages to the subscribers of this process only."""
+
+    def publish(self, channel, message):
+        # Round trip through JSON as PostgreSQL would.
+        hub.dispatch(channel, json.loads(json.dumps(message)))
+
+    def start(self):
+        pass
+
+
+class PostgresBackend:
+    """Deliver messages to every process through PostgreSQL `NOTIFY`.
+
+    Messages are sent on the `default` database connection as JSON
+    payloads, limited to 8000 bytes by PostgreSQL, on the notification
+    channel `PUBSUB['CHANNEL']`. The listening thread holds a connection
+    of its own, so it must reach PostgreSQL directly and not through
+    PgBouncer in transaction pooling mode. It reconnects after errors;
+    messages sent while it is disconnected are lost.
+    """
+
+    def __init__(self):
+        self.channel = settings.PUBSUB['CHANNEL']
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def publish(self, channel, message):
+        with connections['default'].cursor() as cursor:
+            cursor.execute(
+                'SELECT pg_notify(%s, %s)',
+                [self.channel, json.dumps([channel, message])],
+            )
+
+    def start(self):
+        """Start the listening thread of this process if it is not running."""
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self.listen,
+                    name='pubsub-listener',
+                    daemon=True,
+                )
+                self._thread.start()
+
+    def listen(self):
+        while True:
+            connection = connections.create_connection('default')
+            try:
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        f'LISTEN {connection.ops.quote_name(self.channel)}'
+                    )
+                self.receive(connection.connection)
+            except Exception:
+                logger.exception('Pub/sub listener failed, reconnecting.')
+                time.sleep(settings.PUBSUB['RECONNECT_DELAY'])
+            finally:
+                connection.close()
+
+    def receive(self, raw_connection):
+        """Dispatch notifications of a listening psycopg2 connection."""
+        while True:
+            if not select.select([raw_connection], [], [], 60)[0]:
+                # Make sure a quiet connection has not silently dropped.
+                with raw_connection.cursor() as cursor:
+                    cursor.execute('SELECT 1')
+                continue
+            raw_connection.poll()
+            while raw_connection.notifies:
+                notify = raw_connection.notifies.pop(0)
+                channel, message = json.loads(notify.payload)
+                hub.dispatch(channel, message)
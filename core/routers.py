@@ -0,0 +1,63 @@
+"""
+Database routers shared by the API apps.
+"""
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+
+# Reads go to the primary unless a request has explicitly allowed replica
+# reads, so management commands and background work always see their own
+# writes. Holds the alias of the replica to read from, or `None`.
+_replica = ContextVar('replica', default=None)
+
+
+@contextmanager
+def replica_reads(enabled=True):
+    """Allow (or forbid) routing reads to replicas within the block.
+
+    One replica is picked for the whole block: replicas lag by different
+    amounts, and reads of one request from several of them could pair
+    the tenant's items version with rows older than it.
+    """
+    replicas = settings.DATABASE_REPLICAS
+    token = _replica.set(random.choice(replicas) if enabled and replicas else None)
+    try:
+        yield
+    finally:
+        _replica.reset(token)
+
+
+class PrimaryReplicaRouter:
+    """Send writes to the primary and allowed reads to the block's replica.
+
+    Replica aliases are listed in `settings.DATABASE_REPLICAS`; without any,
+    every query uses the primary. Tokens are always read from the primary
+    so that a token returned by the login endpoint authenticates right
+    away, before the replicas have caught up.
+    """
+    primary = DEFAULT_DB_ALIAS
+    primary_models = {'core.authtoken'}
+
+    def db_for_read(self, model, **hints):
+        replica = _replica.get()
+        if replica is None or model._meta.label_lower in self.primary_models:
+            return self.primary
+        return replica
+
+    def db_for_write(self, model, **hints):
+        return self.primary
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {self.primary, *settings.DATABASE_REPLICAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
@@ -0,0 +1,121 @@
+"""
+Signal handlers for the core models.
+"""
+from functools import partial
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from core.authentication import revoked_tokens, token_cache
+from core.metrics import install_query_recorder
+from core.models import AuthToken, Item, ItemSummary, ItemTombstone
+
+
+@receiver(connection_created)
+def record_connection_queries(sender, connection, **kwargs):
+    """Count the queries of every connection in the request metrics."""
+    install_query_recorder(connection)
+
+
+@receiver(post_delete, sender=AuthToken)
+def invalidate_deleted_token(sender, instance, **kwargs):
+    """Stop authenticating a token as soon as it is deleted."""
+    token_cache.invalidate(instance.key)
+
+
+@receiver(post_save, sender=AuthToken)
+def index_revoked_token(sender, instance, **kwargs):
+    """Stop authenticating a revoked token in this process right away."""
+    if instance.revoked_at is not None:
+        revoked_tokens.add(instance.pk, instance.expires_at)
+        token_cache.invalidate(instance.key)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def invalidate_saved_user(sender, instance, using, **kwargs):
+    """Drop cached tokens of a user whose record changed.
+
+    This covers deactivation as well as profile and password updates made
+    through `TenantSerializer.update`. The entries are dropped again once
+    the change commits, as a request meanwhile may have cached the user
+    as it was before.
+    """
+    token_cache.invalidate_user(instance.pk)
+    transaction.on_commit(
+        partial(token_cache.invalidate_user, instance.pk),
+        using=using,
+    )
+
+
+@receiver(post_delete, sender=Item)
+def record_item_tombstone(sender, instance, using, origin=None, **kwargs):
+    """Record a deleted item under the next change sequence number.
+
+    Saves take their number in `Item.save()`; deletes, including queryset
+    deletes, send this signal inside the deleting transaction. Items
+    deleted along with their tenant need no tombstone: the tenant's feed
+    goes with it.
+    """
+    if _is_tenant_delete(origin):
+        return
+    ItemTombstone.objects.using(using).create(
+        tenant_id=instance.tenant_id,
+        item_id=instance.pk,
+        change_seq=get_user_model().objects.db_manager(using).next_item_seq(
+            instance.tenant_id,
+        ),
+    )
+
+
+def _is_tenant_delete(origin):
+    """Return whether `origin`, what `delete()` was called on, is tenants."""
+    model = getattr(origin, 'model', type(origin))
+    return isinstance(model, type) and issubclass(model, get_user_model())
+
+
+def _price(value):
+    return None if value is None else Item._meta.get_field('price').to_python(value)
+
+
+@receiver(post_save, sender=Item)
+def update_summary_on_save(sender, instance, created, **kwargs):
+    """Apply a saved item to its tenant's summary, if summaries are on."""
+    price = _price(instance.price)
+    old_price = _price(getattr(instance, '_loaded_price', None))
+    instance._loaded_price = instance.price
+    if not settings.ITEMS_STATS_SUMMARY:
+        return
+
+    if created:
+        ItemSummary.objects.apply_change(
+            instance.tenant_id, count=1, price_delta=price, added_price=price,
+        )
+    elif old_price is None:
+        # The previous price is unknown, so leave the summary behind the
+        # tenant's items version and let the next read rebuild it.
+        return
+    elif price != old_price:
+        ItemSummary.objects.apply_change(
+            instance.tenant_id,
+            price_delta=price - old_price,
+            added_price=price,
+            removed_price=old_price,
+        )
+    else:
+        ItemSummary.objects.apply_change(instance.tenant_id)
+
+
+@receiver(post_delete, sender=Item)
+def update_summary_on_delete(sender, instance, origin=None, **kwargs):
+    """Remove a deleted item from its tenant's summary, if summaries are on."""
+    if not settings.ITEMS_STATS_SUMMARY or _is_tenant_delete(origin):
+        return
+
+    price = _price(instance.price)
+    ItemSummary.objects.apply_change(
+        instance.tenant_id, count=-1, price_delta=-price, removed_price=price,
+    )
@@ -0,0 +1,274 @@
+"""
+Background tasks run outside the request cycle.
+
+`@task` turns a function into a `Task`; calling it still runs the function,
+while `enqueue()` hands the call to the backend named by
+`settings.TASKS['BACKEND']`:
+
+- `DatabaseBackend` stores calls as `QueuedTask` rows, which the worker
+  threads of `manage.py runworker` claim with `SELECT ... FOR UPDATE SKIP
+  LOCKED` and retry with exponential backoff when they raise.
+- `InMemoryBackend` keeps calls in a list until `run_pending()`.
+- `ImmediateBackend` runs calls once the enqueuing transaction commits.
+
+The last two run in-process and are meant for tests and development.
+Arguments must be JSON serializable with every backend.
+"""
+import json
+import logging
+import os
+import random
+import socket
+import threading
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import (
+    DatabaseError,
+    close_old_connections,
+    connections,
+    transaction,
+)
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from core.models import QueuedTask
+
+
+logger = logging.getLogger('api.tasks')
+
+tasks = {}
+
+_backends = {}
+
+
+class Task:
+    """A function that can be run later by a worker."""
+
+    def __init__(self, func, name=None, queue='default', max_attempts=None):
+        self.func = func
+        self.name = name or f'{func.__module__}.{func.__qualname__}'
+        self.queue = queue
+        self.max_attempts = max_attempts
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def __repr__(self):
+        return f'<Task {self.name}>'
+
+    def get_max_attempts(self):
+        return self.max_attempts or settings.TASKS['MAX_ATTEMPTS']
+
+    def enqueue(self, *args, **kwargs):
+        """Queue a call of the task with the configured backend."""
+        return get_backend().enqueue(self, list(args), kwargs)
+
+
+def task(func=None, *, name=None, queue='default', max_attempts=None):
+    """Register a function as a task, with or without options.
+
+    The task name defaults to the function's dotted path, under which
+    workers find it even if nothing imported its module yet.
+    """
+    def register(func):
+        registered = Task(func, name=name, queue=queue, max_attempts=max_attempts)
+        tasks[registered.name] = registered
+        return registered
+
+    if func is not None:
+        return register(func)
+    return register
+
+
+def get_task(name):
+    """Return the task called `name`, importing it if needed."""
+    registered = tasks.get(name)
+    if registered is None:
+        registered = import_string(name)
+        if not isinstance(registered, Task):
+            raise ImportError(f'{name} is not a task.')
+    return registered
+
+
+def get_backend():
+    """Return the backend configured in `settings.TASKS['BACKEND']`."""
+    path = settings.TASKS['BACKEND']
+    backend = _backends.get(path)
+    if backend is None:
+        backend = _backends[path] = import_string(path)()
+    return backend
+
+
+def retry_delay(attempts):
+    """Return the seconds to wait before retrying after `attempts` runs.
+
+    The delay doubles with every attempt up to `RETRY_MAX_DELAY`, and is
+    jittered so tasks that failed together do not retry together.
+    """
+    options = settings.TASKS
+    delay = min(
+        options['RETRY_DELAY'] * 2 ** (attempts - 1),
+        options['RETRY_MAX_DELAY'],
+    )
+    return delay * random.uniform(0.5, 1)
+
+
+class DatabaseBackend:
+    """Queue calls in the `QueuedTask` table for `runworker` processes.
+
+    The row is written in the caller's transaction, so a call enqueued
+    by a request that rolls back is never run.
+    """
+
+    def enqueue(self, task, args, kwargs):
+        return QueuedTask.objects.create(
+            name=task.name,
+            queue=task.queue,
+            args=args,
+            kwargs=kwargs,
+            max_attempts=task.get_max_attempts(),
+        )
+
+
+class InMemoryBackend:
+    """Keep calls in a list until `run_pending()` runs them.
+
+    Calls are retried right away, without backoff, and the error of a call
+    failing every attempt is raised, so tests notice it.
+    """
+
+    def __init__(self):
+        self.pending = []
+        self._lock = threading.Lock()
+
+    def enqueue(self, task, args, kwargs):
+        # Round trip through JSON as the database would.
+        args, kwargs = json.loads(json.dumps([args, kwargs]))
+        with self._lock:
+            self.pending.append((task, args, kwargs))
+
+    def run_pending(self):
+        """Run queued calls, including those they enqueue, and count them."""
+        count = 0
+        while True:
+            with self._lock:
+                if not self.pending:
+                    return count
+                task, args, kwargs = self.pending.pop(0)
+            for attempt in range(1, task.get_max_attempts() + 1):
+                try:
+                    task(*args, **kwargs)
+                    break
+                except Exception:
+                    if attempt == task.get_max_attempts():
+                        raise
+            count += 1
+
+    def clear(self):
+        with self._lock:
+            self.pending.clear()
+
+
+class ImmediateBackend(InMemoryBackend):
+    """Run calls in-process as soon as the current transaction commits."""
+
+    def enqueue(self, task, args, kwargs):
+        super().enqueue(task, args, kwargs)
+        transaction.on_commit(self.run_pending)
+
+
+class Worker:
+    """Claim and run tasks of the database queue.
+
+    Tasks run in autocommit mode, one after the other; a task needing a
+    transaction opens it itself. Each task's lock is renewed when it
+    starts, so the claim `TIMEOUT` applies to every task of a batch on
+    its own, and a task another worker has claimed since is skipped. A
+    successful task's row is deleted, a failing one is queued again after
+    `retry_delay()` until it has run `max_attempts` times, then marked
+    failed.
+    """
+
+    def __init__(self, queues=('default',), batch_size=None, name=None):
+        options = settings.TASKS
+        self.queues = list(queues)
+        self.batch_size = batch_size or options['BATCH_SIZE']
+        self.timeout = options['TIMEOUT']
+        self.name = name or (
+            f'{socket.gethostname()}:{os.getpid()}:'
+            f'{threading.current_thread().name}'
+        )
+
+    def run(self, stop, poll_interval=None, burst=False):
+        """Run tasks until `stop` is set, or the queue is empty if `burst`."""
+        poll_interval = poll_interval or settings.TASKS['POLL_INTERVAL']
+        try:
+            while not stop.is_set():
+                close_old_connections()
+                try:
+                    claimed = self.run_once()
+                except DatabaseError:
+                    logger.exception('Worker %s could not claim tasks.', self.name)
+                    stop.wait(poll_interval)
+                    continue
+                if not claimed:
+                    if burst:
+                        return
+                    stop.wait(poll_interval)
+        finally:
+            connections.close_all()
+
+    def run_once(self):
+        """Claim a batch of due tasks, run them and return their number."""
+        claimed = QueuedTask.objects.claim(
+            self.name, self.queues, self.batch_size, self.timeout,
+        )
+        for queued in claimed:
+            self.execute(queued)
+        return len(claimed)
+
+    def execute(self, queued):
+        if queued.attempts > queued.max_attempts:
+            # Claimed again after its worker died during the last attempt.
+            self.fail(queued, 'Worker lost while running the task.')
+            return
+        if not self.owned(queued).update(locked_at=timezone.now()):
+            # Earlier tasks of the batch ran past the timeout, and another
+            # worker claimed this one meanwhile.
+            return
+        try:
+            get_task(queued.name).func(*queued.args, **queued.kwargs)
+        except Exception:
+            logger.exception(
+                'Task %s failed (attempt %d of %d).',
+                queued.name, queued.attempts, queued.max_attempts,
+            )
+            error = traceback.format_exc()
+            if queued.attempts >= queued.max_attempts:
+                self.fail(queued, error)
+            else:
+                self.owned(queued).update(
+                    status=QueuedTask.Status.QUEUED,
+                    run_at=timezone.now() + timedelta(
+                        seconds=retry_delay(queued.attempts),
+                    ),
+                    locked_by='',
+                    locked_at=None,
+                    last_error=error,
+                )
+        else:
+            self.owned(queued).delete()
+
+    def fail(self, queued, error):
+        self.owned(queued).update(
+            status=QueuedTask.Status.FAILED,
+            locked_by='',
+            locked_at=None,
+            last_error=error,
+        )
+
+    def owned(self, queued):
+        """Return the task's row unless another worker has claimed it since."""
+        return QueuedTask.objects.filter(pk=queued.pk, locked_by=self.name)
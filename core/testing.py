@@ -0,0 +1,105 @@
+"""
+Query budget helpers for the test suite.
+
+`query_budget()` records every query run in a block (or a decorated test)
+and fails when there are more than allowed, listing the queries grouped by
+shape so an N+1 shows up as one shape repeated N times.
+`QueryBudgetMixin.assertQueryBudget()` runs a request at several data sizes
+and additionally fails when the query count grows with the data.
+"""
+import re
+from collections import Counter
+from contextlib import ContextDecorator
+
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test.utils import CaptureQueriesContext
+
+
+STRING = re.compile(r"'(?:[^']|'')*'")
+NUMBER = re.compile(r'(?<![\w"])-?\d+(?:\.\d+)?(?:e[+-]?\d+)?\b', re.IGNORECASE)
+IN_LIST = re.compile(r'\bIN \((?:\?, )*\?\)', re.IGNORECASE)
+SPACES = re.compile(r'\s+')
+
+
+def query_shape(sql):
+    """Return `sql` with its literals replaced, so repeats compare equal."""
+    shape = STRING.sub('?', sql)
+    shape = NUMBER.sub('?', shape)
+    shape = IN_LIST.sub('IN (...)', shape)
+    return SPACES.sub(' ', shape).strip()
+
+
+def format_report(label, queries, budget):
+    """Return a failure message listing `queries` grouped by shape."""
+    shapes = Counter(query_shape(query['sql']) for query in queries)
+    lines = [f'{label}: {len(queries)} queries, budget {budget}.']
+    repeated = [(shape, n) for shape, n in shapes.most_common() if n > 1]
+    if repeated:
+        lines.append('Repeated query shapes:')
+        lines.extend(f'  {n} x {shape}' for shape, n in repeated)
+    single = [shape for shape, n in shapes.items() if n == 1]
+    if single:
+        lines.append('Other queries:')
+        lines.extend(f'  1 x {shape}' for shape in single)
+    return '\n'.join(lines)
+
+
+class query_budget(ContextDecorator):
+    """Fail if the block runs more than `max_queries` queries.
+
+    Usable as a context manager, which exposes the captured queries as
+    `.queries` afterwards, or as a decorator of test methods.
+    """
+
+    def __init__(self, max_queries, using=DEFAULT_DB_ALIAS, label='Block'):
+        self.max_queries = max_queries
+        self.using = using
+        self.label = label
+        self.queries = []
+
+    def __enter__(self):
+        self.context = CaptureQueriesContext(connections[self.using])
+        self.context.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.context.__exit__(exc_type, exc_value, traceback)
+        self.queries = self.context.captured_queries
+        if exc_type is None and len(self.queries) > self.max_queries:
+            raise AssertionError(
+                format_report(self.label, self.queries, self.max_queries)
+            )
+        return False
+
+
+class QueryBudgetMixin:
+    """Assert request query counts independently of the amount of data.
+
+    `assertQueryBudget()` grows the data with `seed(count)` to each of
+    `sizes`, calls `request()` and checks the query count stays within
+    `max_queries` and is the same at every size.
+    """
+    budget_sizes = (1, 10, 1000)
+
+    def assertQueryBudget(self, label, max_queries, seed, request, sizes=None):
+        captured = {}
+        seeded = 0
+        for size in sizes or self.budget_sizes:
+            seed(size - seeded)
+            seeded = size
+            self.prepare_budget_request()
+            with query_budget(max_queries, label=f'{label} ({size} rows)') as budget:
+                request()
+            captured[size] = budget.queries
+
+        counts = {size: len(queries) for size, queries in captured.items()}
+        smallest = min(counts.values())
+        for size, queries in captured.items():
+            if len(queries) != smallest:
+                raise AssertionError(
+                    f'{label}: query count changes with the rows {counts}.\n'
+                    + format_report(f'{label} ({size} rows)', queries, smallest)
+                )
+
+    def prepare_budget_request(self):
+        """Reset state such as caches that would hide queries."""
@@ -0,0 +1,236 @@
+"""
+Tests for the cached token authentication.
+"""
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.utils import timezone
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.authentication import (
+    RevokedTokenIndex,
+    TokenCache,
+    revoked_tokens,
+    token_cache,
+)
+from core.models import AuthToken
+
+
+ITEMS_URL = reverse('items:item-list')
+ME_URL = reverse('tenants:me')
+
+
+class TokenCacheTests(TestCase):
+    """Test the token cache container."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='test@example.com',
+            password='testpass123',
+        )
+        self.token = AuthToken.objects.issue(self.user)
+
+    def test_get_counts_hits_and_misses(self):
+        """Test lookups update the hit and miss counters."""
+        cache = TokenCache(max_size=10, timeout=60)
+
+        self.assertIsNone(cache.get(self.token.key))
+        cache.set(self.token.key, self.user, self.token)
+        user, token = cache.get(self.token.key)
+
+        self.assertEqual(user, self.user)
+        self.assertEqual(token, self.token)
+        self.assertEqual(cache.stats(), {'hits': 1, 'misses': 1, 'size': 1})
+
+    def test_least_recently_used_entry_evicted(self):
+        """Test the cache never grows beyond its maximum size."""
+        cache = TokenCache(max_size=2, timeout=60)
+        cache.set('first', self.user, self.token)
+        cache.set('second', self.user, self.token)
+        cache.get('first')
+        cache.set('third', self.user, self.token)
+
+        self.assertIsNotNone(cache.get('first'))
+        self.assertIsNone(cache.get('second'))
+        self.assertIsNotNone(cache.get('third'))
+
+    def test_expired_entry_not_returned(self):
+        """Test entries are not served after their TTL."""
+        cache = TokenCache(max_size=10, timeout=-1)
+        cache.set(self.token.key, self.user, self.token)
+
+        self.assertIsNone(cache.get(self.token.key))
+        self.assertEqual(cache.stats()['size'], 0)
+
+    def test_invalidate_user(self):
+        """Test all tokens of a user can be dropped at once."""
+        cache = TokenCache(max_size=10, timeout=60)
+        cache.set('first', self.user, self.token)
+        cache.set('second', self.user, self.token)
+
+        cache.invalidate_user(self.user.pk)
+
+        self.assertEqual(cache.stats()['size'], 0)
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    """Test authenticating API requests through the token cache."""
+
+    def setUp(self):
+        token_cache.clear()
+        revoked_tokens.clear()
+        self.user = get_user_model().objects.create_user(
+            email='test@example.com',
+            password='testpass123',
+            name='Test Name',
+        )
+        self.token = AuthToken.objects.issue(self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def tearDown(self):
+        token_cache.clear()
+
+    def test_cached_token_skips_database(self):
+        """Test a cached token authenticates without a query."""
+        self.client.get(ME_URL)
+
+        with self.assertNumQueries(0):
+            res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(token_cache.stats()['hits'], 1)
+
+    def test_deleted_token_rejected(self):
+        """Test a deleted token stops authenticating immediately."""
+        self.client.get(ITEMS_URL)
+        self.token.delete()
+
+        res = self.client.get(ITEMS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deactivated_tenant_rejected(self):
+        """Test a deactivated tenant stops authenticating immediately."""
+        self.client.get(ITEMS_URL)
+        self.user.is_active = False
+        self.user.save()
+
+        res = self.client.get(ITEMS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_profile_update_refreshes_cached_tenant(self):
+        """Test updating the profile is reflected on the next request."""
+        self.client.get(ME_URL)
+        self.client.patch(ME_URL, {'name': 'New Name'})
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.data['name'], 'New Name')
+
+    def test_profile_update_starts_from_current_tenant(self):
+        """Test a profile update does not act on the cached copy of the tenant."""
+        self.client.get(ME_URL)
+        get_user_model().objects.filter(pk=self.user.pk).update(
+            email='changed@example.com',
+        )
+
+        res = self.client.patch(ME_URL, {'name': 'New Name'})
+
+        self.assertEqual(res.data['email'], 'changed@example.com')
+
+    def test_expired_token_rejected(self):
+        """Test a cached token stops authenticating once it expires."""
+        self.client.get(ME_URL)
+        _user, cached_token = token_cache.get(self.token.key)
+        cached_token.expires_at = timezone.now() - timedelta(seconds=1)
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(token_cache.stats()['size'], 0)
+
+    def test_revoked_token_rejected(self):
+        """Test a token revoked in this process is rejected right away."""
+        self.client.get(ME_URL)
+        AuthToken.objects.get(pk=self.token.pk).revoke()
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_token_revoked_elsewhere_rejected(self):
+        """Test a token revoked by another process is caught on refresh."""
+        self.client.get(ME_URL)
+        AuthToken.objects.filter(pk=self.token.pk).update(
+            revoked_at=timezone.now(),
+        )
+        revoked_tokens._next_refresh = 0
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_tenant_deactivated_elsewhere_rejected(self):
+        """Test deactivation reaches processes with the tenant cached."""
+        self.client.get(ME_URL)
+        get_user_model().objects.get(pk=self.user.pk).deactivate()
+        # Another process still has the active tenant cached.
+        token_cache.set(self.token.key, self.user, self.token)
+        revoked_tokens._next_refresh = 0
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class RevokedTokenIndexTests(TestCase):
+    """Test the incrementally refreshed revocation index."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='test@example.com',
+            password='testpass123',
+        )
+        self.index = RevokedTokenIndex(refresh_interval=0)
+
+    def revoke_elsewhere(self, token):
+        """Revoke a token without notifying this process."""
+        AuthToken.objects.filter(pk=token.pk).update(revoked_at=timezone.now())
+
+    def test_tracking_starts_without_query(self):
+        """Test the first refresh only starts tracking revocations."""
+        with self.assertNumQueries(0):
+            self.index.refresh_if_due()
+
+    def test_refresh_loads_new_revocations(self):
+        """Test revocations since the last refresh are loaded."""
+        token = AuthToken.objects.issue(self.user)
+        self.index.refresh_if_due()
+        self.revoke_elsewhere(token)
+
+        self.index.refresh_if_due()
+
+        self.assertIn(token, self.index)
+
+    def test_refresh_not_due(self):
+        """Test no query is made before the refresh interval passes."""
+        index = RevokedTokenIndex(refresh_interval=60)
+        index.refresh_if_due()
+
+        with self.assertNumQueries(0):
+            index.refresh_if_due()
+
+    def test_expired_entries_dropped(self):
+        """Test revoked tokens leave the index once they expire."""
+        token = AuthToken.objects.issue(self.user)
+        self.index.refresh_if_due()
+        self.index.add(token.pk, timezone.now() - timedelta(seconds=1))
+
+        self.index.refresh_if_due()
+
+        self.assertEqual(len(self.index), 0)
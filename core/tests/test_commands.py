@@ -0,0 +1,215 @@
+"""
+Test the core management commands.
+"""
+import json
+import unittest
+from io import StringIO
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from core.models import AuthToken, Item
+from core.purge import TenantPurge
+from tenants.models import TenantSchema
+from tenants.schemas import move_items_to_schema
+
+
+class BenchApiTests(TransactionTestCase):
+    """Test the API load test command.
+
+    Its requests run in threads of their own, which only see committed data.
+    """
+
+    @override_settings(PASSWORD_HASHERS=[
+        'django.contrib.auth.hashers.MD5PasswordHasher',
+    ])
+    def test_reports_json_and_cleans_up(self):
+        """Test statistics are reported per route and nothing is kept."""
+        out = StringIO()
+
+        call_command(
+            'bench_api',
+            tenants=2,
+            items=3,
+            requests=4,
+            concurrency=2,
+            stdout=out,
+        )
+
+        report = json.loads(out.getvalue())
+        self.assertEqual(set(report['routes']), {'token', 'items', 'me'})
+        for stats in report['routes'].values():
+            self.assertEqual(stats['requests'], 4)
+            self.assertEqual(stats['errors'], 0)
+            self.assertLessEqual(stats['p50_ms'], stats['p99_ms'])
+        self.assertFalse(get_user_model().objects.exists())
+        self.assertFalse(Item.objects.exists())
+
+
+class BenchDbConnectionsTests(TransactionTestCase):
+    """Test the connection overhead benchmark command."""
+
+    def test_reports_both_modes(self):
+        """Test a time is reported per mode and settings are restored."""
+        max_age = connection.settings_dict['CONN_MAX_AGE']
+        out = StringIO()
+
+        call_command('bench_db_connections', requests=5, stdout=out)
+
+        lines = out.getvalue().splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertTrue(lines[0].startswith('new connection per request:'))
+        self.assertTrue(lines[1].startswith('CONN_MAX_AGE='))
+        self.assertEqual(connection.settings_dict['CONN_MAX_AGE'], max_age)
+
+
+class BenchLoginsTests(TestCase):
+    """Test the login throughput benchmark command."""
+
+    @override_settings(PASSWORD_HASHER_PARAMS={
+        'scrypt': {'work_factor': 2 ** 10, 'block_size': 8, 'parallelism': 1},
+    })
+    def test_reports_rate_and_rolls_back(self):
+        """Test a rate is reported per hasher and no tenants are kept."""
+        out = StringIO()
+
+        call_command('bench_logins', hashers=['scrypt'], logins=2, stdout=out)
+
+        self.assertTrue(out.getvalue().startswith('scrypt: '))
+        self.assertFalse(get_user_model().objects.exists())
+
+
+class BenchThrottleTests(TestCase):
+    """Test the throttle overhead benchmark command."""
+
+    def test_reports_both_modes(self):
+        """Test a time is reported with and without leases."""
+        out = StringIO()
+
+        call_command('bench_throttle', requests=20, tenants=2, stdout=out)
+
+        lines = out.getvalue().splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertTrue(lines[0].startswith('cache round trip per request:'))
+        self.assertTrue(lines[1].startswith('LEASE_FRACTION='))
+
+
+class PurgeExpiredTokensTests(TestCase):
+    """Test the expired token purge command."""
+
+    def test_purges_expired_tokens_only(self):
+        """Test expired tokens are deleted in batches and valid ones kept."""
+        tenant = get_user_model().objects.create_user(email='test@example.com')
+        tokens = [AuthToken.objects.issue(tenant) for _i in range(5)]
+        AuthToken.objects.filter(pk__in=[t.pk for t in tokens[:3]]).update(
+            expires_at=timezone.now() - timedelta(seconds=1),
+        )
+        out = StringIO()
+
+        call_command('purge_expired_tokens', batch_size=2, stdout=out)
+
+        self.assertIn('Purged 3 expired tokens.', out.getvalue())
+        self.assertEqual(
+            set(AuthToken.objects.values_list('pk', flat=True)),
+            {tokens[3].pk, tokens[4].pk},
+        )
+
+
+class PurgeDeactivatedTenantsTests(TestCase):
+    """Test the deactivated tenant purge command."""
+
+    def setUp(self):
+        self.tenant = get_user_model().objects.create_user(email='gone@example.com')
+        self.other = get_user_model().objects.create_user(email='kept@example.com')
+        for tenant in (self.tenant, self.other):
+            Item.objects.bulk_create([
+                Item(tenant=tenant, name=f'Item {i}', price=1) for i in range(5)
+            ])
+            AuthToken.objects.issue(tenant)
+        self.tenant.deactivate()
+
+    def test_purges_deactivated_tenants_in_batches(self):
+        """Test data of deactivated tenants only is deleted, with progress."""
+        out = StringIO()
+
+        call_command(
+            'purge_deactivated_tenants',
+            batch_size=2,
+            pause=0,
+            verbosity=2,
+            stdout=out,
+        )
+
+        self.assertIn('gone@example.com: 4/5 items', out.getvalue())
+        self.assertIn('Purged 1 deactivated tenants.', out.getvalue())
+        self.assertFalse(Item.objects.filter(tenant=self.tenant).exists())
+        self.assertFalse(AuthToken.objects.filter(user=self.tenant).exists())
+        self.assertEqual(Item.objects.filter(tenant=self.other).count(), 5)
+        self.tenant.refresh_from_db()
+        self.assertIsNotNone(self.tenant.purged_at)
+
+    def test_resumes_interrupted_purge(self):
+        """Test a purge stopped midway is finished by the next run."""
+        purge = TenantPurge(self.tenant, batch_size=2)
+        next(purge.run())
+        out = StringIO()
+
+        call_command('purge_deactivated_tenants', pause=0, stdout=out)
+
+        self.assertFalse(Item.objects.filter(tenant=self.tenant).exists())
+        call_command('purge_deactivated_tenants', pause=0, stdout=out)
+        self.assertIn('Purged 0 deactivated tenants.', out.getvalue())
+
+
+@unittest.skipUnless(
+    connection.vendor == 'postgresql' and settings.TENANCY_MODE == 'schema',
+    'Requires PostgreSQL in schema mode.',
+)
+class PurgeDeactivatedSchemaTenantsTests(TransactionTestCase):
+    """Test purging deactivated tenants that have their own schema."""
+
+    def test_purges_schema_items_and_drops_schema(self):
+        """Test the items in the tenant's schema are deleted with the schema."""
+        tenant = get_user_model().objects.create_user(email='gone@example.com')
+        Item.objects.bulk_create([
+            Item(tenant=tenant, name=f'Item {i}', price=1) for i in range(5)
+        ])
+        move_items_to_schema(tenant)
+        schema_name = tenant.schema.schema_name
+        tenant.deactivate()
+
+        call_command(
+            'purge_deactivated_tenants',
+            batch_size=2,
+            pause=0,
+            stdout=StringIO(),
+        )
+
+        self.assertFalse(TenantSchema.objects.filter(owner=tenant).exists())
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT 1 FROM information_schema.schemata WHERE schema_name = %s',
+                [schema_name],
+            )
+            self.assertIsNone(cursor.fetchone())
+        tenant.refresh_from_db()
+        self.assertIsNotNone(tenant.purged_at)
+
+
+class ItemPartitioningCommandsTests(TestCase):
+    """Test the item partitioning commands outside PostgreSQL."""
+
+    def test_require_postgresql(self):
+        """Test the commands refuse to run on other databases."""
+        if connection.vendor == 'postgresql':
+            self.skipTest('Runs on PostgreSQL.')
+        for command in ('partition_items', 'item_partitions', 'check_item_partitions'):
+            with self.subTest(command=command):
+                with self.assertRaisesMessage(CommandError, 'requires PostgreSQL'):
+                    call_command(command, stdout=StringIO())
@@ -0,0 +1,90 @@
+"""
+Tests for the tuned password hashers.
+"""
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core.hashers import TunedArgon2PasswordHasher, TunedScryptPasswordHasher
+
+
+TOKEN_URL = reverse('tenants:token')
+PBKDF2 = 'django.contrib.auth.hashers.PBKDF2PasswordHasher'
+SCRYPT = 'core.hashers.TunedScryptPasswordHasher'
+
+
+def scrypt_params(work_factor):
+    """Return hasher params with the given scrypt work factor."""
+    return {
+        'scrypt': {'work_factor': work_factor, 'block_size': 8, 'parallelism': 1},
+    }
+
+
+class TunedHasherTests(TestCase):
+    """Test hashers read their parameters from settings."""
+
+    @override_settings(PASSWORD_HASHER_PARAMS=scrypt_params(2 ** 10))
+    def test_scrypt_params(self):
+        """Test scrypt hashes with the configured work factor."""
+        hasher = TunedScryptPasswordHasher()
+
+        encoded = hasher.encode('secret', hasher.salt())
+
+        self.assertEqual(hasher.decode(encoded)['work_factor'], 2 ** 10)
+        self.assertTrue(hasher.verify('secret', encoded))
+
+    @override_settings(PASSWORD_HASHER_PARAMS={
+        'argon2': {'time_cost': 1, 'memory_cost': 1024, 'parallelism': 1},
+    })
+    def test_argon2_params(self):
+        """Test argon2 hashes with the configured costs."""
+        hasher = TunedArgon2PasswordHasher()
+
+        encoded = hasher.encode('secret', hasher.salt())
+
+        decoded = hasher.decode(encoded)
+        self.assertEqual(decoded['memory_cost'], 1024)
+        self.assertEqual(decoded['time_cost'], 1)
+        self.assertTrue(hasher.verify('secret', encoded))
+
+
+class RehashOnLoginTests(TestCase):
+    """Test passwords are rehashed with the preferred hasher on login."""
+
+    payload = {'email': 'test@example.com', 'password': 'testpass123'}
+
+    def login(self):
+        """Log in through the token endpoint and return the stored hash."""
+        res = APIClient().post(TOKEN_URL, self.payload)
+        self.assertEqual(res.status_code, 200)
+        return get_user_model().objects.get(email=self.payload['email']).password
+
+    def test_rehash_with_preferred_hasher(self):
+        """Test a PBKDF2 hash becomes a scrypt hash on login."""
+        with self.settings(PASSWORD_HASHERS=[PBKDF2]):
+            get_user_model().objects.create_user(**self.payload)
+
+        with self.settings(
+            PASSWORD_HASHERS=[SCRYPT, PBKDF2],
+            PASSWORD_HASHER_PARAMS=scrypt_params(2 ** 10),
+        ):
+            password = self.login()
+
+        self.assertTrue(password.startswith('scrypt$1024$'))
+
+    def test_rehash_with_new_params(self):
+        """Test changing the hasher's parameters rehashes on login."""
+        with self.settings(
+            PASSWORD_HASHERS=[SCRYPT],
+            PASSWORD_HASHER_PARAMS=scrypt_params(2 ** 10),
+        ):
+            get_user_model().objects.create_user(**self.payload)
+
+        with self.settings(
+            PASSWORD_HASHERS=[SCRYPT, PBKDF2],
+            PASSWORD_HASHER_PARAMS=scrypt_params(2 ** 11),
+        ):
+            password = self.login()
+
+        self.assertTrue(password.startswith('scrypt$2048$'))
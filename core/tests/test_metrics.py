@@ -0,0 +1,167 @@
+"""
+Tests for the request metrics.
+"""
+import re
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.authentication import token_cache
+from core.metrics import Histogram, RequestRecord, registry
+from core.models import AuthToken, Item
+
+
+ITEMS_URL = reverse('items:item-list')
+ASYNC_ITEMS_URL = reverse('items:async-item-list')
+TOKEN_URL = reverse('tenants:token')
+METRICS_URL = reverse('metrics')
+
+
+def timing(response, metric):
+    """Return the `dur` and `desc` of a Server-Timing metric."""
+    match = re.search(
+        rf'{metric};dur=([\d.]+)(?:;desc="(\d+) queries")?',
+        response['Server-Timing'],
+    )
+    return float(match[1]), match[2]
+
+
+class RequestMetricsTests(TestCase):
+    """Test measuring API requests."""
+
+    def setUp(self):
+        cache.clear()
+        token_cache.clear()
+        registry.clear()
+        self.tenant = get_user_model().objects.create_user(
+            email='test@example.com',
+            password='testpass123',
+        )
+        Item.objects.create(tenant=self.tenant, name='Item', price=1)
+        self.token = AuthToken.objects.issue(self.tenant)
+        self.client = APIClient()
+        self.client.force_authenticate(self.tenant)
+
+    def test_server_timing_counts_queries(self):
+        """Test the Server-Timing header reports the request's queries."""
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(ITEMS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        # Durations depend on the machine's load, so only their presence
+        # is checked here; see `test_server_timing_durations`.
+        self.assertGreaterEqual(timing(res, 'total')[0], 0)
+        self.assertEqual(timing(res, 'db')[1], str(len(queries)))
+        self.assertIn('serializer;dur=', res['Server-Timing'])
+
+    def test_server_timing_durations(self):
+        """Test the Server-Timing header reports durations in milliseconds."""
+        clock = mock.Mock(return_value=100.0)
+        with mock.patch('core.metrics.time.perf_counter', clock):
+            record = RequestRecord()
+            clock.return_value = 100.0125
+            record.finish(RequestFactory().get(ITEMS_URL), HttpResponse())
+        record.db_time = 0.004
+        record.db_queries = 2
+
+        self.assertEqual(
+            record.server_timing(),
+            'total;dur=12.5, db;dur=4.0;desc="2 queries", serializer;dur=0.0',
+        )
+
+    def test_record_tagged_with_tenant_and_view(self):
+        """Test logged records carry tenant, view and response size."""
+        with self.assertLogs('api.metrics', 'DEBUG') as logs:
+            res = self.client.get(ITEMS_URL)
+
+        record = logs.records[0]
+        self.assertEqual(record.view, 'ItemViewSet.list')
+        self.assertEqual(record.tenant_id, self.tenant.pk)
+        self.assertEqual(record.response_size, len(res.content))
+
+    def test_view_name_of_plain_views(self):
+        """Test views without actions are named after their class."""
+        with self.assertLogs('api.metrics', 'DEBUG') as logs:
+            APIClient().post(TOKEN_URL, {
+                'email': 'test@example.com',
+                'password': 'testpass123',
+            })
+
+        self.assertEqual(logs.records[0].view, 'CreateTokenView')
+        self.assertIsNone(logs.records[0].tenant_id)
+
+    async def test_async_view_queries_counted(self):
+        """Test queries of async views are counted as well."""
+        res = await self.async_client.get(
+            ASYNC_ITEMS_URL,
+            headers={'Authorization': f'Token {self.token.key}'},
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertGreater(int(timing(res, 'db')[1]), 0)
+
+    @override_settings(INTERNAL_IPS=['127.0.0.1'])
+    def test_metrics_endpoint(self):
+        """Test /metrics exposes per-view histograms."""
+        self.client.get(ITEMS_URL)
+
+        res = self.client.get(METRICS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn(
+            'api_request_duration_seconds_count{view="ItemViewSet.list"} 1',
+            res.content.decode(),
+        )
+        self.assertIn(
+            '# TYPE api_request_db_queries histogram',
+            res.content.decode(),
+        )
+
+    @override_settings(REQUEST_METRICS={'ENABLED': True, 'TOKEN': 'secret'})
+    def test_metrics_endpoint_token(self):
+        """Test /metrics requires the configured bearer token."""
+        client = APIClient()
+
+        self.assertEqual(
+            client.get(METRICS_URL).status_code,
+            status.HTTP_403_FORBIDDEN,
+        )
+        res = client.get(METRICS_URL, HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_metrics_endpoint_hidden_without_token(self):
+        """Test /metrics is not served publicly when no token is set."""
+        res = APIClient().get(METRICS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    @override_settings(REQUEST_METRICS={'ENABLED': False, 'TOKEN': ''})
+    def test_disabled(self):
+        """Test nothing is measured when metrics are disabled."""
+        res = self.client.get(ITEMS_URL)
+
+        self.assertNotIn('Server-Timing', res)
+
+
+class HistogramTests(TestCase):
+    """Test the cumulative histogram."""
+
+    def test_cumulative_buckets(self):
+        """Test values are counted in every bucket they fit."""
+        histogram = Histogram([1, 5])
+        for value in (0.5, 1, 3, 10):
+            histogram.observe(value)
+
+        self.assertEqual(
+            list(histogram.cumulative()),
+            [(1, 2), (5, 3), (float('inf'), 4)],
+        )
+        self.assertEqual(histogram.sum, 14.5)
@@ -3,10 +3,11 @@ Tests for models.
 """
 from decimal import Decimal
 
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.contrib.auth import get_user_model
 
 from core import models
+from core.routers import replica_reads
 
 
 class TestUsersModels(TestCase):
@@ -69,3 +70,42 @@ class TestUsersModels(TestCase):
         )
 
         self.assertEqual(str(item), item.name)
+
+    def test_delete_tenant_with_items(self):
+        """Test deleting a tenant deletes its items without tombstones."""
+        tenant = get_user_model().objects.create_user(
+            'test@example.com',
+            'testpass123',
+        )
+        models.Item.objects.create(tenant=tenant, name='A', price=Decimal('1'))
+        models.Item.objects.create(tenant=tenant, name='B', price=Decimal('2'))
+
+        tenant.delete()
+
+        self.assertFalse(models.Item.objects.exists())
+        self.assertFalse(models.ItemTombstone.objects.exists())
+
+    def test_stale_user_save_keeps_change_sequence(self):
+        """Test saving an out of date tenant does not reuse sequence numbers."""
+        tenant = get_user_model().objects.create_user('test@example.com')
+        for name in ('A', 'B', 'C'):
+            models.Item.objects.create(tenant=tenant, name=name, price=1)
+
+        tenant.name = 'New Name'
+        tenant.save()
+        item = models.Item.objects.create(tenant=tenant, name='D', price=1)
+
+        self.assertEqual(item.change_seq, 4)
+        tenant.refresh_from_db()
+        self.assertEqual(tenant.name, 'New Name')
+        self.assertEqual(tenant.items_version, 4)
+
+    @override_settings(DATABASE_REPLICAS=['replica_1'])
+    def test_change_sequence_allocated_on_primary(self):
+        """Test sequence numbers are taken on the primary during replica reads."""
+        tenant = get_user_model().objects.create_user('test@example.com')
+
+        with replica_reads():
+            seq = get_user_model().objects.next_item_seq(tenant.pk)
+
+        self.assertEqual(seq, 1)
@@ -0,0 +1,178 @@
+"""
+Tests for the partitioning of the item table.
+"""
+import json
+import unittest
+from datetime import date, datetime, timezone
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import SimpleTestCase, TransactionTestCase
+
+from core.models import Item
+from core.partitioning import (
+    HASH,
+    RANGE,
+    IncompleteCopy,
+    ItemTableRebuild,
+    add_months,
+    create_month_partitions,
+    list_partitions,
+    month_partitions,
+    partition_method,
+    rewrite_index_definition,
+    scanned_partitions,
+    temporary_name,
+)
+
+
+class FakeQuerySet:
+    """Queryset stand-in returning a canned JSON plan."""
+
+    def __init__(self, plan):
+        self.plan = plan
+
+    def explain(self, format=None):
+        return json.dumps(self.plan)
+
+
+class PartitioningHelperTests(SimpleTestCase):
+    """Test the helpers shared by the rebuild and the commands."""
+
+    def test_add_months(self):
+        """Test months are added across years from any day of a month."""
+        self.assertEqual(add_months(date(2026, 11, 17), 2), date(2027, 1, 1))
+        self.assertEqual(add_months(date(2026, 1, 31), -1), date(2025, 12, 1))
+
+    def test_month_partitions(self):
+        """Test every month from start to end gets a partition."""
+        partitions = list(
+            month_partitions('core_item', date(2026, 11, 5), date(2027, 1, 1))
+        )
+
+        self.assertEqual(partitions, [
+            ('core_item_y2026m11', date(2026, 11, 1), date(2026, 12, 1)),
+            ('core_item_y2026m12', date(2026, 12, 1), date(2027, 1, 1)),
+            ('core_item_y2027m01', date(2027, 1, 1), date(2027, 2, 1)),
+        ])
+
+    def test_rewrite_index_definition(self):
+        """Test index definitions are moved to another table and name."""
+        definition = rewrite_index_definition(
+            'CREATE INDEX item_tenant_id_idx ON ONLY public.core_item '
+            'USING btree (tenant_id, id)',
+            '"item_tenant_id_idx_rebuild"',
+            '"core_item_rebuild"',
+        )
+
+        self.assertEqual(
+            definition,
+            'CREATE INDEX "item_tenant_id_idx_rebuild" ON "core_item_rebuild" '
+            'USING btree (tenant_id, id)',
+        )
+
+    def test_temporary_name_length(self):
+        """Test temporary names keep within PostgreSQL's name length."""
+        name = temporary_name('x' * 63, '_rebuild')
+
+        self.assertEqual(len(name), 63)
+        self.assertTrue(name.endswith('_rebuild'))
+
+    def test_scanned_partitions(self):
+        """Test partitions are found anywhere in a query plan."""
+        plan = [{'Plan': {
+            'Node Type': 'Limit',
+            'Plans': [{
+                'Node Type': 'Append',
+                'Plans': [
+                    {'Node Type': 'Index Scan', 'Relation Name': 'core_item_h4_1'},
+                    {'Node Type': 'Index Scan', 'Relation Name': 'core_item_h4_3'},
+                    {'Node Type': 'Seq Scan', 'Relation Name': 'core_user'},
+                ],
+            }],
+        }}]
+        partitions = [f'core_item_h4_{remainder}' for remainder in range(4)]
+
+        self.assertEqual(
+            scanned_partitions(FakeQuerySet(plan), partitions),
+            ['core_item_h4_1', 'core_item_h4_3'],
+        )
+
+    def test_unknown_method(self):
+        """Test an unknown partitioning method is refused."""
+        with self.assertRaises(ValueError):
+            ItemTableRebuild(connection, 'core_item', 'list')
+
+
+@unittest.skipUnless(connection.vendor == 'postgresql', 'Requires PostgreSQL.')
+class ItemTableRebuildTests(TransactionTestCase):
+    """Test rebuilding the item table on PostgreSQL."""
+
+    def setUp(self):
+        self.tenants = [
+            get_user_model().objects.create_user(email=f'tenant{n}@example.com')
+            for n in range(3)
+        ]
+        for tenant in self.tenants:
+            Item.objects.bulk_create([
+                Item(tenant=tenant, name=f'Item {i}', price=i) for i in range(10)
+            ])
+        self.addCleanup(self.rebuild, '')
+
+    def rebuild(self, method):
+        rebuild = ItemTableRebuild(
+            connection, Item._meta.db_table, method, partitions=4, batch_size=7,
+        )
+        if rebuild.needed():
+            list(rebuild.run())
+
+    def test_hash_partitions_prune_tenant_queries(self):
+        """Test items survive the rebuild and tenant queries read one partition."""
+        ids = set(Item.objects.values_list('id', flat=True))
+
+        self.rebuild(HASH)
+
+        self.assertEqual(partition_method(connection, Item._meta.db_table), HASH)
+        self.assertEqual(set(Item.objects.values_list('id', flat=True)), ids)
+        partitions = [name for name, *_rest in list_partitions(connection, 'core_item')]
+        queryset = Item.objects.filter(tenant=self.tenants[0]).order_by('-id')[:10]
+        self.assertEqual(len(scanned_partitions(queryset, partitions)), 1)
+        item = Item.objects.create(tenant=self.tenants[0], name='New', price=1)
+        self.assertGreater(item.id, max(ids))
+
+    def test_rebuild_back_to_plain_table(self):
+        """Test a partitioned table can be made plain again."""
+        self.rebuild(HASH)
+
+        self.rebuild('')
+
+        self.assertEqual(partition_method(connection, Item._meta.db_table), '')
+        self.assertEqual(Item.objects.count(), 30)
+
+    def test_incomplete_copy_not_swapped(self):
+        """Test the table is kept when the copy misses rows."""
+        with mock.patch.object(ItemTableRebuild, 'copy', return_value=iter([])):
+            with self.assertRaises(IncompleteCopy):
+                self.rebuild(HASH)
+
+        self.assertEqual(partition_method(connection, Item._meta.db_table), '')
+        self.assertEqual(Item.objects.count(), 30)
+
+    def test_created_partition_takes_rows_from_default(self):
+        """Test attaching a month moves its rows out of the default partition."""
+        self.rebuild(RANGE)
+        month = add_months(date.today(), 6)
+        item = Item.objects.first()
+        Item.objects.filter(pk=item.pk).update(
+            created_at=datetime(month.year, month.month, 2, tzinfo=timezone.utc),
+        )
+
+        created = create_month_partitions(connection, Item._meta.db_table, month)
+
+        name = f'core_item_y{month.year}m{month.month:02d}'
+        self.assertIn(name, created)
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT id FROM {connection.ops.quote_name(name)}')
+            self.assertEqual(cursor.fetchall(), [(item.pk,)])
+        self.assertEqual(Item.objects.count(), 30)
@@ -0,0 +1,113 @@
+"""
+Tests for the publish/subscribe hub.
+"""
+import threading
+import unittest
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.test import SimpleTestCase, TransactionTestCase, override_settings
+
+from core.models import Item, items_channel
+from core.pubsub import hub, publish, subscribe
+
+
+in_memory = override_settings(
+    PUBSUB={**settings.PUBSUB, 'BACKEND': 'core.pubsub.InMemoryBackend'},
+)
+
+
+@in_memory
+class HubTests(SimpleTestCase):
+    """Test delivering messages to subscriptions."""
+
+    async def test_message_delivered_to_channel(self):
+        """Test subscribers of the channel get the message, others not."""
+        first, second, other = subscribe('a'), subscribe('a'), subscribe('b')
+        for subscription in (first, second, other):
+            self.addCleanup(subscription.close)
+
+        publish('a', {'seq': 1})
+
+        self.assertEqual(await first.get(1), {'seq': 1})
+        self.assertEqual(await second.get(1), {'seq': 1})
+        self.assertIsNone(await other.get(0.01))
+
+    async def test_latest_message_kept(self):
+        """Test a subscriber that fell behind gets the latest message only."""
+        with subscribe('a') as subscription:
+            publish('a', {'seq': 1})
+            publish('a', {'seq': 2})
+
+            self.assertEqual(await subscription.get(1), {'seq': 2})
+            self.assertIsNone(await subscription.get(0.01))
+
+    async def test_published_from_other_thread(self):
+        """Test messages published by a sync thread wake the event loop."""
+        with subscribe('a') as subscription:
+            thread = threading.Thread(target=publish, args=('a', {'seq': 1}))
+            thread.start()
+
+            self.assertEqual(await subscription.get(1), {'seq': 1})
+            thread.join()
+
+    async def test_closed_subscription_removed(self):
+        """Test closing a subscription stops its delivery and count."""
+        count = hub.count
+        subscription = subscribe('a')
+        self.assertEqual(hub.count, count + 1)
+
+        subscription.close()
+
+        self.assertEqual(hub.count, count)
+        self.assertNotIn('a', hub.channels)
+
+
+@in_memory
+class ItemChangePublishTests(TransactionTestCase):
+    """Test item changes are announced to subscribers once committed."""
+
+    async def test_sequence_published(self):
+        """Test an item change publishes the tenant's new sequence number."""
+        tenant = await get_user_model().objects.acreate(email='t@example.com')
+        with subscribe(items_channel(tenant.pk)) as subscription:
+            item = await Item.objects.acreate(tenant=tenant, name='A', price=1)
+
+            self.assertEqual(await subscription.get(1), {'seq': item.change_seq})
+
+    async def test_rolled_back_change_not_published(self):
+        """Test nothing is published for a change that is rolled back."""
+        tenant = await get_user_model().objects.acreate(email='t@example.com')
+
+        def create_and_roll_back():
+            with transaction.atomic():
+                Item.objects.create(tenant=tenant, name='A', price=1)
+                transaction.set_rollback(True)
+
+        with subscribe(items_channel(tenant.pk)) as subscription:
+            await sync_to_async(create_and_roll_back)()
+
+            self.assertIsNone(await subscription.get(0.05))
+
+
+@unittest.skipUnless(connection.vendor == 'postgresql', 'Requires PostgreSQL.')
+@override_settings(
+    PUBSUB={**settings.PUBSUB, 'BACKEND': 'core.pubsub.PostgresBackend'},
+)
+class PostgresBackendTests(TransactionTestCase):
+    """Test delivering messages through PostgreSQL notifications."""
+
+    async def test_notification_delivered(self):
+        """Test a published message reaches subscribers through the listener."""
+        with subscribe('a') as subscription:
+            # The listener starts with the subscription; publish until it
+            # has started listening.
+            for _attempt in range(50):
+                await sync_to_async(publish)('a', {'seq': 1})
+                message = await subscription.get(0.1)
+                if message is not None:
+                    break
+
+        self.assertEqual(message, {'seq': 1})
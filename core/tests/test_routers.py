@@ -0,0 +1,225 @@
+"""
+Tests for read replica routing.
+"""
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core.authentication import token_cache
+from core.middleware import ReplicaReadMiddleware
+from core.models import AuthToken, Item
+from core.routers import PrimaryReplicaRouter, replica_reads
+
+
+REPLICAS = ['replica_1', 'replica_2']
+# SQLite database standing in for a replica that has not caught up yet.
+STAND_IN = 'stand_in_replica'
+
+
+@override_settings(DATABASE_REPLICAS=REPLICAS)
+class PrimaryReplicaRouterTests(TestCase):
+    """Test choosing a database for each query."""
+
+    def test_reads_use_primary_by_default(self):
+        """Test reads outside of a request stay on the primary."""
+        self.assertEqual(Item.objects.all().db, 'default')
+
+    def test_allowed_reads_use_replica(self):
+        """Test allowed reads go to one of the replicas."""
+        with replica_reads():
+            self.assertIn(Item.objects.all().db, REPLICAS)
+
+    def test_block_reads_one_replica(self):
+        """Test every read of a block goes to the same replica."""
+        with replica_reads():
+            databases = {Item.objects.all().db for _attempt in range(20)}
+
+        self.assertEqual(len(databases), 1)
+        self.assertLessEqual(databases, set(REPLICAS))
+
+    def test_tokens_read_from_primary(self):
+        """Test tokens are read from the primary even when allowed."""
+        with replica_reads():
+            self.assertEqual(AuthToken.objects.all().db, 'default')
+
+    def test_writes_use_primary(self):
+        """Test writes always go to the primary."""
+        with replica_reads():
+            self.assertEqual(
+                PrimaryReplicaRouter().db_for_write(Item),
+                'default',
+            )
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_without_replicas(self):
+        """Test every read uses the primary without replicas."""
+        with replica_reads():
+            self.assertEqual(Item.objects.all().db, 'default')
+
+    def test_replicas_not_migrated(self):
+        """Test migrations are never applied to a replica."""
+        router = PrimaryReplicaRouter()
+
+        self.assertFalse(router.allow_migrate('replica_1', 'core', 'item'))
+        self.assertIsNone(router.allow_migrate('default', 'core', 'item'))
+
+
+@override_settings(DATABASE_REPLICAS=REPLICAS, DATABASE_REPLICA_PIN_SECONDS=5)
+class ReplicaReadMiddlewareTests(TestCase):
+    """Test reads follow writes to the primary."""
+
+    def setUp(self):
+        cache.clear()
+        token_cache.clear()
+        self.tenant = get_user_model().objects.create_user(
+            email='test@example.com',
+            password='testpass123',
+        )
+        self.token = AuthToken.objects.issue(self.tenant)
+        self.factory = RequestFactory()
+        self.middleware = ReplicaReadMiddleware(self.read_items)
+
+    def read_items(self, request):
+        """Stand-in view recording where it would read items from."""
+        self.read_db = Item.objects.all().db
+        return HttpResponse()
+
+    def send(self, method='get', cookies=None, **headers):
+        """Send a request through the middleware and return the response."""
+        request = getattr(self.factory, method)(
+            '/api/items/items/',
+            HTTP_AUTHORIZATION=f'Token {self.token.key}',
+            **headers,
+        )
+        request.COOKIES.update(cookies or {})
+        return self.middleware(request)
+
+    def test_safe_request_reads_replica(self):
+        """Test a GET request reads from a replica."""
+        self.send()
+
+        self.assertIn(self.read_db, REPLICAS)
+
+    def test_write_request_uses_primary(self):
+        """Test a write request reads from the primary and sets the pin."""
+        res = self.send('post')
+
+        self.assertEqual(self.read_db, 'default')
+        self.assertEqual(res.cookies['read_primary']['max-age'], 5)
+
+    def test_reads_pinned_by_cookie(self):
+        """Test a client that just wrote reads from the primary."""
+        self.send(cookies={'read_primary': '1'})
+
+        self.assertEqual(self.read_db, 'default')
+
+    def test_reads_pinned_by_header(self):
+        """Test the pin header forces reads onto the primary."""
+        self.send(HTTP_X_READ_PRIMARY='1')
+
+        self.assertEqual(self.read_db, 'default')
+
+    def test_tenant_pinned_after_write(self):
+        """Test other clients of a tenant that just wrote read the primary."""
+        self.send('post')
+        self.send()
+
+        self.assertEqual(self.read_db, 'default')
+
+    def test_pin_expires(self):
+        """Test reads return to replicas once the pin expires."""
+        with override_settings(DATABASE_REPLICA_PIN_SECONDS=0):
+            self.send('post')
+        self.send()
+
+        self.assertIn(self.read_db, REPLICAS)
+
+
+@override_settings(DATABASE_REPLICAS=[STAND_IN], DATABASE_REPLICA_PIN_SECONDS=5)
+class ReadYourWritesTests(TestCase):
+    """Test API reads against a replica lagging behind the primary.
+
+    The stand-in is added after the test databases are set up, so it is
+    neither created by the runner nor wrapped in the tests' transactions.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        connections.settings[STAND_IN] = connections.configure_settings({
+            DEFAULT_DB_ALIAS: connections.settings[DEFAULT_DB_ALIAS],
+            STAND_IN: {'ENGINE': 'django.db.backends.sqlite3', 'NAME': ':memory:'},
+        })[STAND_IN]
+        cls.addClassCleanup(cls.remove_stand_in)
+        with connections[STAND_IN].schema_editor() as editor:
+            editor.create_model(get_user_model())
+            editor.create_model(Item)
+
+    @classmethod
+    def remove_stand_in(cls):
+        connections[STAND_IN].close()
+        del connections[STAND_IN]
+        del connections.settings[STAND_IN]
+
+    def setUp(self):
+        cache.clear()
+        token_cache.clear()
+        self.tenant = get_user_model().objects.create_user(
+            email='test@example.com',
+            password='testpass123',
+        )
+        # The replica has the tenant, but none of its later writes.
+        get_user_model().objects.using(STAND_IN).bulk_create([
+            get_user_model().objects.get(pk=self.tenant.pk),
+        ])
+        self.addCleanup(self.empty_stand_in)
+        self.token = AuthToken.objects.issue(self.tenant)
+        self.url = reverse('items:item-list')
+
+    def empty_stand_in(self):
+        """Delete the replica's rows, which no test transaction rolls back."""
+        connection = connections[STAND_IN]
+        with connection.cursor() as cursor:
+            for model in (Item, get_user_model()):
+                table = connection.ops.quote_name(model._meta.db_table)
+                cursor.execute(f'DELETE FROM {table}')
+
+    def client_for_tenant(self):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        return client
+
+    def create_item(self, client):
+        res = client.post(self.url, {'name': 'New', 'price': '1.00'})
+        self.assertEqual(res.status_code, 201)
+        return res.data['id']
+
+    def listed_ids(self, client):
+        res = client.get(self.url)
+        self.assertEqual(res.status_code, 200)
+        return [item['id'] for item in res.data]
+
+    def test_writer_reads_own_write(self):
+        """Test the client that wrote lists its new item."""
+        client = self.client_for_tenant()
+
+        item_id = self.create_item(client)
+
+        self.assertEqual(self.listed_ids(client), [item_id])
+
+    def test_tenant_reads_own_write(self):
+        """Test another client of the tenant that wrote lists the new item."""
+        item_id = self.create_item(self.client_for_tenant())
+
+        self.assertEqual(self.listed_ids(self.client_for_tenant()), [item_id])
+
+    def test_reads_replica_once_pin_expires(self):
+        """Test reads reach the lagging replica once the pin expires."""
+        with override_settings(DATABASE_REPLICA_PIN_SECONDS=0):
+            self.create_item(self.client_for_tenant())
+
+        self.assertEqual(self.listed_ids(self.client_for_tenant()), [])
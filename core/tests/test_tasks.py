@@ -0,0 +1,219 @@
+"""
+Tests for the background tasks.
+"""
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from core.models import QueuedTask
+from core.tasks import Worker, get_backend, get_task, task, tasks
+
+
+calls = []
+
+
+@task(max_attempts=3)
+def record(value):
+    calls.append(value)
+
+
+@task(queue='slow')
+def record_slowly(value):
+    calls.append(value)
+
+
+@task
+def record_locked_at():
+    calls.append(QueuedTask.objects.get().locked_at)
+
+
+@task(max_attempts=2)
+def explode():
+    calls.append('explode')
+    raise RuntimeError('Boom')
+
+
+def backend(path):
+    return override_settings(TASKS={**settings.TASKS, 'BACKEND': path})
+
+
+class DatabaseBackendTests(TestCase):
+    """Test queueing tasks in the database.
+
+    The clock is frozen at `self.now`, so the tests do not depend on how
+    long the tasks and queries take; tests move it forward explicitly.
+    """
+
+    def setUp(self):
+        calls.clear()
+        self.worker = Worker(name='test-worker')
+        # Ahead of the real clock, which the `run_at` default still reads,
+        # so newly enqueued tasks are due.
+        self.now = timezone.now() + timedelta(minutes=1)
+        patcher = mock.patch('django.utils.timezone.now', lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_enqueue_stores_call(self):
+        """Test enqueueing writes the call instead of running it."""
+        queued = record.enqueue(1)
+
+        self.assertEqual(queued.name, 'core.tests.test_tasks.record')
+        self.assertEqual(queued.args, [1])
+        self.assertEqual(queued.max_attempts, 3)
+        self.assertEqual(calls, [])
+
+    def test_worker_runs_and_deletes_task(self):
+        """Test a successful task is run once and removed from the queue."""
+        record.enqueue(1)
+        record.enqueue(2)
+
+        self.assertEqual(self.worker.run_once(), 2)
+
+        self.assertEqual(calls, [1, 2])
+        self.assertFalse(QueuedTask.objects.exists())
+        self.assertEqual(self.worker.run_once(), 0)
+
+    def test_failed_task_retried_with_backoff(self):
+        """Test a failing task is queued again for later."""
+        explode.enqueue()
+
+        with self.assertLogs('api.tasks', 'ERROR'):
+            self.worker.run_once()
+
+        queued = QueuedTask.objects.get()
+        self.assertEqual(queued.status, QueuedTask.Status.QUEUED)
+        self.assertEqual(queued.attempts, 1)
+        self.assertIn('Boom', queued.last_error)
+        self.assertGreater(queued.run_at, self.now)
+        self.assertEqual(self.worker.run_once(), 0)
+        self.now = queued.run_at
+        with self.assertLogs('api.tasks', 'ERROR'):
+            self.assertEqual(self.worker.run_once(), 1)
+
+    def test_task_failed_after_max_attempts(self):
+        """Test a task failing every attempt is kept as failed."""
+        explode.enqueue()
+        for _attempt in range(2):
+            QueuedTask.objects.update(run_at=self.now)
+            with self.assertLogs('api.tasks', 'ERROR'):
+                self.worker.run_once()
+
+        queued = QueuedTask.objects.get()
+        self.assertEqual(queued.status, QueuedTask.Status.FAILED)
+        self.assertEqual(calls, ['explode', 'explode'])
+        QueuedTask.objects.update(run_at=self.now)
+        self.assertEqual(self.worker.run_once(), 0)
+
+    def test_claim_skips_other_queues(self):
+        """Test workers only claim tasks of their queues."""
+        record_slowly.enqueue(1)
+
+        self.assertEqual(self.worker.run_once(), 0)
+        self.assertEqual(Worker(queues=['slow']).run_once(), 1)
+
+    def test_lost_task_claimed_again(self):
+        """Test a task left running past the timeout is run again."""
+        record.enqueue(1)
+        QueuedTask.objects.claim('dead-worker', ['default'], 10, 60)
+        self.assertEqual(self.worker.run_once(), 0)
+
+        self.now += timedelta(seconds=settings.TASKS['TIMEOUT'])
+        self.assertEqual(self.worker.run_once(), 0)
+        self.now += timedelta(seconds=1)
+
+        self.assertEqual(self.worker.run_once(), 1)
+        self.assertEqual(calls, [1])
+
+    def test_task_claimed_by_other_worker_skipped(self):
+        """Test a claimed task taken over before it started is left alone."""
+        record.enqueue(1)
+        queued, = QueuedTask.objects.claim('test-worker', ['default'], 10, 60)
+        QueuedTask.objects.update(locked_by='other-worker')
+
+        self.worker.execute(queued)
+
+        self.assertEqual(calls, [])
+        self.assertEqual(QueuedTask.objects.get().locked_by, 'other-worker')
+
+    def test_lock_renewed_when_task_starts(self):
+        """Test the timeout of a task counts from its start, not its claim."""
+        record_locked_at.enqueue()
+        queued, = QueuedTask.objects.claim('test-worker', ['default'], 10, 60)
+        self.now += timedelta(seconds=settings.TASKS['TIMEOUT'])
+
+        self.worker.execute(queued)
+
+        self.assertEqual(calls, [self.now])
+
+
+class RunWorkerTests(TransactionTestCase):
+    """Test the worker command."""
+
+    def setUp(self):
+        calls.clear()
+
+    def test_runworker_burst(self):
+        """Test the worker command runs queued tasks and exits when done."""
+        record.enqueue(1)
+        record_slowly.enqueue(2)
+
+        call_command(
+            'runworker',
+            threads=2,
+            queues=['default', 'slow'],
+            burst=True,
+            stdout=StringIO(),
+        )
+
+        self.assertEqual(sorted(calls), [1, 2])
+        self.assertFalse(QueuedTask.objects.exists())
+
+
+class InProcessBackendTests(TestCase):
+    """Test the in-process backends."""
+
+    def setUp(self):
+        calls.clear()
+
+    @backend('core.tasks.InMemoryBackend')
+    def test_in_memory_backend(self):
+        """Test calls are kept until run, retrying failures at once."""
+        get_backend().clear()
+        record.enqueue(1)
+        self.assertEqual(calls, [])
+
+        self.assertEqual(get_backend().run_pending(), 1)
+
+        self.assertEqual(calls, [1])
+        explode.enqueue()
+        with self.assertRaisesMessage(RuntimeError, 'Boom'):
+            get_backend().run_pending()
+        self.assertEqual(calls, [1, 'explode', 'explode'])
+
+    @backend('core.tasks.InMemoryBackend')
+    def test_arguments_must_be_json(self):
+        """Test arguments the database could not store are refused."""
+        with self.assertRaises(TypeError):
+            record.enqueue(object())
+
+    @backend('core.tasks.ImmediateBackend')
+    def test_immediate_backend_runs_on_commit(self):
+        """Test calls run once the enqueuing transaction commits."""
+        with self.captureOnCommitCallbacks(execute=True):
+            record.enqueue(1)
+            self.assertEqual(calls, [])
+
+        self.assertEqual(calls, [1])
+
+    def test_get_task_imports_module(self):
+        """Test workers find tasks of modules not imported yet."""
+        del tasks[record.name]
+        self.addCleanup(tasks.__setitem__, record.name, record)
+
+        self.assertIs(get_task('core.tests.test_tasks.record'), record)
@@ -0,0 +1,96 @@
+"""
+Tests for the query budget helpers.
+"""
+from django.test import SimpleTestCase, TestCase
+
+from core.models import Item
+from core.testing import format_report, query_budget, query_shape
+
+
+class QueryShapeTests(SimpleTestCase):
+    """Test normalising queries to their shape."""
+
+    def test_literals_replaced(self):
+        """Test strings and numbers are replaced, identifiers kept."""
+        shape = query_shape(
+            'SELECT "t1"."id" FROM "core_item" '
+            "WHERE \"name\" = 'it''s' AND price > -1.5 AND id = 42 LIMIT 21"
+        )
+
+        self.assertEqual(
+            shape,
+            'SELECT "t1"."id" FROM "core_item" '
+            'WHERE "name" = ? AND price > ? AND id = ? LIMIT ?',
+        )
+
+    def test_in_lists_collapsed(self):
+        """Test IN lists of any length have the same shape."""
+        self.assertEqual(
+            query_shape('SELECT 1 FROM t WHERE id IN (1, 2, 3)'),
+            query_shape('SELECT 1 FROM t WHERE id IN (4)'),
+        )
+
+    def test_whitespace_normalised(self):
+        """Test runs of whitespace compare equal."""
+        self.assertEqual(query_shape(' SELECT  1\n FROM t '), 'SELECT ? FROM t')
+
+
+class FormatReportTests(SimpleTestCase):
+    """Test the failure message of exceeded budgets."""
+
+    def test_repeated_shapes_grouped(self):
+        """Test an N+1 is listed as one shape repeated N times."""
+        queries = [
+            {'sql': 'SELECT * FROM item WHERE tenant_id = 1'},
+            *({'sql': f'SELECT * FROM tag WHERE item_id = {n}'} for n in range(3)),
+        ]
+
+        report = format_report('List', queries, 2)
+
+        self.assertEqual(report, '\n'.join([
+            'List: 4 queries, budget 2.',
+            'Repeated query shapes:',
+            '  3 x SELECT * FROM tag WHERE item_id = ?',
+            'Other queries:',
+            '  1 x SELECT * FROM item WHERE tenant_id = ?',
+        ]))
+
+
+class QueryBudgetTests(TestCase):
+    """Test failing blocks and tests over their query budget."""
+
+    def test_context_manager_within_budget(self):
+        """Test a block within budget passes and exposes its queries."""
+        with query_budget(1) as budget:
+            list(Item.objects.all())
+
+        self.assertEqual(len(budget.queries), 1)
+
+    def test_context_manager_over_budget(self):
+        """Test a block over budget fails with its queries grouped."""
+        with self.assertRaises(AssertionError) as raised:
+            with query_budget(1, label='Lookups'):
+                for pk in (1, 2):
+                    Item.objects.filter(pk=pk).exists()
+
+        message = str(raised.exception)
+        self.assertTrue(message.startswith('Lookups: 2 queries, budget 1.'))
+        self.assertIn('Repeated query shapes:\n  2 x SELECT', message)
+
+    def test_other_errors_not_masked(self):
+        """Test an error raised in the block is not replaced by the report."""
+        with self.assertRaises(ValueError):
+            with query_budget(0):
+                list(Item.objects.all())
+                raise ValueError
+
+    def test_decorator(self):
+        """Test decorated functions are checked on every call."""
+        @query_budget(1)
+        def lookups(count):
+            for pk in range(count):
+                Item.objects.filter(pk=pk).exists()
+
+        lookups(1)
+        with self.assertRaises(AssertionError):
+            lookups(2)
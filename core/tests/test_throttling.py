@@ -0,0 +1,178 @@
+"""
+Tests for the tenant throttles.
+"""
+import time
+from types import SimpleNamespace
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.authentication import token_cache
+from core.models import AuthToken
+from core.throttling import TenantRateThrottle, TokenBucket
+
+
+ITEMS_URL = reverse('items:item-list')
+ASYNC_ITEMS_URL = reverse('items:async-item-list')
+TOKEN_URL = reverse('tenants:token')
+
+THROTTLE = {
+    **settings.API_THROTTLE,
+    'LEASE_FRACTION': 0,
+    'RATES': {
+        'items': {'standard': '3/min', 'premium': '10/min'},
+        'login': {'anonymous': '2/min'},
+    },
+}
+
+
+class TokenBucketTests(TestCase):
+    """Test the shared token bucket."""
+
+    def setUp(self):
+        cache.clear()
+        self.bucket = TokenBucket('bucket', capacity=3, rate=1, cache=cache)
+
+    def test_take_until_empty(self):
+        """Test tokens are granted up to the capacity."""
+        self.assertEqual(self.bucket.take(2, now=100), (2, 1))
+        self.assertEqual(self.bucket.take(2, now=100), (1, 0))
+        self.assertEqual(self.bucket.take(1, now=100)[0], 0)
+
+    def test_refills_over_time(self):
+        """Test tokens come back at the refill rate."""
+        self.bucket.take(3, now=100)
+
+        self.assertEqual(self.bucket.take(3, now=102)[0], 2)
+
+    def test_idle_bucket_does_not_exceed_capacity(self):
+        """Test refill beyond a full bucket is not kept."""
+        self.bucket.take(1, now=100)
+
+        self.assertEqual(self.bucket.take(10, now=1000)[0], 3)
+
+    def test_shared_between_instances(self):
+        """Test buckets with the same key share their tokens."""
+        other = TokenBucket('bucket', capacity=3, rate=1, cache=cache)
+        self.bucket.take(2, now=100)
+
+        self.assertEqual(other.take(2, now=100)[0], 1)
+
+
+@override_settings(API_THROTTLE=THROTTLE)
+class TenantRateThrottleTests(TestCase):
+    """Test throttling API requests per tenant."""
+
+    def setUp(self):
+        cache.clear()
+        TenantRateThrottle.clear()
+        # Buckets refill continuously, and a slow run could see a token
+        # come back; the frozen time is a whole number of refills too.
+        patcher = mock.patch(
+            'core.throttling.time',
+            SimpleNamespace(time=lambda: 6000.0, monotonic=time.monotonic),
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.tenant = get_user_model().objects.create_user(
+            email='test@example.com',
+            password='testpass123',
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.tenant)
+
+    def test_rate_limit_headers(self):
+        """Test responses carry the tenant's remaining requests."""
+        res = self.client.get(ITEMS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res['RateLimit-Limit'], '3')
+        self.assertEqual(res['RateLimit-Remaining'], '2')
+        self.assertEqual(res['RateLimit-Reset'], '20')
+
+    def test_throttled_after_limit(self):
+        """Test requests beyond the bucket are refused with a retry time."""
+        for _request in range(3):
+            self.client.get(ITEMS_URL)
+
+        res = self.client.get(ITEMS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(res['RateLimit-Remaining'], '0')
+        self.assertIn('Retry-After', res)
+
+    def test_tenants_throttled_separately(self):
+        """Test one tenant's requests do not use another's bucket."""
+        for _request in range(3):
+            self.client.get(ITEMS_URL)
+        other = get_user_model().objects.create_user(email='other@example.com')
+        self.client.force_authenticate(other)
+
+        res = self.client.get(ITEMS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_rate_depends_on_tier(self):
+        """Test tenants get the rate of their tier."""
+        self.tenant.tier = get_user_model().Tier.PREMIUM
+
+        res = self.client.get(ITEMS_URL)
+
+        self.assertEqual(res['RateLimit-Limit'], '10')
+
+    def test_tier_without_rate_not_throttled(self):
+        """Test tiers without a configured rate are not limited."""
+        self.tenant.tier = get_user_model().Tier.FREE
+
+        res = self.client.get(ITEMS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotIn('RateLimit-Limit', res)
+
+    def test_login_throttled_by_address(self):
+        """Test anonymous logins are limited per client address."""
+        client = APIClient()
+        payload = {'email': 'test@example.com', 'password': 'testpass123'}
+        AuthToken.objects.issue(self.tenant)
+
+        responses = [client.post(TOKEN_URL, payload) for _i in range(3)]
+
+        self.assertEqual(responses[1].status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            responses[2].status_code,
+            status.HTTP_429_TOO_MANY_REQUESTS,
+        )
+
+    def test_leases_share_one_bucket(self):
+        """Test leased tokens are taken from the shared bucket."""
+        with override_settings(API_THROTTLE={**THROTTLE, 'LEASE_FRACTION': 1}):
+            self.client.get(ITEMS_URL)
+            # Another process sees the bucket the lease emptied.
+            TenantRateThrottle.clear()
+            res = self.client.get(ITEMS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    async def test_async_endpoints_throttled(self):
+        """Test async item endpoints share the tenant's item rate limit."""
+        token_cache.clear()
+        token = await sync_to_async(AuthToken.objects.issue)(self.tenant)
+        headers = {'Authorization': f'Token {token.key}'}
+        for _request in range(3):
+            res = await self.async_client.get(ASYNC_ITEMS_URL, headers=headers)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res['RateLimit-Remaining'], '0')
+
+        res = await self.async_client.get(ASYNC_ITEMS_URL, headers=headers)
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(res['RateLimit-Limit'], '3')
+        self.assertIn('Retry-After', res)
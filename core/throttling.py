@@ -0,0 +1,267 @@
+"""
+Per-tenant token bucket throttles for the API.
+"""
+import math
+import threading
+import time
+from collections import namedtuple
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework import exceptions
+from rest_framework.request import Request
+from rest_framework.throttling import BaseThrottle
+
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+RateLimit = namedtuple('RateLimit', ['limit', 'remaining', 'reset'])
+
+
+def parse_rate(rate):
+    """Return `(capacity, period)` of a `'<requests>/<period>'` rate."""
+    count, period = rate.split('/')
+    return int(count), PERIODS[period[0]]
+
+
+async def acheck_throttles(view, request):
+    """Raise `Throttled` if a throttle of `view` refuses a Django `request`.
+
+    `APIView.check_throttles()` for async views outside DRF, which set
+    `throttle_classes` and `throttle_scope` and have authenticated the
+    request already.
+    """
+    drf_request = Request(request)
+    drf_request.user, drf_request.auth = request.user, request.auth
+    waits = []
+    for throttle in (throttle_class() for throttle_class in view.throttle_classes):
+        if hasattr(throttle, 'aallow_request'):
+            allowed = await throttle.aallow_request(drf_request, view)
+        else:
+            allowed = await sync_to_async(throttle.allow_request)(drf_request, view)
+        if not allowed:
+            waits.append(throttle.wait())
+
+    if waits:
+        waits = [wait for wait in waits if wait is not None]
+        raise exceptions.Throttled(max(waits, default=None))
+
+
+class TokenBucket:
+    """Token bucket shared by every process through one cache counter.
+
+    The bucket holds up to `capacity` tokens and refills at `rate` tokens
+    per second. Instead of storing a level and a timestamp, which would
+    need a read-modify-write, the counter holds the total number of tokens
+    ever taken, offset so that `capacity + rate * now - counter` is the
+    current level. Taking and refunding tokens are then single atomic
+    `incr()`/`decr()` calls on any cache backend.
+
+    Refill beyond a full bucket is burned by adding the excess to the
+    counter. A short `add()` guard lets only one process burn at a time;
+    the others merely cap the level they observed.
+    """
+
+    def __init__(self, key, capacity, rate, cache):
+        self.key = key
+        self.capacity = capacity
+        self.rate = rate
+        self.cache = cache
+        # Idle keys may expire; a recreated counter starts out full, which
+        # is what an idle bucket would have refilled to anyway.
+        self.timeout = math.ceil(capacity / rate) + 60
+
+    def level(self, taken, now):
+        """Return the level of the bucket for a counter value."""
+        return self.capacity + self.rate * now - taken
+
+    def take(self, count, now=None):
+        """Take up to `count` tokens, returning `(granted, level)`.
+
+        `level` is what is left in the bucket afterwards; it is negative
+        while requests are being refused.
+        """
+        now = time.time() if now is None else now
+        taken = self.incr(count, now)
+        level = self.level(taken, now)
+
+        excess = math.floor(level + count - self.capacity)
+        if excess > 0:
+            if self.cache.add(f'{self.key}:burn', 1, 1):
+                self.cache.incr(self.key, excess)
+            level -= excess
+
+        if level < 0:
+            refund = min(count, math.ceil(-level))
+            if refund:
+                self.cache.decr(self.key, refund)
+            return count - refund, level + refund
+        return count, level
+
+    def incr(self, count, now):
+        """Add `count` to the counter, creating a full bucket if needed."""
+        for _attempt in range(2):
+            initial = math.floor(self.rate * now) + count
+            if self.cache.add(self.key, initial, self.timeout):
+                return initial
+            try:
+                taken = self.cache.incr(self.key, count)
+            except ValueError:
+                # Expired between add() and incr(); create it again.
+                continue
+            self.cache.touch(self.key, self.timeout)
+            return taken
+        return self.cache.incr(self.key, count)
+
+
+class Lease:
+    """Tokens a process took from a shared bucket ahead of time."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.tokens = 0
+        self.level = 0
+        self.expires = 0
+        self.retry_at = 0
+
+
+class TenantRateThrottle(BaseThrottle):
+    """Throttle requests per tenant with a token bucket per view scope.
+
+    Views set `throttle_scope`; rates come from `settings.API_THROTTLE` and
+    are looked up by scope and by the tenant's `tier`, anonymous clients
+    using the `'anonymous'` tier and being keyed by address. A scope or
+    tier without a rate is not throttled.
+
+    To avoid a cache round trip per request, each process leases a
+    fraction of the bucket (`LEASE_FRACTION` of its capacity) at once and
+    serves requests from the lease, topping it up when it runs out or is
+    older than `LEASE_TTL` seconds. Leased tokens are already taken from
+    the shared bucket, so processes together never exceed the rate; they
+    can only refuse a little early while another process holds a lease.
+    Refused clients are answered locally until the bucket has refilled.
+    """
+    leases = {}
+    max_leases = 10000
+    scope_attr = 'throttle_scope'
+
+    def __init__(self):
+        self.wait_seconds = None
+
+    @property
+    def options(self):
+        return settings.API_THROTTLE
+
+    @property
+    def cache(self):
+        return caches[self.options.get('ALIAS', 'default')]
+
+    def get_tier(self, request):
+        """Return the tier whose rates apply to the request."""
+        if request.user and request.user.is_authenticated:
+            return request.user.tier
+        return 'anonymous'
+
+    def get_rate(self, request, view):
+        """Return the `'<requests>/<period>'` rate of the request or `None`."""
+        scope = getattr(view, self.scope_attr, None)
+        if scope is None:
+            return None
+        return self.options['RATES'].get(scope, {}).get(self.get_tier(request))
+
+    def get_cache_key(self, request, view):
+        scope = getattr(view, self.scope_attr)
+        if request.user and request.user.is_authenticated:
+            ident = request.user.pk
+        else:
+            ident = f'ip:{self.get_ident(request)}'
+        return f'throttle:{scope}:{ident}'
+
+    def get_lease(self, key):
+        lease = self.leases.get(key)
+        if lease is None:
+            if len(self.leases) >= self.max_leases:
+                self.leases.clear()
+            lease = self.leases.setdefault(key, Lease())
+        return lease
+
+    def allow_request(self, request, view):
+        rate = self.get_rate(request, view)
+        if rate is None:
+            return True
+
+        capacity, period = parse_rate(rate)
+        refill = capacity / period
+        key = self.get_cache_key(request, view)
+        lease = self.get_lease(key)
+        now = time.monotonic()
+
+        with lease.lock:
+            if lease.tokens <= 0 or lease.expires <= now:
+                if lease.retry_at > now:
+                    return self.refuse(request, capacity, refill, lease, now)
+                self.renew(lease, key, capacity, refill, now)
+                if lease.tokens <= 0:
+                    return self.refuse(request, capacity, refill, lease, now)
+
+            lease.tokens -= 1
+            remaining = max(0, math.floor(lease.level) + lease.tokens)
+            self.set_rate_limit(request, RateLimit(
+                capacity,
+                remaining,
+                math.ceil((capacity - remaining) / refill),
+            ))
+        return True
+
+    async def aallow_request(self, request, view):
+        """Return `allow_request()` for async views.
+
+        Requests answered from the lease need no I/O and are checked on the
+        event loop; only those renewing it from the cache take a thread.
+        """
+        rate = self.get_rate(request, view)
+        if rate is None:
+            return True
+
+        lease = self.get_lease(self.get_cache_key(request, view))
+        now = time.monotonic()
+        if (lease.tokens > 0 and lease.expires > now) or lease.retry_at > now:
+            return self.allow_request(request, view)
+        return await sync_to_async(self.allow_request, thread_sensitive=False)(
+            request,
+            view,
+        )
+
+    def renew(self, lease, key, capacity, refill, now):
+        """Top the lease up from the shared bucket."""
+        size = max(1, math.floor(capacity * self.options['LEASE_FRACTION']))
+        bucket = TokenBucket(key, capacity, refill, self.cache)
+        granted, level = bucket.take(max(size - lease.tokens, 0))
+        lease.tokens += granted
+        lease.level = level
+        lease.expires = now + self.options['LEASE_TTL']
+        lease.retry_at = now + (1 - level) / refill if lease.tokens <= 0 else 0
+
+    def refuse(self, request, capacity, refill, lease, now):
+        self.wait_seconds = max(lease.retry_at - now, 0)
+        self.set_rate_limit(request, RateLimit(
+            capacity,
+            0,
+            math.ceil(self.wait_seconds),
+        ))
+        return False
+
+    def set_rate_limit(self, request, rate_limit):
+        """Keep the most restrictive limit of the request for its headers."""
+        current = getattr(request._request, 'rate_limit', None)
+        if current is None or rate_limit.remaining <= current.remaining:
+            request._request.rate_limit = rate_limit
+
+    def wait(self):
+        return self.wait_seconds
+
+    @classmethod
+    def clear(cls):
+        """Forget this process's leases."""
+        cls.leases.clear()
@@ -0,0 +1,35 @@
+"""
+Views of the core app.
+"""
+from django.conf import settings
+from django.http import Http404, HttpResponse, HttpResponseForbidden
+from django.utils.crypto import constant_time_compare
+from django.views.decorators.http import require_GET
+
+from core.metrics import registry
+
+
+@require_GET
+def metrics(request):
+    """Serve the request histograms of this process to Prometheus.
+
+    Scrapers authenticate with `REQUEST_METRICS['TOKEN']`. Without a token
+    configured the endpoint does not exist, except in development and for
+    `INTERNAL_IPS`.
+    """
+    token = settings.REQUEST_METRICS['TOKEN']
+    if token:
+        if not constant_time_compare(
+            request.headers.get('Authorization', ''),
+            f'Bearer {token}',
+        ):
+            return HttpResponseForbidden()
+    elif not (
+        settings.DEBUG or request.META.get('REMOTE_ADDR') in settings.INTERNAL_IPS
+    ):
+        raise Http404
+
+    return HttpResponse(
+        registry.render(),
+        content_type='text/plain; version=0.0.4; charset=utf-8',
+    )
@@ -0,0 +1,136 @@
+"""
+Async views for items APIs.
+
+DRF views are synchronous, so under ASGI every request to them costs a
+thread hop. These views serve the hot item paths natively on the event
+loop with Django's async ORM, sharing serializers, filters and pagination
+with `ItemViewSet` so both routes return the same data.
+"""
+import math
+from io import BytesIO
+
+from django.http import JsonResponse
+from django.views import View
+from rest_framework import exceptions
+from rest_framework.parsers import JSONParser
+from rest_framework.request import Request
+
+from core.authentication import CachedTokenAuthentication
+from core.mixins import get_rate_limit_headers
+from core.models import Item
+from core.throttling import acheck_throttles
+from items import serializers
+from items.views import LIST_FIELDS, ItemViewSet
+
+
+class AsyncItemView(View):
+    """Authenticate by token, throttle and render DRF exceptions as JSON.
+
+    Requests share the throttle scope, and so the rate limits, of
+    `ItemViewSet`.
+    """
+    authentication_class = CachedTokenAuthentication
+    filter_backends = ItemViewSet.filter_backends
+    ordering_fields = ItemViewSet.ordering_fields
+    pagination_class = ItemViewSet.pagination_class
+    throttle_classes = ItemViewSet.throttle_classes
+    throttle_scope = ItemViewSet.throttle_scope
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        view = super().as_view(**initkwargs)
+        # Token authenticated like DRF's APIView, so not CSRF protected.
+        view.csrf_exempt = True
+        return view
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.authenticator = self.authentication_class()
+        try:
+            credentials = await self.authenticator.aauthenticate(request)
+            if credentials is None:
+                raise exceptions.NotAuthenticated()
+            request.user, request.auth = credentials
+            await acheck_throttles(self, request)
+            response = await super().dispatch(request, *args, **kwargs)
+        except exceptions.APIException as exc:
+            response = self.handle_exception(request, exc)
+        for name, value in get_rate_limit_headers(request).items():
+            response.headers[name] = value
+        return response
+
+    def handle_exception(self, request, exc):
+        """Return the JSON error response DRF would send for `exc`."""
+        detail = exc.detail
+        if not isinstance(detail, (list, dict)):
+            detail = {'detail': detail}
+
+        response = JsonResponse(detail, status=exc.status_code, safe=False)
+        if isinstance(
+            exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)
+        ):
+            response['WWW-Authenticate'] = (
+                self.authenticator.authenticate_header(request)
+            )
+        elif isinstance(exc, exceptions.Throttled) and exc.wait is not None:
+            response['Retry-After'] = str(math.ceil(exc.wait))
+        return response
+
+    def get_queryset(self):
+        """Return items of the authenticated tenant only."""
+        if not self.request.user.is_active:
+            return Item.objects.none()
+        return Item.objects.filter(tenant=self.request.user).order_by('-id')
+
+
+class ItemListCreateView(AsyncItemView):
+    """List and create items."""
+
+    async def get(self, request):
+        """List items, filtered, sorted and paginated as `ItemViewSet`."""
+        drf_request = Request(request)
+        queryset = self.get_queryset()
+        for backend in self.filter_backends:
+            queryset = backend().filter_queryset(drf_request, queryset, self)
+        rows = queryset.values(*LIST_FIELDS)
+
+        paginator = self.pagination_class()
+        page_rows = paginator.get_page_queryset(rows, drf_request, self)
+        if page_rows is None:
+            items = [row async for row in rows.aiterator()]
+            return JsonResponse(
+                serializers.ItemListSerializer(items).data,
+                safe=False,
+            )
+
+        page = paginator.set_page([row async for row in page_rows])
+        return JsonResponse({
+            'next': paginator.get_next_link(),
+            'results': serializers.ItemListSerializer(page).data,
+        })
+
+    async def post(self, request):
+        """Create an item from a JSON body."""
+        data = JSONParser().parse(BytesIO(request.body))
+        serializer = serializers.ItemDetailSerializer(data=data)
+        serializer.is_valid(raise_exception=True)
+
+        item = await Item.objects.acreate(
+            tenant=request.user,
+            **serializer.validated_data,
+        )
+        return JsonResponse(
+            serializers.ItemDetailSerializer(item).data,
+            status=201,
+        )
+
+
+class ItemDetailView(AsyncItemView):
+    """Retrieve an item."""
+
+    async def get(self, request, pk):
+        try:
+            item = await self.get_queryset().aget(pk=pk)
+        except Item.DoesNotExist:
+            raise exceptions.NotFound()
+
+        return JsonResponse(serializers.ItemDetailSerializer(item).data)
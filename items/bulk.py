@@ -0,0 +1,185 @@
+"""
+Bulk create, update and delete of items.
+"""
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.utils.translation import gettext as _
+
+from core.models import Item, ItemTombstone
+from items.serializers import ItemDetailSerializer
+
+
+CREATE = 'create'
+UPDATE = 'update'
+DELETE = 'delete'
+OPERATIONS = (CREATE, UPDATE, DELETE)
+
+
+class BulkItemOperations:
+    """Validate and apply a batch of item operations for one tenant.
+
+    Each row is a JSON object with an `op` key (`create`, `update` or
+    `delete`, defaulting to `create`), an `id` for updates and deletes, and
+    the item fields. Creates and updates are validated in list mode with
+    `ItemDetailSerializer`; if any row is invalid nothing is written.
+    Otherwise every write is done with `bulk_create`, `bulk_update` and
+    batched deletes inside a single transaction.
+
+    None of these send per-row signals, so the rows' change sequence
+    numbers and the tombstones of deleted items are written here, from a
+    block of numbers allocated per operation.
+    """
+
+    def __init__(self, tenant, rows, batch_size):
+        self.tenant = tenant
+        self.rows = rows
+        self.batch_size = batch_size
+        self.results = [{'op': None, 'id': None} for _row in rows]
+        self.has_errors = False
+
+    def run(self):
+        """Validate and apply the rows, returning the per-row results."""
+        creates, updates, deletes = self.split()
+        created = self.validate(creates)
+        updated = self.validate(updates, partial=True)
+        instances = self.get_instances(updates + deletes)
+
+        if not self.has_errors:
+            with transaction.atomic():
+                self.create(creates, created)
+                self.update(updates, updated, instances)
+                self.delete(deletes)
+
+        return self.results
+
+    def error(self, index, errors):
+        self.results[index]['status'] = 400
+        self.results[index]['errors'] = errors
+        self.has_errors = True
+
+    def split(self):
+        """Return the `(index, row)` pairs of each operation."""
+        creates, updates, deletes = [], [], []
+        seen_ids = set()
+
+        for index, row in enumerate(self.rows):
+            if not isinstance(row, dict):
+                self.error(index, {'non_field_errors': [_('Expected an object.')]})
+                continue
+
+            row = dict(row)
+            op = row.pop('op', CREATE)
+            self.results[index]['op'] = op
+            if op not in OPERATIONS:
+                self.error(index, {'op': [_('Invalid operation.')]})
+                continue
+
+            if op == CREATE:
+                creates.append((index, row))
+                continue
+
+            item_id = row.pop('id', None)
+            self.results[index]['id'] = item_id
+            if isinstance(item_id, bool) or not isinstance(item_id, int):
+                self.error(index, {'id': [_('A valid integer is required.')]})
+            elif item_id in seen_ids:
+                self.error(index, {'id': [_('Duplicate item in request.')]})
+            else:
+                seen_ids.add(item_id)
+                (updates if op == UPDATE else deletes).append((index, row))
+
+        return creates, updates, deletes
+
+    def validate(self, pairs, partial=False):
+        """Validate rows in list mode and return their validated data."""
+        if not pairs:
+            return []
+
+        serializer = ItemDetailSerializer(
+            data=[row for _index, row in pairs],
+            many=True,
+            partial=partial,
+        )
+        if serializer.is_valid():
+            return serializer.validated_data
+
+        for (index, _row), errors in zip(pairs, serializer.errors):
+            if errors:
+                self.error(index, errors)
+        return []
+
+    def get_instances(self, pairs):
+        """Return the tenant's items referenced by the rows, by id."""
+        ids = [self.results[index]['id'] for index, _row in pairs]
+        instances = Item.objects.filter(tenant=self.tenant).in_bulk(ids)
+
+        for index, _row in pairs:
+            if self.results[index]['id'] not in instances:
+                self.error(index, {'id': [_('Not found.')]})
+
+        return instances
+
+    def next_seqs(self, count):
+        """Return `count` new change sequence numbers of the tenant."""
+        last = get_user_model().objects.next_item_seq(self.tenant.pk, count)
+        return range(last - count + 1, last + 1)
+
+    def create(self, pairs, validated):
+        if not pairs:
+            return
+        items = [
+            Item(tenant=self.tenant, change_seq=seq, **data)
+            for data, seq in zip(validated, self.next_seqs(len(validated)))
+        ]
+        Item.objects.bulk_create(items, batch_size=self.batch_size)
+
+        for (index, _row), item in zip(pairs, items):
+            self.results[index].update(id=item.id, status=201)
+
+    def update(self, pairs, validated, instances):
+        items, fields = [], set()
+        for (index, _row), data in zip(pairs, validated):
+            item = instances[self.results[index]['id']]
+            for field, value in data.items():
+                setattr(item, field, value)
+            fields.update(data)
+            items.append(item)
+            self.results[index]['status'] = 200
+
+        if fields:
+            for item, seq in zip(items, self.next_seqs(len(items))):
+                item.change_seq = seq
+            Item.objects.bulk_update(
+                items,
+                [*fields, 'change_seq'],
+                batch_size=self.batch_size,
+            )
+
+    def delete(self, pairs):
+        ids = [self.results[index]['id'] for index, _row in pairs]
+        if not ids:
+            return
+        # A plain DELETE instead of `QuerySet.delete()`, which would load
+        # every item to send `post_delete`. Its handlers are not needed:
+        # the tombstones are written below, and the summary falls behind
+        # the items version bumped for them, so its next read rebuilds it.
+        # No table references items, so there is nothing to cascade.
+        table = connection.ops.quote_name(Item._meta.db_table)
+        with connection.cursor() as cursor:
+            for start in range(0, len(ids), self.batch_size):
+                batch = ids[start:start + self.batch_size]
+                cursor.execute(
+                    f'DELETE FROM {table} WHERE tenant_id = %s '
+                    f'AND id IN ({", ".join(["%s"] * len(batch))})',
+                    [self.tenant.pk, *batch],
+                )
+        ItemTombstone.objects.bulk_create(
+            [
+                ItemTombstone(tenant=self.tenant, item_id=item_id, change_seq=seq)
+                for item_id, seq in zip(ids, self.next_seqs(len(ids)))
+            ],
+            batch_size=self.batch_size,
+        )
+
+        for index, _row in pairs:
+            self.results[index]['status'] = 204
@@ -0,0 +1,71 @@
+"""
+Server-side cache of serialized item responses.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+
+class ResponseCache:
+    """Cache serialized response data per tenant and items version.
+
+    Keys embed the tenant's `items_version`, which every item write bumps,
+    so a write invalidates all cached responses of the tenant in O(1)
+    without deleting keys; stale entries simply expire.
+
+    On a miss only the worker that wins a short `cache.add()` lock rebuilds
+    the entry. The others poll for the result for up to `WAIT` seconds and
+    then build it themselves, so a hot key is never rebuilt by every
+    worker at once.
+    """
+    poll_interval = 0.05
+
+    @property
+    def options(self):
+        return settings.ITEMS_RESPONSE_CACHE
+
+    @property
+    def cache(self):
+        return caches[self.options.get('ALIAS', 'default')]
+
+    def make_key(self, tenant_id, version, action, request):
+        """Return the cache key of a read request."""
+        variant = '|'.join([
+            request.get_full_path(),
+            request.META.get('HTTP_ACCEPT', ''),
+        ])
+        digest = hashlib.sha1(variant.encode()).hexdigest()
+        return f'items:{tenant_id}:{version}:{action}:{digest}'
+
+    def get_or_set(self, key, build):
+        """Return the data cached under `key`, building it on a miss."""
+        cache = self.cache
+        data = cache.get(key)
+        if data is not None:
+            return data
+
+        lock_key = f'{key}:lock'
+        if cache.add(lock_key, 1, self.options.get('LOCK_TIMEOUT', 10)):
+            try:
+                return self.build(key, build)
+            finally:
+                cache.delete(lock_key)
+
+        deadline = time.monotonic() + self.options.get('WAIT', 2)
+        while time.monotonic() < deadline:
+            time.sleep(self.poll_interval)
+            data = cache.get(key)
+            if data is not None:
+                return data
+
+        return self.build(key, build)
+
+    def build(self, key, build):
+        data = build()
+        self.cache.set(key, data, self.options.get('TIMEOUT', 300))
+        return data
+
+
+response_cache = ResponseCache()
@@ -0,0 +1,93 @@
+"""
+Change feed of a tenant's items.
+"""
+from heapq import merge
+from operator import itemgetter
+
+from django.contrib.auth import get_user_model
+from django.db import models, transaction
+
+from core.models import Item, ItemTombstone
+from items.serializers import ItemDetailListSerializer
+
+
+UPSERT = 'upsert'
+DELETE = 'delete'
+ITEM_FIELDS = ('id', 'name', 'price', 'description')
+
+NUMBERING_BATCH_SIZE = 1000
+
+
+def number_late_items(tenant_id):
+    """Number the tenant's items written without a change sequence number.
+
+    Processes still running the code from before the change feed, as
+    during the deploy that added it, write items without a number; those
+    take the tenant's next numbers here, like any change, so clients
+    already past them still see them. Otherwise this is one indexed
+    lookup finding nothing.
+    """
+    unnumbered = Item.objects.filter(tenant_id=tenant_id, change_seq__isnull=True)
+    while ids := list(
+        unnumbered.order_by('pk').values_list('pk', flat=True)[:NUMBERING_BATCH_SIZE]
+    ):
+        with transaction.atomic():
+            last = get_user_model().objects.next_item_seq(tenant_id, len(ids))
+            seqs = range(last - len(ids) + 1, last + 1)
+            unnumbered.filter(pk__in=ids).update(change_seq=models.Case(
+                *(
+                    models.When(pk=item_id, then=models.Value(seq))
+                    for item_id, seq in zip(ids, seqs)
+                ),
+                output_field=models.PositiveBigIntegerField(),
+            ))
+
+
+def get_item_changes(tenant_id, since, latest, page_size):
+    """Return the page of a tenant's item changes following `since`.
+
+    Every create and update gives the item the tenant's next change
+    sequence number and every delete writes a tombstone under one, so the
+    changes after `since` are read from the `(tenant, change_seq)` indexes
+    of both tables, at most `page_size + 1` rows each, whatever the number
+    of items. An item changed several times since is listed once, with
+    its latest state.
+
+    `latest` is the tenant's sequence number read before the page: every
+    change up to it has committed, so capping the page there never skips
+    a change still in flight. The returned `seq` is what to pass as
+    `since` next; once `has_more` is false the client is up to date.
+    """
+    window = {
+        'tenant_id': tenant_id,
+        'change_seq__gt': since,
+        'change_seq__lte': latest,
+    }
+    rows = list(
+        Item.objects.filter(**window)
+        .order_by('change_seq')
+        .values('change_seq', *ITEM_FIELDS)[:page_size + 1]
+    )
+    tombstones = (
+        ItemTombstone.objects.filter(**window)
+        .order_by('change_seq')
+        .values_list('change_seq', 'item_id')[:page_size + 1]
+    )
+
+    upserts = [
+        {'seq': row['change_seq'], 'op': UPSERT, 'id': row['id'], 'item': item}
+        for row, item in zip(rows, ItemDetailListSerializer(rows).data)
+    ]
+    deletes = [
+        {'seq': seq, 'op': DELETE, 'id': item_id}
+        for seq, item_id in tombstones
+    ]
+    changes = list(merge(upserts, deletes, key=itemgetter('seq')))
+    has_more = len(changes) > page_size
+    changes = changes[:page_size]
+
+    return {
+        'seq': changes[-1]['seq'] if has_more else latest,
+        'has_more': has_more,
+        'results': changes,
+    }
@@ -0,0 +1,212 @@
+"""
+Server-sent events of item changes.
+
+Django's ASGI handler runs every request in a context with a thread of
+its own for sync code, which the default middleware always uses, and
+keeps it until the response ends; Django 4.2 also never tells a view
+that its client has gone. An event stream served by a view would hold a
+thread for as long as it is open, so `ItemEventsApp` serves the stream
+in front of Django instead, from `config.asgi`, and passes every other
+request on.
+"""
+import asyncio
+import json
+import math
+from io import BytesIO
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.handlers.asgi import ASGIRequest
+from django.db import close_old_connections
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.settings import api_settings
+
+from core.authentication import CachedTokenAuthentication
+from core.mixins import get_rate_limit_headers
+from core.models import items_channel
+from core.pubsub import hub, subscribe
+from core.throttling import acheck_throttles
+
+
+class TooManyStreams(exceptions.APIException):
+    """The process already serves `ITEMS_EVENTS['MAX_CONNECTIONS']` streams."""
+    status_code = 503
+    default_detail = _('Too many open event streams.')
+    default_code = 'too_many_streams'
+
+
+class TooManyTenantStreams(exceptions.Throttled):
+    """The process already serves `MAX_TENANT_CONNECTIONS` of the tenant's streams."""
+    default_detail = _('Too many open event streams for this tenant.')
+    default_code = 'too_many_tenant_streams'
+
+
+class ItemEventsApp:
+    """Push the tenant's item change sequence as server-sent events.
+
+    `GET` on `ITEMS_EVENTS['PATH']` with the usual token opens a stream
+    with an `items` event carrying the tenant's latest change sequence
+    number, then one after every change; clients read the changes
+    themselves from the change feed instead of polling the item list.
+    Each event's `id` is its sequence number, which clients send back in
+    `Last-Event-ID` when they reconnect; a client already up to date gets
+    no event until the next change.
+
+    A waiting stream holds no thread and no database connection, only a
+    `core.pubsub` subscription, dropped as soon as the client disconnects.
+    Opening streams is throttled in the `events` scope, and a process
+    serves at most `MAX_TENANT_CONNECTIONS` streams of one tenant, so a
+    tenant cannot take all of its `MAX_CONNECTIONS`.
+    A comment every `HEARTBEAT` seconds keeps proxies from closing idle
+    streams. Streams end after `MAX_AGE` seconds, so clients reconnect
+    and a revoked token stops working.
+    """
+    authentication_class = CachedTokenAuthentication
+    throttle_classes = api_settings.DEFAULT_THROTTLE_CLASSES
+    throttle_scope = 'events'
+
+    def __init__(self, application):
+        self.application = application
+
+    async def __call__(self, scope, receive, send):
+        path = settings.ITEMS_EVENTS['PATH']
+        if scope['type'] == 'http' and scope['path'] == path:
+            await self.handle(scope, receive, send)
+        else:
+            await self.application(scope, receive, send)
+
+    async def handle(self, scope, receive, send):
+        options = settings.ITEMS_EVENTS
+        request = ASGIRequest(scope, BytesIO())
+        authenticator = self.authentication_class()
+        try:
+            if request.method != 'GET':
+                raise exceptions.MethodNotAllowed(request.method)
+            await sync_to_async(close_old_connections)()
+            credentials = await authenticator.aauthenticate(request)
+            if credentials is None:
+                raise exceptions.NotAuthenticated()
+            request.user, request.auth = credentials
+            await acheck_throttles(self, request)
+            if hub.count >= options['MAX_CONNECTIONS']:
+                raise TooManyStreams()
+            channel = items_channel(request.user.pk)
+            if hub.subscribers(channel) >= options['MAX_TENANT_CONNECTIONS']:
+                raise TooManyTenantStreams(options['RETRY'])
+        except exceptions.APIException as exc:
+            headers = get_rate_limit_headers(request)
+            if isinstance(
+                exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)
+            ):
+                headers['WWW-Authenticate'] = authenticator.authenticate_header(
+                    request,
+                )
+            elif isinstance(exc, exceptions.MethodNotAllowed):
+                headers['Allow'] = 'GET'
+            elif isinstance(exc, TooManyStreams):
+                headers['Retry-After'] = str(options['RETRY'])
+            elif isinstance(exc, exceptions.Throttled) and exc.wait is not None:
+                headers['Retry-After'] = str(math.ceil(exc.wait))
+            await self.send_error(send, exc, headers)
+            return
+
+        try:
+            last_seq = int(request.headers.get('Last-Event-ID', ''))
+        except ValueError:
+            last_seq = None
+
+        # Subscribe first, so a change committed meanwhile is not missed.
+        with subscribe(channel) as subscription:
+            latest = await get_user_model().objects.filter(
+                pk=request.user.pk,
+            ).values_list('items_version', flat=True).aget()
+            await send({
+                'type': 'http.response.start',
+                'status': 200,
+                'headers': [
+                    (b'content-type', b'text/event-stream'),
+                    (b'cache-control', b'no-cache'),
+                    # Keep nginx from buffering the stream.
+                    (b'x-accel-buffering', b'no'),
+                    *self.encode_headers(get_rate_limit_headers(request)),
+                ],
+            })
+            await self.stream(subscription, latest, last_seq, receive, send)
+
+    async def stream(self, subscription, latest, sent, receive, send):
+        """Send the subscription's events until the client leaves or max age."""
+        options = settings.ITEMS_EVENTS
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + options['MAX_AGE']
+        disconnected = asyncio.ensure_future(self.wait_for_disconnect(receive))
+
+        async def send_body(body):
+            await send({
+                'type': 'http.response.body',
+                'body': body.encode(),
+                'more_body': True,
+            })
+
+        try:
+            await send_body(f'retry: {options["RETRY"] * 1000}\n\n')
+            if latest != sent:
+                sent = latest
+                await send_body(self.format_event(sent))
+
+            while (remaining := deadline - loop.time()) > 0:
+                get = asyncio.ensure_future(
+                    subscription.get(min(options['HEARTBEAT'], remaining)),
+                )
+                await asyncio.wait(
+                    {get, disconnected},
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                if disconnected.done():
+                    get.cancel()
+                    return
+                message = get.result()
+                if message is None:
+                    if loop.time() < deadline:
+                        await send_body(': keep-alive\n\n')
+                elif message['seq'] > sent:
+                    # Publishes of concurrent writes may arrive out of order.
+                    sent = message['seq']
+                    await send_body(self.format_event(sent))
+
+            await send({'type': 'http.response.body', 'body': b''})
+        finally:
+            disconnected.cancel()
+
+    async def wait_for_disconnect(self, receive):
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+
+    async def send_error(self, send, exc, headers):
+        """Send the JSON error response DRF would send for `exc`."""
+        detail = exc.detail
+        if not isinstance(detail, (list, dict)):
+            detail = {'detail': detail}
+        await send({
+            'type': 'http.response.start',
+            'status': exc.status_code,
+            'headers': [
+                (b'content-type', b'application/json'),
+                *self.encode_headers(headers),
+            ],
+        })
+        await send({
+            'type': 'http.response.body',
+            'body': json.dumps(detail).encode(),
+        })
+
+    def encode_headers(self, headers):
+        return [
+            (name.lower().encode(), value.encode())
+            for name, value in headers.items()
+        ]
+
+    def format_event(self, seq):
+        data = json.dumps({'seq': seq})
+        return f'id: {seq}\nevent: items\ndata: {data}\n\n'
@@ -0,0 +1,83 @@
+"""
+Filter backends for the items app.
+"""
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend, OrderingFilter
+
+from core.models import Item
+
+
+class ItemFilter(BaseFilterBackend):
+    """Filter items by price range, name and creation time.
+
+    Every filter is combined with the tenant condition of the view's
+    queryset and is served by an index starting with `tenant_id`.
+    """
+    filters = {
+        'min_price': ('price__gte', 'price', _('Minimum price, inclusive.')),
+        'max_price': ('price__lte', 'price', _('Maximum price, inclusive.')),
+        'name': ('name__startswith', 'name', _('Name prefix.')),
+        'search': ('name__icontains', 'name', _('Text contained in the name.')),
+        'created_after': (
+            'created_at__gte',
+            'created_at',
+            _('Created at or after this ISO 8601 datetime.'),
+        ),
+        'created_before': (
+            'created_at__lt',
+            'created_at',
+            _('Created before this ISO 8601 datetime.'),
+        ),
+    }
+
+    def filter_queryset(self, request, queryset, view):
+        lookups, errors = {}, {}
+        for param, (lookup, field_name, _description) in self.filters.items():
+            value = request.query_params.get(param)
+            if value in (None, ''):
+                continue
+
+            field = Item._meta.get_field(field_name)
+            try:
+                lookups[lookup] = field.to_python(value)
+            except DjangoValidationError as exc:
+                errors[param] = exc.messages
+
+        if errors:
+            raise ValidationError(errors)
+
+        return queryset.filter(**lookups)
+
+    def get_schema_operation_parameters(self, view):
+        types = {'price': 'number', 'name': 'string', 'created_at': 'string'}
+        return [
+            {
+                'name': param,
+                'required': False,
+                'in': 'query',
+                'description': str(description),
+                'schema': {'type': types[field_name]},
+            }
+            for param, (_lookup, field_name, description) in self.filters.items()
+        ]
+
+
+class ItemOrderingFilter(OrderingFilter):
+    """Order items by a single sort key with `id` as the tie-breaker.
+
+    Only one key is honoured and the tie-breaker follows its direction, so
+    each ordering maps onto one `(tenant_id, <key>, id)` index scan and can
+    be used as a keyset pagination cursor.
+    """
+
+    def get_ordering(self, request, queryset, view):
+        ordering = super().get_ordering(request, queryset, view)
+        if not ordering:
+            return ordering
+
+        key = ordering[0]
+        if key.lstrip('-') == 'id':
+            return (key,)
+        return (key, '-id' if key.startswith('-') else 'id')
@@ -0,0 +1,121 @@
+"""
+Load test the sync and async item list endpoints.
+"""
+import asyncio
+import time
+from decimal import Decimal
+
+from asgiref.sync import ThreadSensitiveContext, sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.test import AsyncClient, override_settings
+from django.urls import reverse
+
+from core.models import AuthToken, Item
+
+
+class Command(BaseCommand):
+    """Compare the sync and async item list under concurrent clients.
+
+    Requests go through the full ASGI stack in-process. As behind an ASGI
+    server, each request runs its sync code in a thread of its own, so
+    the sync route pays the same thread hop and does its database work
+    concurrently. Items are seeded, and committed for those threads to
+    see, for a throwaway tenant deleted again at the end.
+    """
+    help = 'Load test the sync and async item list endpoints.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--items',
+            type=int,
+            default=1000,
+            help='Number of items to seed.',
+        )
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=500,
+            help='Number of requests per endpoint.',
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=50,
+            help='Number of concurrent clients.',
+        )
+        parser.add_argument(
+            '--page-size',
+            type=int,
+            default=100,
+            help='Items per listed page.',
+        )
+
+    def handle(self, *args, **options):
+        allowed_hosts = [*settings.ALLOWED_HOSTS, 'testserver']
+        # Measure the endpoint itself, not the tenant throttles.
+        throttle = {**settings.API_THROTTLE, 'RATES': {}}
+        with override_settings(ALLOWED_HOSTS=allowed_hosts, API_THROTTLE=throttle):
+            tenant = get_user_model().objects.create_user(
+                email='bench-endpoints@example.com',
+            )
+            try:
+                token = AuthToken.objects.issue(tenant)
+                Item.objects.bulk_create(
+                    [
+                        Item(tenant=tenant, name=f'Item {i}', price=Decimal(i) / 100)
+                        for i in range(options['items'])
+                    ],
+                    batch_size=1000,
+                )
+
+                for label, url_name in (
+                    ('sync', 'items:item-list'),
+                    ('async', 'items:async-item-list'),
+                ):
+                    # Not `async_to_sync()`: it would run every sync view of
+                    # the load in this thread, one at a time.
+                    latencies, elapsed = asyncio.run(
+                        self.load(reverse(url_name), token.key, options),
+                    )
+                    self.report(label, latencies, elapsed)
+            finally:
+                tenant.delete()
+
+    async def load(self, url, key, options):
+        """Send the requests and return their latencies and total time."""
+        client = AsyncClient()
+        headers = {'Authorization': f'Token {key}'}
+        params = {'page_size': options['page_size']}
+        semaphore = asyncio.Semaphore(options['concurrency'])
+        latencies = []
+
+        async def send():
+            # A context per request gives its sync code a thread of its own,
+            # as Django's ASGI handler does.
+            async with semaphore, ThreadSensitiveContext():
+                try:
+                    start = time.perf_counter()
+                    res = await client.get(url, params, headers=headers)
+                    latencies.append(time.perf_counter() - start)
+                finally:
+                    await sync_to_async(connections.close_all)()
+                if res.status_code != 200:
+                    raise RuntimeError(f'{url} returned {res.status_code}')
+
+        start = time.perf_counter()
+        await asyncio.gather(*(send() for _request in range(options['requests'])))
+        return latencies, time.perf_counter() - start
+
+    def report(self, label, latencies, elapsed):
+        latencies.sort()
+
+        def percentile(p):
+            return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000
+
+        self.stdout.write(
+            f'{label}: {len(latencies) / elapsed:,.0f} req/s, '
+            f'p50 {percentile(0.5):.1f} ms, p95 {percentile(0.95):.1f} ms'
+        )
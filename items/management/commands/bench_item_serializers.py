@@ -0,0 +1,86 @@
+"""
+Benchmark the item list serializers.
+"""
+import time
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.models import Item
+from items.serializers import ItemListSerializer, ItemSerializer
+
+
+class Command(BaseCommand):
+    """Compare rows/sec of `ItemSerializer` and `ItemListSerializer`.
+
+    Items are seeded for a throwaway tenant inside a transaction that is
+    rolled back at the end, so the database is left untouched.
+    """
+    help = 'Benchmark item list serialization throughput.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rows',
+            type=int,
+            nargs='+',
+            default=[10000, 100000],
+            help='Number of items to serialize, one run per value.',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=3,
+            help='Timed repetitions per run; the best one is reported.',
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            tenant = get_user_model().objects.create_user(
+                email='bench-serializers@example.com',
+            )
+            seeded = 0
+            for rows in sorted(options['rows']):
+                Item.objects.bulk_create(
+                    [
+                        Item(tenant=tenant, name=f'Item {i}', price=Decimal(i) / 100)
+                        for i in range(seeded, rows)
+                    ],
+                    batch_size=1000,
+                )
+                seeded = max(seeded, rows)
+                self.run(tenant, rows, options['repeat'])
+
+            transaction.set_rollback(True)
+
+    def run(self, tenant, rows, repeat):
+        queryset = Item.objects.filter(tenant=tenant).order_by('id')[:rows]
+
+        model_rate = self.measure(
+            lambda: ItemSerializer(queryset.all(), many=True).data,
+            rows,
+            repeat,
+        )
+        values_rate = self.measure(
+            lambda: ItemListSerializer(
+                queryset.values('id', 'name', 'price'),
+            ).data,
+            rows,
+            repeat,
+        )
+
+        self.stdout.write(
+            f'{rows} rows: ItemSerializer {model_rate:,.0f} rows/s, '
+            f'ItemListSerializer {values_rate:,.0f} rows/s '
+            f'({values_rate / model_rate:.1f}x)'
+        )
+
+    def measure(self, serialize, rows, repeat):
+        """Return the best rows/sec of `serialize` over `repeat` runs."""
+        best = float('inf')
+        for _run in range(repeat):
+            start = time.perf_counter()
+            serialize()
+            best = min(best, time.perf_counter() - start)
+        return rows / best
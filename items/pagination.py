@@ -0,0 +1,208 @@
+"""
+Pagination classes for the items app.
+"""
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from binascii import Error as BinasciiError
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """Forward-only keyset pagination with an opaque cursor.
+
+    The cursor encodes the values of the ordering fields of the last row on
+    the page, so the next page is fetched with a range condition instead of
+    an OFFSET and costs the same no matter how deep the client pages.
+
+    Pagination is opt-in: requests without a `cursor` or `page_size` query
+    parameter get the plain, unpaginated list.
+    """
+    ordering = ('-created_at', '-id')
+    page_size = 100
+    max_page_size = 1000
+    cursor_query_param = 'cursor'
+    cursor_query_description = _('The pagination cursor value.')
+    page_size_query_param = 'page_size'
+    page_size_query_description = _('Number of results to return per page.')
+    invalid_cursor_message = _('Invalid cursor')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """Return a single page of results, or `None` if not paginating."""
+        queryset = self.get_page_queryset(queryset, request, view)
+        if queryset is None:
+            return None
+
+        return self.set_page(list(queryset))
+
+    def get_page_queryset(self, queryset, request, view=None):
+        """Return the unevaluated queryset of a page, or `None`.
+
+        The queryset fetches one row more than the page size to detect a
+        next page; pass its results to `set_page()`. Async views evaluate
+        it with `async for` instead of going through `paginate_queryset()`.
+        """
+        params = request.query_params
+        if (
+            self.cursor_query_param not in params
+            and self.page_size_query_param not in params
+        ):
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(request, queryset, view)
+
+        queryset = queryset.order_by(*self.ordering)
+        position = self.decode_cursor(request, queryset.model)
+        if position is not None:
+            queryset = queryset.filter(self.get_position_filter(position))
+
+        return queryset[:self.page_size + 1]
+
+    def set_page(self, results):
+        """Keep and return the page from the results of a page queryset."""
+        self.has_next = len(results) > self.page_size
+        self.page = results[:self.page_size]
+        return self.page
+
+    def get_ordering(self, request, queryset, view):
+        """Return the ordering used to build and resolve cursors.
+
+        As with DRF's `CursorPagination`, an ordering requested through the
+        view's ordering filter takes precedence over the default.
+        """
+        for filter_class in getattr(view, 'filter_backends', []):
+            if hasattr(filter_class, 'get_ordering'):
+                ordering = filter_class().get_ordering(request, queryset, view)
+                if ordering:
+                    return tuple(ordering)
+
+        return self.ordering
+
+    def get_page_size(self, request):
+        """Return the page size requested by the client, within limits."""
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def get_position_filter(self, position):
+        """Return a filter selecting the rows after `position`.
+
+        For an ordering `(a, b)` this is `a <= A AND (a < A OR (a = A AND
+        b < B))` (with the comparisons flipped for ascending fields). The
+        redundant leading bound lets the database start an index range
+        scan at the cursor rather than filtering from the top.
+        """
+        fields = [(name.lstrip('-'), name.startswith('-')) for name in self.ordering]
+
+        condition = Q()
+        for index in reversed(range(len(fields))):
+            name, descending = fields[index]
+            lookup = 'lt' if descending else 'gt'
+            after = Q(**{f'{name}__{lookup}': position[index]})
+            if index == len(fields) - 1:
+                condition = after
+            else:
+                condition = after | (Q(**{name: position[index]}) & condition)
+
+        name, descending = fields[0]
+        lookup = 'lte' if descending else 'gte'
+        return Q(**{f'{name}__{lookup}': position[0]}) & condition
+
+    def get_position(self, row):
+        """Return the ordering field values of a row or instance."""
+        position = []
+        for name in self.ordering:
+            name = name.lstrip('-')
+            value = row[name] if isinstance(row, dict) else getattr(row, name)
+            position.append(value)
+        return position
+
+    def decode_cursor(self, request, model):
+        """Return the position encoded in the request cursor, if any."""
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+
+        try:
+            payload = json.loads(urlsafe_b64decode(encoded.encode('ascii')))
+            ordering, values = payload['o'], payload['p']
+            if ordering != list(self.ordering) or len(values) != len(ordering):
+                raise ValueError
+            return [
+                model._meta.get_field(name.lstrip('-')).to_python(value)
+                for name, value in zip(ordering, values)
+            ]
+        except (
+            BinasciiError, KeyError, TypeError, ValueError, ValidationError,
+        ):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, position):
+        """Return an opaque cursor for the given position."""
+        values = [
+            value.isoformat() if hasattr(value, 'isoformat') else value
+            for value in position
+        ]
+        payload = json.dumps(
+            {'o': list(self.ordering), 'p': values},
+            separators=(',', ':'),
+            default=str,
+        )
+        return urlsafe_b64encode(payload.encode('ascii')).decode('ascii')
+
+    def get_next_link(self):
+        """Return the URL of the next page, or `None` on the last page."""
+        if not self.has_next:
+            return None
+
+        cursor = self.encode_cursor(self.get_position(self.page[-1]))
+        return replace_query_param(self.base_url, self.cursor_query_param, cursor)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {
+                    'type': 'string',
+                    'nullable': True,
+                },
+                'results': schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                'name': self.cursor_query_param,
+                'required': False,
+                'in': 'query',
+                'description': str(self.cursor_query_description),
+                'schema': {'type': 'string'},
+            },
+            {
+                'name': self.page_size_query_param,
+                'required': False,
+                'in': 'query',
+                'description': str(self.page_size_query_description),
+                'schema': {'type': 'integer'},
+            },
+        ]
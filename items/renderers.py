@@ -0,0 +1,58 @@
+"""
+Renderers for the items app.
+"""
+import csv
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from rest_framework.renderers import BaseRenderer
+
+
+class _Echo:
+    """File-like object whose `write` returns the value written."""
+
+    def write(self, value):
+        return value
+
+
+class NDJSONRenderer(BaseRenderer):
+    """Render objects as newline-delimited JSON."""
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        rows = data if isinstance(data, list) else [data]
+        return ''.join(self.dumps(row) for row in rows).encode(self.charset)
+
+    def dumps(self, row):
+        return json.dumps(row, cls=DjangoJSONEncoder) + '\n'
+
+    def stream(self, fields, rows):
+        """Yield one NDJSON line per `values_list` row."""
+        for row in rows:
+            yield self.dumps(dict(zip(fields, row)))
+
+
+class CSVRenderer(BaseRenderer):
+    """Render objects as CSV with a header row."""
+    media_type = 'text/csv'
+    format = 'csv'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if not data:
+            return b''
+        rows = data if isinstance(data, list) else [data]
+        fields = list(rows[0])
+        values = ([row.get(field) for field in fields] for row in rows)
+        return ''.join(self.stream(fields, values)).encode(self.charset)
+
+    def stream(self, fields, rows):
+        """Yield the header and then one CSV line per `values_list` row."""
+        writer = csv.writer(_Echo())
+        yield writer.writerow(fields)
+        for row in rows:
+            yield writer.writerow(row)
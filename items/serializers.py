@@ -3,10 +3,11 @@ Serializers for the items app.
 """
 from rest_framework import serializers
 
+from core.metrics import TimedSerializerMixin, timed_serializer
 from core.models import Item
 
 
-class ItemSerializer(serializers.ModelSerializer):
+class ItemSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Serializer for items."""
 
     class Meta:
@@ -20,3 +21,49 @@ class ItemDetailSerializer(ItemSerializer):
 
     class Meta(ItemSerializer.Meta):
         fields = ItemSerializer.Meta.fields + ['description']
+
+
+class ItemListSerializer:
+    """Read-only, high-throughput serializer for item list responses.
+
+    Builds the output of `ItemSerializer` directly from `.values()` rows,
+    skipping model instantiation and DRF's per-field attribute lookup. The
+    `to_representation` of every `ItemSerializer` field is looked up once
+    and reused, so the output is identical to the model serializer's.
+    Writes keep going through `ItemSerializer`.
+    """
+    serializer_class = ItemSerializer
+    _converters = None
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    @classmethod
+    def get_converters(cls):
+        """Return `(name, to_representation)` pairs for each field."""
+        if cls._converters is None:
+            fields = cls.serializer_class().fields
+            cls._converters = tuple(
+                (name, field.to_representation)
+                for name, field in fields.items()
+                if not field.write_only
+            )
+        return cls._converters
+
+    @property
+    def data(self):
+        converters = self.get_converters()
+        with timed_serializer():
+            return [
+                {
+                    name: None if row[name] is None else convert(row[name])
+                    for name, convert in converters
+                }
+                for row in self.rows
+            ]
+
+
+class ItemDetailListSerializer(ItemListSerializer):
+    """Read-only counterpart of `ItemDetailSerializer` for `.values()` rows."""
+    serializer_class = ItemDetailSerializer
+    _converters = None
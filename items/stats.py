@@ -0,0 +1,87 @@
+"""
+Aggregate statistics of a tenant's items.
+"""
+from django.db.models import Avg, Count, F, IntegerField, Max, Min, Sum
+from django.db.models.functions import Cast, Floor, Least
+
+from core.models import ItemSummary
+
+
+def get_item_stats(queryset, buckets):
+    """Return count, price aggregates and a price histogram of `queryset`.
+
+    The aggregates are computed by the database in one query and the
+    histogram with a second, grouped query over equal-width buckets.
+    """
+    queryset = queryset.order_by()
+    stats = queryset.aggregate(
+        count=Count('id'),
+        total_value=Sum('price'),
+        min_price=Min('price'),
+        max_price=Max('price'),
+        avg_price=Avg('price'),
+    )
+    stats['total_value'] = stats['total_value'] or 0
+    stats['histogram'] = get_histogram(
+        queryset,
+        stats['count'],
+        stats['min_price'],
+        stats['max_price'],
+        buckets,
+    )
+    return stats
+
+
+def get_summary_stats(tenant_id, queryset, buckets=None):
+    """Return the stats of all of a tenant's items from its summary row.
+
+    The histogram is the one part that needs a pass over the items, so it
+    is only included when `buckets` is given.
+    """
+    summary = ItemSummary.objects.get_current(tenant_id)
+    stats = {
+        'count': summary.count,
+        'total_value': summary.total_price,
+        'min_price': summary.min_price,
+        'max_price': summary.max_price,
+        'avg_price': summary.total_price / summary.count if summary.count else None,
+    }
+    if buckets is None:
+        return stats
+
+    stats['histogram'] = get_histogram(
+        queryset.order_by(),
+        summary.count,
+        summary.min_price,
+        summary.max_price,
+        buckets,
+    )
+    return stats
+
+
+def get_histogram(queryset, count, low, high, buckets):
+    """Return the item counts of `buckets` equal-width price buckets."""
+    if not count:
+        return []
+    if low == high:
+        return [{'min_price': low, 'max_price': high, 'count': count}]
+
+    width = (high - low) / buckets
+    bucket = Least(
+        Cast(Floor((F('price') - low) / width), IntegerField()),
+        buckets - 1,
+    )
+    counts = dict(
+        queryset.annotate(bucket=bucket)
+        .values('bucket')
+        .annotate(count=Count('id'))
+        .values_list('bucket', 'count')
+    )
+    return [
+        {
+            'min_price': low + index * width,
+            'max_price': high if index == buckets - 1 else low + (index + 1) * width,
+            'count': counts.get(index, 0),
+        }
+        for index in range(buckets)
+    ]
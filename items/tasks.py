@@ -0,0 +1,14 @@
+"""
+Background tasks of the items API.
+"""
+from django.conf import settings
+
+from core.models import ItemSummary
+from core.tasks import task
+
+
+@task
+def refresh_item_summary(tenant_id):
+    """Rebuild a tenant's item summary ahead of the next stats request."""
+    if settings.ITEMS_STATS_SUMMARY:
+        ItemSummary.objects.refresh(tenant_id)
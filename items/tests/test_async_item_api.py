@@ -0,0 +1,171 @@
+"""
+Tests for the async item APIs.
+"""
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.authentication import token_cache
+from core.models import AuthToken, Item
+
+
+ASYNC_ITEMS_URL = reverse('items:async-item-list')
+ITEMS_URL = reverse('items:item-list')
+
+
+def async_detail_url(item_id):
+    """Create and return an async item detail URL."""
+    return reverse('items:async-item-detail', args=[item_id])
+
+
+def create_tenant(**params):
+    """Create and return a new tenant."""
+    return get_user_model().objects.create_user(**params)
+
+
+class PublicAsyncItemApiTests(TestCase):
+    """Test unauthenticated async API requests."""
+
+    async def test_auth_required(self):
+        """Test auth is required to call the async API."""
+        res = await self.async_client.get(ASYNC_ITEMS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(res['WWW-Authenticate'], 'Token')
+
+    async def test_invalid_token(self):
+        """Test an unknown token is rejected."""
+        res = await self.async_client.get(
+            ASYNC_ITEMS_URL,
+            headers={'Authorization': 'Token unknown'},
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class PrivateAsyncItemApiTests(TestCase):
+    """Test authenticated async API requests."""
+
+    def setUp(self):
+        cache.clear()
+        token_cache.clear()
+        self.tenant = create_tenant(email='tenant@example.com', password='test123')
+        self.token = AuthToken.objects.issue(self.tenant)
+        self.headers = {'Authorization': f'Token {self.token.key}'}
+        self.sync_client = APIClient()
+        self.sync_client.force_authenticate(self.tenant)
+
+    def create_items(self, *prices):
+        """Create an item of the tenant for each price."""
+        for price in prices:
+            Item.objects.create(tenant=self.tenant, name=f'Item {price}', price=price)
+
+    async def test_list_items(self):
+        """Test listing the tenant's items, sorted."""
+        await Item.objects.acreate(tenant=self.tenant, name='A', price=2)
+        await Item.objects.acreate(tenant=self.tenant, name='B', price=1)
+        other = await get_user_model().objects.acreate(email='other@example.com')
+        await Item.objects.acreate(tenant=other, name='Other', price=3)
+
+        res = await self.async_client.get(
+            ASYNC_ITEMS_URL,
+            {'ordering': 'price'},
+            headers=self.headers,
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([item['name'] for item in res.json()], ['B', 'A'])
+
+    def test_list_same_data_as_sync_route(self):
+        """Test both routes serialize items identically."""
+        self.create_items(1, 2.5, 3)
+
+        sync_res = self.sync_client.get(ITEMS_URL)
+        async_res = self.client.get(ASYNC_ITEMS_URL, headers=self.headers)
+
+        self.assertEqual(async_res.json(), sync_res.json())
+
+    def test_paginate_list(self):
+        """Test the async list follows keyset pagination cursors."""
+        self.create_items(3, 1, 2, 5)
+
+        res = self.client.get(
+            ASYNC_ITEMS_URL,
+            {'ordering': 'price', 'page_size': 3},
+            headers=self.headers,
+        )
+        prices = [item['price'] for item in res.json()['results']]
+        res = self.client.get(res.json()['next'], headers=self.headers)
+        prices += [item['price'] for item in res.json()['results']]
+
+        self.assertEqual(prices, ['1.00', '2.00', '3.00', '5.00'])
+        self.assertIsNone(res.json()['next'])
+
+    async def test_invalid_filter_error(self):
+        """Test an invalid filter returns the sync route's error."""
+        res = await self.async_client.get(
+            ASYNC_ITEMS_URL,
+            {'min_price': 'cheap'},
+            headers=self.headers,
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('min_price', res.json())
+
+    async def test_create_item(self):
+        """Test creating an item."""
+        payload = {'name': 'Sample', 'price': 5.5, 'description': 'Text'}
+
+        res = await self.async_client.post(
+            ASYNC_ITEMS_URL,
+            payload,
+            content_type='application/json',
+            headers=self.headers,
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        item = await Item.objects.aget(id=res.json()['id'])
+        self.assertEqual(item.tenant_id, self.tenant.pk)
+        self.assertEqual(item.name, 'Sample')
+
+    async def test_create_invalid_item(self):
+        """Test validation errors are returned for an invalid item."""
+        res = await self.async_client.post(
+            ASYNC_ITEMS_URL,
+            {'name': 'Sample'},
+            content_type='application/json',
+            headers=self.headers,
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('price', res.json())
+        self.assertFalse(await Item.objects.aexists())
+
+    async def test_retrieve_item(self):
+        """Test retrieving an item of the tenant."""
+        item = await Item.objects.acreate(
+            tenant=self.tenant, name='Sample', price=5, description='Text',
+        )
+
+        res = await self.async_client.get(
+            async_detail_url(item.id),
+            headers=self.headers,
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.json()['description'], 'Text')
+
+    async def test_retrieve_other_tenants_item(self):
+        """Test items of other tenants are not found."""
+        other = await get_user_model().objects.acreate(email='other@example.com')
+        item = await Item.objects.acreate(tenant=other, name='Other', price=1)
+
+        res = await self.async_client.get(
+            async_detail_url(item.id),
+            headers=self.headers,
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
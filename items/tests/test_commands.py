@@ -0,0 +1,47 @@
+"""
+Test the items management commands.
+"""
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase
+
+from core.models import Item
+
+
+class BenchItemSerializersTests(TestCase):
+    """Test the serializer benchmark command."""
+
+    def test_reports_rates_and_rolls_back(self):
+        """Test a rate is reported per run and no items are kept."""
+        out = StringIO()
+
+        call_command('bench_item_serializers', rows=[10, 20], repeat=1, stdout=out)
+
+        lines = out.getvalue().splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertTrue(lines[0].startswith('10 rows:'))
+        self.assertFalse(Item.objects.exists())
+
+
+class BenchItemEndpointsTests(TransactionTestCase):
+    """Test the sync/async endpoint load test command.
+
+    Its requests run in threads of their own, which only see committed data.
+    """
+
+    def test_reports_both_routes_and_cleans_up(self):
+        """Test a line is reported per route and no items are kept."""
+        out = StringIO()
+
+        call_command(
+            'bench_item_endpoints',
+            items=5,
+            requests=4,
+            concurrency=2,
+            stdout=out,
+        )
+
+        lines = out.getvalue().splitlines()
+        self.assertEqual([line.split(':')[0] for line in lines], ['sync', 'async'])
+        self.assertFalse(Item.objects.exists())
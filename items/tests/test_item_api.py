@@ -1,9 +1,14 @@
 """
 Test the item APIs.
 """
+import csv
+import io
+import json
 from decimal import Decimal
+from unittest import mock
 
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.test import TestCase
 from django.urls import reverse
 
@@ -11,11 +16,20 @@ from rest_framework import status
 from rest_framework.test import APIClient
 
 from core.models import Item
+from core.testing import QueryBudgetMixin
 
-from items.serializers import ItemSerializer, ItemDetailSerializer
+from items.cache import ResponseCache
+from items.serializers import (
+    ItemDetailSerializer,
+    ItemListSerializer,
+    ItemSerializer,
+)
 
 
 ITEMS_URL = reverse('items:item-list')
+BULK_URL = reverse('items:item-bulk')
+EXPORT_URL = reverse('items:item-export')
+STATS_URL = reverse('items:item-stats')
 
 
 def detail_url(item_id):
@@ -58,6 +72,7 @@ class PrivateItemApiTests(TestCase):
     """Test authenticated API requests."""
 
     def setUp(self):
+        cache.clear()
         self.client = APIClient()
         self.tenant = create_tenant(email='tenant@example.com', password='test123')
         self.client.force_authenticate(self.tenant)
@@ -87,6 +102,15 @@ class PrivateItemApiTests(TestCase):
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         self.assertEqual(res.data, serializer.data)
 
+    def test_deactivated_tenant_items_hidden(self):
+        """Test items of a deactivated tenant are no longer returned."""
+        create_item(tenant=self.tenant)
+        self.tenant.is_active = False
+
+        res = self.client.get(ITEMS_URL)
+
+        self.assertEqual(res.data, [])
+
     def test_get_item_detail(self):
         """Test viewing an item detail."""
         item = create_item(tenant=self.tenant)
@@ -182,3 +206,323 @@ class PrivateItemApiTests(TestCase):
 
         self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
         self.assertTrue(Item.objects.filter(id=item.id).exists())
+
+    def test_list_items_paginated_with_cursor(self):
+        """Test paging through items with a keyset cursor."""
+        items = [create_item(tenant=self.tenant, name=f'Item {i}') for i in range(5)]
+        other_tenant = create_tenant(email='other@example.com', password='test123')
+        create_item(tenant=other_tenant)
+
+        res = self.client.get(ITEMS_URL, {'page_size': 2})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['results']), 2)
+        self.assertIsNotNone(res.data['next'])
+
+        seen = [item['id'] for item in res.data['results']]
+        next_url = res.data['next']
+        while next_url:
+            res = self.client.get(next_url)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            seen += [item['id'] for item in res.data['results']]
+            next_url = res.data['next']
+
+        expected = sorted(items, key=lambda i: (i.created_at, i.id), reverse=True)
+        self.assertEqual(seen, [item.id for item in expected])
+
+    def test_list_items_invalid_cursor(self):
+        """Test an invalid cursor returns an error."""
+        res = self.client.get(ITEMS_URL, {'cursor': 'not-a-cursor'})
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_bulk_create_update_delete(self):
+        """Test applying mixed operations in one request."""
+        updated = create_item(tenant=self.tenant, name='Old Name')
+        deleted = create_item(tenant=self.tenant)
+        payload = [
+            {'op': 'create', 'name': 'New Item', 'price': '2.50'},
+            {'op': 'update', 'id': updated.id, 'name': 'New Name'},
+            {'op': 'delete', 'id': deleted.id},
+        ]
+
+        res = self.client.post(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([row['status'] for row in res.data], [201, 200, 204])
+        created = Item.objects.get(id=res.data[0]['id'])
+        self.assertEqual(created.tenant, self.tenant)
+        self.assertEqual(created.name, 'New Item')
+        updated.refresh_from_db()
+        self.assertEqual(updated.name, 'New Name')
+        self.assertFalse(Item.objects.filter(id=deleted.id).exists())
+
+    def test_bulk_invalid_row_writes_nothing(self):
+        """Test one invalid row rejects the whole batch."""
+        other_tenant = create_tenant(email='other@example.com', password='test123')
+        other_item = create_item(tenant=other_tenant)
+        payload = [
+            {'op': 'create', 'name': 'New Item', 'price': '2.50'},
+            {'op': 'create', 'name': 'No Price'},
+            {'op': 'delete', 'id': other_item.id},
+        ]
+
+        res = self.client.post(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertNotIn('errors', res.data[0])
+        self.assertIn('price', res.data[1]['errors'])
+        self.assertIn('id', res.data[2]['errors'])
+        self.assertFalse(Item.objects.filter(tenant=self.tenant).exists())
+        self.assertTrue(Item.objects.filter(id=other_item.id).exists())
+
+    def test_bulk_create_from_ndjson(self):
+        """Test creating items from newline-delimited JSON."""
+        rows = [{'name': f'Item {i}', 'price': i} for i in range(3)]
+        body = '\n'.join(json.dumps(row) for row in rows)
+
+        res = self.client.post(
+            BULK_URL,
+            body,
+            content_type='application/x-ndjson',
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(Item.objects.filter(tenant=self.tenant).count(), 3)
+
+    def test_export_items_ndjson(self):
+        """Test streaming the tenant's items as NDJSON."""
+        item = create_item(tenant=self.tenant, name='Item 1')
+        other_tenant = create_tenant(email='other@example.com', password='test123')
+        create_item(tenant=other_tenant)
+
+        res = self.client.get(EXPORT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res.streaming)
+        self.assertTrue(res['Content-Type'].startswith('application/x-ndjson'))
+        lines = b''.join(res.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 1)
+        row = json.loads(lines[0])
+        self.assertEqual(row['id'], item.id)
+        self.assertEqual(row['name'], item.name)
+        self.assertEqual(row['description'], item.description)
+
+    def test_export_items_csv(self):
+        """Test streaming the tenant's items as CSV."""
+        create_item(tenant=self.tenant, name='Item, with comma')
+        create_item(tenant=self.tenant, name='Item 2')
+
+        res = self.client.get(EXPORT_URL, {'format': 'csv'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res['Content-Type'].startswith('text/csv'))
+        content = b''.join(res.streaming_content).decode()
+        rows = list(csv.DictReader(io.StringIO(content)))
+        self.assertEqual(
+            [row['name'] for row in rows],
+            ['Item 2', 'Item, with comma'],
+        )
+
+    def test_list_serializer_matches_model_serializer(self):
+        """Test the values-based list serializer matches ItemSerializer."""
+        create_item(tenant=self.tenant, price=Decimal('5.25'))
+        create_item(tenant=self.tenant, name='Another Item')
+        items = Item.objects.filter(tenant=self.tenant).order_by('-id')
+
+        serializer = ItemListSerializer(items.values('id', 'name', 'price'))
+
+        self.assertEqual(serializer.data, ItemSerializer(items, many=True).data)
+
+    def test_list_not_modified(self):
+        """Test an unchanged list is answered with 304 without a query."""
+        create_item(tenant=self.tenant)
+        res = self.client.get(ITEMS_URL)
+        etag = res['ETag']
+
+        with self.assertNumQueries(1):
+            res = self.client.get(ITEMS_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res['ETag'], etag)
+
+    def test_list_modified_after_write(self):
+        """Test writing an item changes the list validators."""
+        item = create_item(tenant=self.tenant)
+        res = self.client.get(ITEMS_URL)
+        etag = res['ETag']
+
+        self.client.patch(detail_url(item.id), {'name': 'New Name'})
+        res = self.client.get(ITEMS_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res['ETag'], etag)
+
+    def test_retrieve_not_modified_since(self):
+        """Test an unchanged item is answered with 304 on If-Modified-Since."""
+        item = create_item(tenant=self.tenant)
+        res = self.client.get(detail_url(item.id))
+
+        res = self.client.get(
+            detail_url(item.id),
+            HTTP_IF_MODIFIED_SINCE=res['Last-Modified'],
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_retrieve_not_modified_requires_own_item(self):
+        """Test other tenants' items are not found, even when not modified."""
+        create_item(tenant=self.tenant)
+        other_tenant = create_tenant(email='other@example.com', password='test123')
+        other_item = create_item(tenant=other_tenant)
+        res = self.client.get(ITEMS_URL)
+
+        res = self.client.get(
+            detail_url(other_item.id),
+            HTTP_IF_MODIFIED_SINCE=res['Last-Modified'],
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_list_served_from_response_cache(self):
+        """Test a repeated list is served from the cache until a write."""
+        create_item(tenant=self.tenant, name='Item 1')
+        self.client.get(ITEMS_URL)
+
+        with self.assertNumQueries(1):
+            res = self.client.get(ITEMS_URL)
+        self.assertEqual(len(res.data), 1)
+
+        create_item(tenant=self.tenant, name='Item 2')
+        res = self.client.get(ITEMS_URL)
+        self.assertEqual(len(res.data), 2)
+
+    def test_response_cache_separates_query_params(self):
+        """Test cached lists are keyed by their query parameters."""
+        for i in range(3):
+            create_item(tenant=self.tenant, name=f'Item {i}')
+
+        res = self.client.get(ITEMS_URL)
+        self.assertEqual(len(res.data), 3)
+
+        res = self.client.get(ITEMS_URL, {'page_size': 2})
+        self.assertEqual(len(res.data['results']), 2)
+
+
+class ItemQueryBudgetTests(QueryBudgetMixin, TestCase):
+    """Test item endpoints run a fixed number of queries."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.tenant = create_tenant(email='tenant@example.com', password='test123')
+        self.client.force_authenticate(self.tenant)
+
+    def prepare_budget_request(self):
+        cache.clear()
+
+    def seed(self, count):
+        """Add `count` items to the tenant."""
+        Item.objects.bulk_create([
+            Item(tenant=self.tenant, name=f'Item {i}', price=Decimal('5.00'))
+            for i in range(count)
+        ])
+
+    def get(self, url, params=None):
+        """Return a request callable asserting a successful GET."""
+        def request():
+            res = self.client.get(url, params)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            if res.streaming:
+                b''.join(res.streaming_content)
+        return request
+
+    def test_list_budget(self):
+        """Test listing all items."""
+        self.assertQueryBudget('list', 2, self.seed, self.get(ITEMS_URL))
+
+    def test_list_page_budget(self):
+        """Test listing a page of items."""
+        self.assertQueryBudget(
+            'list page',
+            2,
+            self.seed,
+            self.get(ITEMS_URL, {'page_size': 20}),
+        )
+
+    def test_retrieve_budget(self):
+        """Test retrieving one item."""
+        self.seed(1)
+        url = detail_url(Item.objects.first().id)
+
+        self.assertQueryBudget('retrieve', 2, self.seed, self.get(url))
+
+    def test_stats_budget(self):
+        """Test item statistics."""
+        self.assertQueryBudget('stats', 2, self.seed, self.get(STATS_URL))
+
+    def test_export_budget(self):
+        """Test exporting every item."""
+        self.assertQueryBudget('export', 1, self.seed, self.get(EXPORT_URL))
+
+    def test_report_groups_repeated_queries(self):
+        """Test an N+1 is reported as one repeated query shape."""
+        def request():
+            for item in Item.objects.all():
+                item.tenant.email
+
+        with self.assertRaisesRegex(AssertionError, r'3 x SELECT .* = \?'):
+            self.assertQueryBudget('n+1', 2, self.seed, request, sizes=[3])
+
+    def test_growing_query_count_fails(self):
+        """Test a count within budget still fails if it grows with rows."""
+        def request():
+            for item in Item.objects.all()[:3]:
+                item.tenant.email
+
+        with self.assertRaisesRegex(AssertionError, 'changes with the rows'):
+            self.assertQueryBudget('n+1', 10, self.seed, request, sizes=[1, 3])
+
+
+class ResponseCacheTests(TestCase):
+    """Test the item response cache."""
+
+    def setUp(self):
+        cache.clear()
+        self.response_cache = ResponseCache()
+        self.response_cache.poll_interval = 0.01
+
+    def test_cached_data_not_rebuilt(self):
+        """Test a cache hit does not call the builder."""
+        self.response_cache.get_or_set('key', lambda: 'data')
+
+        data = self.response_cache.get_or_set('key', self.fail)
+
+        self.assertEqual(data, 'data')
+
+    def test_waits_for_rebuild_in_progress(self):
+        """Test a worker waits for the lock holder's result."""
+        cache.add('key:lock', 1)
+        builds = []
+
+        def build():
+            builds.append(1)
+            return 'rebuilt'
+
+        def finish_rebuild(seconds):
+            cache.set('key', 'from other worker')
+
+        with self.settings(ITEMS_RESPONSE_CACHE={'WAIT': 1}):
+            with mock.patch('items.cache.time.sleep', finish_rebuild):
+                data = self.response_cache.get_or_set('key', build)
+
+        self.assertEqual(data, 'from other worker')
+        self.assertEqual(builds, [])
+
+    def test_builds_after_waiting_for_stale_lock(self):
+        """Test a worker builds the data itself if the lock holder stalls."""
+        cache.add('key:lock', 1)
+
+        with self.settings(ITEMS_RESPONSE_CACHE={'WAIT': 0.05}):
+            data = self.response_cache.get_or_set('key', lambda: 'data')
+
+        self.assertEqual(data, 'data')
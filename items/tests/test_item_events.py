@@ -0,0 +1,191 @@
+"""
+Test the server-sent events of item changes.
+"""
+import json
+import time
+from types import SimpleNamespace
+from unittest import mock
+
+from asgiref.testing import ApplicationCommunicator
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.test import TransactionTestCase, override_settings
+
+from core.authentication import token_cache
+from core.models import AuthToken, Item
+from core.pubsub import hub
+from core.throttling import TenantRateThrottle
+from items.events import ItemEventsApp
+
+
+def events_settings(**options):
+    """Override the event stream options, with in-memory pub/sub."""
+    return override_settings(
+        PUBSUB={**settings.PUBSUB, 'BACKEND': 'core.pubsub.InMemoryBackend'},
+        ITEMS_EVENTS={**settings.ITEMS_EVENTS, **options},
+    )
+
+
+def items_event(seq):
+    """Return the server-sent event announcing change `seq`."""
+    return f'id: {seq}\nevent: items\ndata: {{"seq": {seq}}}\n\n'.encode()
+
+
+async def fallback(scope, receive, send):
+    await send({'type': 'http.response.start', 'status': 204, 'headers': []})
+    await send({'type': 'http.response.body', 'body': b''})
+
+
+@events_settings(HEARTBEAT=60, MAX_AGE=5, RETRY=3)
+class ItemEventsTests(TransactionTestCase):
+    """Test pushing item changes to connected clients.
+
+    Transactions commit here, so changes are published as in production.
+    """
+
+    def setUp(self):
+        token_cache.clear()
+        self.tenant = get_user_model().objects.create_user(
+            email='tenant@example.com',
+            password='test123',
+        )
+        self.token = AuthToken.objects.issue(self.tenant)
+
+    def connect(self, method='GET', path=None, token=True, **headers):
+        """Start a request to the events app and return its communicator."""
+        if token:
+            headers.setdefault('Authorization', f'Token {self.token.key}')
+        scope = {
+            'type': 'http',
+            'method': method,
+            'path': path or settings.ITEMS_EVENTS['PATH'],
+            'query_string': b'',
+            'headers': [
+                (name.lower().encode(), value.encode())
+                for name, value in headers.items()
+            ],
+        }
+        return ApplicationCommunicator(ItemEventsApp(fallback), scope)
+
+    async def open_stream(self, **headers):
+        """Connect and return the communicator once the stream has started."""
+        communicator = self.connect(**headers)
+        await communicator.send_input({'type': 'http.request', 'body': b''})
+        start = await communicator.receive_output(1)
+        self.assertEqual(start['status'], 200)
+        self.assertIn((b'content-type', b'text/event-stream'), start['headers'])
+        self.assertEqual(await self.receive_body(communicator), b'retry: 3000\n\n')
+        return communicator
+
+    async def receive_body(self, communicator):
+        return (await communicator.receive_output(1))['body']
+
+    async def test_changes_pushed(self):
+        """Test clients get the current and then each new sequence number."""
+        communicator = await self.open_stream()
+        self.assertEqual(await self.receive_body(communicator), items_event(0))
+
+        item = await Item.objects.acreate(tenant=self.tenant, name='A', price=1)
+        other = await get_user_model().objects.acreate(email='other@example.com')
+        await Item.objects.acreate(tenant=other, name='Other', price=1)
+
+        self.assertEqual(
+            await self.receive_body(communicator),
+            items_event(item.change_seq),
+        )
+        self.assertTrue(await communicator.receive_nothing(0.05))
+
+        await communicator.send_input({'type': 'http.disconnect'})
+        await communicator.wait(1)
+        self.assertEqual(hub.count, 0)
+
+    @events_settings(HEARTBEAT=0.01)
+    async def test_up_to_date_client_only_kept_alive(self):
+        """Test a client reconnecting with the latest sequence waits quietly."""
+        await Item.objects.acreate(tenant=self.tenant, name='A', price=1)
+
+        communicator = await self.open_stream(**{'Last-Event-ID': '1'})
+
+        self.assertEqual(await self.receive_body(communicator), b': keep-alive\n\n')
+        await communicator.send_input({'type': 'http.disconnect'})
+        await communicator.wait(1)
+
+    @events_settings(MAX_AGE=0.05)
+    async def test_stream_ends_after_max_age(self):
+        """Test streams end and unsubscribe once they reach their max age."""
+        communicator = await self.open_stream()
+        self.assertEqual(await self.receive_body(communicator), items_event(0))
+
+        last = await communicator.receive_output(1)
+
+        self.assertEqual(last['body'], b'')
+        self.assertFalse(last.get('more_body', False))
+        await communicator.wait(1)
+        self.assertEqual(hub.count, 0)
+
+    @events_settings(MAX_CONNECTIONS=0)
+    async def test_too_many_streams(self):
+        """Test streams over the process limit are refused for a while."""
+        communicator = self.connect()
+
+        start = await communicator.receive_output(1)
+
+        self.assertEqual(start['status'], 503)
+        self.assertIn((b'retry-after', b'3'), start['headers'])
+
+    @events_settings(MAX_TENANT_CONNECTIONS=1)
+    async def test_too_many_tenant_streams(self):
+        """Test a tenant's streams over the per-tenant limit are refused."""
+        communicator = await self.open_stream()
+        self.assertEqual(await self.receive_body(communicator), items_event(0))
+
+        refused = self.connect()
+        start = await refused.receive_output(1)
+
+        self.assertEqual(start['status'], 429)
+        self.assertIn((b'retry-after', b'3'), start['headers'])
+        await communicator.send_input({'type': 'http.disconnect'})
+        await communicator.wait(1)
+
+    async def test_stream_opening_throttled(self):
+        """Test opening streams is limited by the tenant's `events` rate."""
+        TenantRateThrottle.clear()
+        throttle = {
+            **settings.API_THROTTLE,
+            'LEASE_FRACTION': 0,
+            'RATES': {'events': {self.tenant.tier: '1/min'}},
+        }
+        # A bucket refilling during a slow run would let the stream open.
+        clock = SimpleNamespace(time=lambda: 6000.0, monotonic=time.monotonic)
+        with override_settings(API_THROTTLE=throttle), mock.patch(
+            'core.throttling.time', clock,
+        ):
+            communicator = await self.open_stream()
+            await communicator.send_input({'type': 'http.disconnect'})
+            await communicator.wait(1)
+
+            start = await self.connect().receive_output(1)
+
+        self.assertEqual(start['status'], 429)
+        self.assertIn((b'ratelimit-remaining', b'0'), start['headers'])
+        self.assertIn(b'retry-after', dict(start['headers']))
+
+    async def test_auth_required(self):
+        """Test event streams require a valid token."""
+        for headers in ({'token': False}, {'Authorization': 'Token unknown'}):
+            communicator = self.connect(**headers)
+
+            start = await communicator.receive_output(1)
+            body = await communicator.receive_output(1)
+
+            self.assertEqual(start['status'], 401)
+            self.assertIn((b'www-authenticate', b'Token'), start['headers'])
+            self.assertIn('detail', json.loads(body['body']))
+
+    async def test_other_requests_passed_on(self):
+        """Test requests to other paths reach the wrapped application."""
+        communicator = self.connect(path='/api/items/items/')
+
+        start = await communicator.receive_output(1)
+
+        self.assertEqual(start['status'], 204)
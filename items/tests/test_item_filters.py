@@ -0,0 +1,214 @@
+"""
+Test filtering and sorting of the item list.
+"""
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework import status
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+
+from core.models import Item
+from items.views import ItemViewSet
+
+
+ITEMS_URL = reverse('items:item-list')
+
+
+def create_item(tenant, **params):
+    """Create and return a sample item."""
+    defaults = {
+        'name': 'Sample Item',
+        'price': Decimal('5.00'),
+    }
+    defaults.update(params)
+
+    return Item.objects.create(tenant=tenant, **defaults)
+
+
+def create_tenant(**params):
+    """Create and return a new tenant."""
+    return get_user_model().objects.create_user(**params)
+
+
+def list_queryset(tenant, params):
+    """Return the queryset ItemViewSet.list would run for `params`."""
+    request = Request(APIRequestFactory().get(ITEMS_URL, params))
+    request.user = tenant
+    view = ItemViewSet(request=request, action='list', format_kwarg=None)
+    return view.filter_queryset(view.get_queryset())
+
+
+def explain(queryset):
+    """Return the query plan of a queryset.
+
+    Sequential scans are disabled on PostgreSQL so that the plan shows
+    whether an index *can* serve the query even on tiny test tables.
+    """
+    if connection.vendor != 'postgresql':
+        return queryset.explain()
+
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+        return queryset.explain()
+
+
+class ItemFilterApiTests(TestCase):
+    """Test filtering and sorting items through the API."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.tenant = create_tenant(email='tenant@example.com', password='test123')
+        self.client.force_authenticate(self.tenant)
+
+    def get_names(self, params):
+        """Return the names of the listed items."""
+        res = self.client.get(ITEMS_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [item['name'] for item in res.data]
+
+    def test_filter_by_exact_price(self):
+        """Test prices are stored exactly, so equal bounds match."""
+        create_item(
+            tenant=self.tenant,
+            name='Sum',
+            price=Decimal('0.1') + Decimal('0.2'),
+        )
+
+        names = self.get_names({'min_price': '0.3', 'max_price': '0.3'})
+
+        self.assertEqual(names, ['Sum'])
+
+    def test_filter_by_price_range(self):
+        """Test filtering items by minimum and maximum price."""
+        create_item(tenant=self.tenant, name='Cheap', price=Decimal('1.00'))
+        create_item(tenant=self.tenant, name='Mid', price=Decimal('5.00'))
+        create_item(tenant=self.tenant, name='Pricey', price=Decimal('9.00'))
+
+        names = self.get_names({'min_price': '2', 'max_price': '9'})
+
+        self.assertEqual(sorted(names), ['Mid', 'Pricey'])
+
+    def test_filter_by_name(self):
+        """Test filtering items by name prefix and by contained text."""
+        create_item(tenant=self.tenant, name='Apple pie')
+        create_item(tenant=self.tenant, name='Pineapple')
+        create_item(tenant=self.tenant, name='Banana')
+
+        self.assertEqual(self.get_names({'name': 'Apple'}), ['Apple pie'])
+        self.assertEqual(
+            sorted(self.get_names({'search': 'apple'})),
+            ['Apple pie', 'Pineapple'],
+        )
+
+    def test_filter_by_created_at(self):
+        """Test filtering items by a creation time window."""
+        old = create_item(tenant=self.tenant, name='Old')
+        Item.objects.filter(id=old.id).update(
+            created_at=timezone.now() - timedelta(days=2),
+        )
+        create_item(tenant=self.tenant, name='New')
+        since = (timezone.now() - timedelta(days=1)).isoformat()
+
+        self.assertEqual(self.get_names({'created_after': since}), ['New'])
+        self.assertEqual(self.get_names({'created_before': since}), ['Old'])
+
+    def test_invalid_filter_value_error(self):
+        """Test an invalid filter value returns an error."""
+        res = self.client.get(ITEMS_URL, {'min_price': 'cheap'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('min_price', res.data)
+
+    def test_sort_by_key(self):
+        """Test sorting items by price, name and creation time."""
+        create_item(tenant=self.tenant, name='B', price=Decimal('1.00'))
+        create_item(tenant=self.tenant, name='C', price=Decimal('3.00'))
+        create_item(tenant=self.tenant, name='A', price=Decimal('2.00'))
+
+        self.assertEqual(self.get_names({'ordering': 'price'}), ['B', 'A', 'C'])
+        self.assertEqual(self.get_names({'ordering': '-name'}), ['C', 'B', 'A'])
+        self.assertEqual(self.get_names({'ordering': 'created_at'}), ['B', 'C', 'A'])
+
+    def test_paginate_sorted_items(self):
+        """Test keyset pagination follows the requested sort key."""
+        for i, price in enumerate([3, 1, 2, 1, 5]):
+            create_item(tenant=self.tenant, name=f'Item {i}', price=price)
+
+        res = self.client.get(ITEMS_URL, {'ordering': 'price', 'page_size': 2})
+        prices = [item['price'] for item in res.data['results']]
+        while res.data['next']:
+            res = self.client.get(res.data['next'])
+            prices += [item['price'] for item in res.data['results']]
+
+        self.assertEqual(prices, ['1.00', '1.00', '2.00', '3.00', '5.00'])
+
+
+class ItemFilterIndexTests(TestCase):
+    """Test every supported filter and sort key is served by an index."""
+
+    def setUp(self):
+        self.tenant = create_tenant(email='tenant@example.com', password='test123')
+
+    def assertUsesIndex(self, params, *index_names):
+        """Assert the plan scans one of the indexes and does not sort."""
+        plan = explain(list_queryset(self.tenant, params))
+        self.assertTrue(
+            any(name in plan for name in index_names),
+            f'None of {index_names} used by plan:\n{plan}',
+        )
+        self.assertNotIn('TEMP B-TREE', plan)
+        self.assertNotRegex(plan, r'(?m)^\W*Sort\b')
+
+    def assertPlanUses(self, params, index_name):
+        """Assert the plan uses an index, sorted or not."""
+        plan = explain(list_queryset(self.tenant, params))
+        self.assertIn(index_name, plan)
+
+    def test_price_range_uses_index(self):
+        """Test a price range sorted by price is one index scan."""
+        self.assertUsesIndex(
+            {'min_price': '1', 'max_price': '9', 'ordering': 'price'},
+            'item_tenant_price_idx',
+        )
+
+    def test_sort_by_name_uses_index(self):
+        """Test sorting by name is one index scan."""
+        self.assertUsesIndex({'ordering': 'name'}, 'item_tenant_name_idx')
+
+    def test_created_at_window_uses_index(self):
+        """Test a creation time window is one index scan."""
+        self.assertUsesIndex(
+            {
+                'created_after': '2020-01-01T00:00:00Z',
+                'ordering': '-created_at',
+            },
+            'item_tenant_created_idx',
+        )
+
+    def test_default_ordering_uses_index(self):
+        """Test the default ordering is one index scan."""
+        # SQLite appends the rowid to the foreign key index, which then
+        # serves `ORDER BY id` as well as the composite index does.
+        self.assertUsesIndex({}, 'item_tenant_id_idx', 'core_item_tenant_id')
+
+    def test_name_prefix_uses_index(self):
+        """Test a name prefix filter uses the prefix index."""
+        if connection.vendor != 'postgresql':
+            self.skipTest('Prefix index only exists on PostgreSQL.')
+        self.assertPlanUses({'name': 'App'}, 'item_tenant_name_prefix_idx')
+
+    def test_name_search_uses_trigram_index(self):
+        """Test a name search uses the trigram index."""
+        if connection.vendor != 'postgresql':
+            self.skipTest('Trigram index only exists on PostgreSQL.')
+        self.assertPlanUses({'search': 'apple'}, 'item_name_trgm_idx')
@@ -0,0 +1,180 @@
+"""
+Test the item statistics API.
+"""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Item, ItemSummary
+from core.tasks import get_backend
+
+
+STATS_URL = reverse('items:item-stats')
+
+
+def create_tenant(**params):
+    """Create and return a new tenant."""
+    return get_user_model().objects.create_user(**params)
+
+
+class ItemStatsApiTests(TestCase):
+    """Test computing item statistics."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.tenant = create_tenant(email='tenant@example.com', password='test123')
+        self.client.force_authenticate(self.tenant)
+
+    def create_items(self, *prices):
+        """Create an item of the tenant for each price."""
+        for price in prices:
+            Item.objects.create(tenant=self.tenant, name='Item', price=price)
+
+    def test_stats(self):
+        """Test aggregates and histogram of the tenant's items."""
+        self.create_items(1, 2, 3, 10)
+        other_tenant = create_tenant(email='other@example.com', password='test123')
+        Item.objects.create(tenant=other_tenant, name='Other', price=100)
+
+        res = self.client.get(STATS_URL, {'buckets': 3})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['count'], 4)
+        self.assertEqual(res.data['total_value'], 16)
+        self.assertEqual(res.data['min_price'], 1)
+        self.assertEqual(res.data['max_price'], 10)
+        self.assertEqual(res.data['avg_price'], 4)
+        self.assertEqual(
+            [bucket['count'] for bucket in res.data['histogram']],
+            [3, 0, 1],
+        )
+
+    def test_stats_filtered(self):
+        """Test stats are computed over the filtered items."""
+        self.create_items(1, 2, 3, 10)
+
+        res = self.client.get(STATS_URL, {'max_price': 3})
+
+        self.assertEqual(res.data['count'], 3)
+        self.assertEqual(res.data['max_price'], 3)
+
+    def test_stats_without_items(self):
+        """Test stats of a tenant without items."""
+        res = self.client.get(STATS_URL)
+
+        self.assertEqual(res.data['count'], 0)
+        self.assertEqual(res.data['total_value'], 0)
+        self.assertEqual(res.data['histogram'], [])
+
+    @override_settings(ITEMS_STATS_SUMMARY=True)
+    def test_stats_from_summary(self):
+        """Test unfiltered stats are served from the summary row."""
+        self.create_items(1, 2, 3, 10)
+
+        res = self.client.get(STATS_URL, {'buckets': 3})
+
+        self.assertEqual(res.data['count'], 4)
+        self.assertEqual(res.data['total_value'], 16)
+        self.assertEqual(res.data['avg_price'], 4)
+        self.assertEqual(
+            [bucket['count'] for bucket in res.data['histogram']],
+            [3, 0, 1],
+        )
+        self.assertTrue(ItemSummary.objects.filter(tenant=self.tenant).exists())
+
+    @override_settings(ITEMS_STATS_SUMMARY=True)
+    def test_summary_stats_without_histogram(self):
+        """Test summary stats skip the histogram unless buckets are given."""
+        self.create_items(1, 2)
+        ItemSummary.objects.refresh(self.tenant.pk)
+
+        # The tenant's version, for the validators, and the summary row.
+        with self.assertNumQueries(2):
+            res = self.client.get(STATS_URL)
+
+        self.assertEqual(res.data['count'], 2)
+        self.assertNotIn('histogram', res.data)
+
+    def test_invalid_buckets_error(self):
+        """Test an out-of-range bucket count returns an error."""
+        res = self.client.get(STATS_URL, {'buckets': 0})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+@override_settings(ITEMS_STATS_SUMMARY=True)
+class ItemSummaryTests(TestCase):
+    """Test the incrementally maintained item summary."""
+
+    def setUp(self):
+        self.tenant = create_tenant(email='tenant@example.com', password='test123')
+        ItemSummary.objects.refresh(self.tenant.pk)
+
+    def get_summary(self):
+        """Return the stored summary of the tenant."""
+        return ItemSummary.objects.get(tenant=self.tenant)
+
+    def test_summary_tracks_writes(self):
+        """Test creates, updates and deletes adjust the summary."""
+        low = Item.objects.create(tenant=self.tenant, name='Low', price=1)
+        high = Item.objects.create(tenant=self.tenant, name='High', price=8)
+        high = Item.objects.get(id=high.id)
+        high.price = 5
+        high.save()
+        low.delete()
+
+        summary = self.get_summary()
+        self.assertEqual(summary.count, 1)
+        self.assertEqual(summary.total_price, 5)
+        self.assertTrue(summary.bounds_stale)
+
+        summary = ItemSummary.objects.get_current(self.tenant.pk)
+        self.assertEqual((summary.min_price, summary.max_price), (5, 5))
+        self.assertFalse(summary.bounds_stale)
+
+    def test_summary_current_without_rebuild(self):
+        """Test an up-to-date summary is read without aggregating items."""
+        Item.objects.create(tenant=self.tenant, name='Item', price=2)
+
+        with self.assertNumQueries(1):
+            summary = ItemSummary.objects.get_current(self.tenant.pk)
+
+        self.assertEqual(summary.count, 1)
+        self.assertEqual(summary.min_price, 2)
+
+    def test_summary_rebuilt_after_bulk_write(self):
+        """Test writes that skip signals cause a rebuild on read."""
+        Item.objects.bulk_create([
+            Item(tenant=self.tenant, name='Item', price=price)
+            for price in (1, 2)
+        ])
+        get_user_model().objects.touch_items(self.tenant.pk)
+
+        summary = ItemSummary.objects.get_current(self.tenant.pk)
+
+        self.assertEqual(summary.count, 2)
+        self.assertEqual(summary.total_price, 3)
+
+    @override_settings(TASKS={
+        **settings.TASKS,
+        'BACKEND': 'core.tasks.InMemoryBackend',
+    })
+    def test_summary_refreshed_in_background_after_bulk_request(self):
+        """Test the bulk endpoint queues a rebuild of the summary."""
+        get_backend().clear()
+        client = APIClient()
+        client.force_authenticate(self.tenant)
+        rows = [{'name': 'Item', 'price': price} for price in (1, 2)]
+
+        client.post(reverse('items:item-bulk'), rows, format='json')
+        get_backend().run_pending()
+
+        with self.assertNumQueries(1):
+            summary = ItemSummary.objects.get_current(self.tenant.pk)
+        self.assertEqual(summary.count, 2)
@@ -5,7 +5,7 @@ from django.urls import path, include
 
 from rest_framework.routers import DefaultRouter
 
-from items import views
+from items import async_views, views
 
 
 router = DefaultRouter()
@@ -15,4 +15,14 @@ app_name = 'items'
 
 urlpatterns = [
     path('', include(router.urls)),
+    path(
+        'async/items/',
+        async_views.ItemListCreateView.as_view(),
+        name='async-item-list',
+    ),
+    path(
+        'async/items/<int:pk>/',
+        async_views.ItemDetailView.as_view(),
+        name='async-item-detail',
+    ),
 ]
@@ -1,23 +1,56 @@
 """
 Views for items APIs.
 """
-from rest_framework import viewsets
-from rest_framework.authentication import TokenAuthentication
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.http import StreamingHttpResponse
+from django.utils.translation import gettext as _
+from rest_framework import status, viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.generics import get_object_or_404
+from rest_framework.parsers import JSONParser
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
 
+from core.authentication import CachedTokenAuthentication
+from core.mixins import ConditionalGetMixin, RateLimitHeadersMixin
 from core.models import Item
-from items import serializers
+from items import renderers, serializers
+from items.bulk import BulkItemOperations
+from items.changes import get_item_changes, number_late_items
+from items.cache import response_cache
+from items.filters import ItemFilter, ItemOrderingFilter
+from items.pagination import KeysetPagination
+from items.stats import get_item_stats, get_summary_stats
+from items.tasks import refresh_item_summary
+from items.parsers import NDJSONParser
 
 
-class ItemViewSet(viewsets.ModelViewSet):
+MAX_HISTOGRAM_BUCKETS = 100
+EXPORT_FIELDS = ('id', 'name', 'description', 'price', 'created_at')
+LIST_FIELDS = ('id', 'name', 'price', 'created_at')
+
+
+class ItemViewSet(
+    RateLimitHeadersMixin,
+    ConditionalGetMixin,
+    viewsets.ModelViewSet,
+):
     """Manage items in the database."""
     serializer_class = serializers.ItemDetailSerializer
     queryset = Item.objects.all()
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticated]
+    throttle_scope = 'items'
+    pagination_class = KeysetPagination
+    filter_backends = [ItemFilter, ItemOrderingFilter]
+    ordering_fields = ['price', 'name', 'created_at']
 
     def get_queryset(self):
         """Return objects for the current authenticated tenant only."""
+        if not self.request.user.is_active:
+            return self.queryset.none()
         return self.queryset.filter(tenant=self.request.user).order_by('-id')
 
     def get_serializer_class(self):
@@ -27,6 +60,172 @@ class ItemViewSet(viewsets.ModelViewSet):
 
         return self.serializer_class
 
+    def get_validators(self, request):
+        """Return the tenant's items version and modification time."""
+        return get_user_model().objects.get_items_version(request.user.pk)
+
+    def list(self, request, *args, **kwargs):
+        """List items from `.values()` rows through the fast serializer."""
+        not_modified = self.get_not_modified_response(request)
+        if not_modified is not None:
+            return not_modified
+
+        return Response(self.get_cached_data(request, self.get_list_data))
+
+    def get_list_data(self):
+        """Return the serialized, possibly paginated, item list."""
+        queryset = self.filter_queryset(self.get_queryset())
+        rows = queryset.values(*LIST_FIELDS)
+
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            serializer = serializers.ItemListSerializer(page)
+            return self.get_paginated_response(serializer.data).data
+
+        return serializers.ItemListSerializer(rows).data
+
+    def retrieve(self, request, *args, **kwargs):
+        """Retrieve an item unless the client's copy is current."""
+        not_modified = self.get_not_modified_response(request)
+        if not_modified is not None:
+            # The validators are the tenant's, so make sure the item is one
+            # of its own before confirming the client's copy.
+            lookup = self.lookup_url_kwarg or self.lookup_field
+            get_object_or_404(
+                self.get_queryset().values('pk'),
+                **{self.lookup_field: self.kwargs[lookup]},
+            )
+            return not_modified
+
+        return Response(self.get_cached_data(request, self.get_retrieve_data))
+
+    def get_retrieve_data(self):
+        """Return the serialized item."""
+        return self.get_serializer(self.get_object()).data
+
+    def get_cached_data(self, request, build):
+        """Return response data from the tenant's response cache."""
+        key = response_cache.make_key(
+            request.user.pk,
+            self.version,
+            self.action,
+            request,
+        )
+        return response_cache.get_or_set(key, build)
+
     def perform_create(self, serializer):
         """Create a new item."""
         serializer.save(tenant=self.request.user)
+
+    @action(
+        detail=False,
+        methods=['post'],
+        parser_classes=[JSONParser, NDJSONParser],
+    )
+    def bulk(self, request):
+        """Create, update and delete many items in one transaction."""
+        rows = request.data
+        if not isinstance(rows, list):
+            msg = _('Expected a list of operations.')
+            raise ValidationError({'non_field_errors': [msg]})
+        if len(rows) > settings.ITEMS_BULK_MAX_ROWS:
+            msg = _('At most %(count)d operations are allowed.') % {
+                'count': settings.ITEMS_BULK_MAX_ROWS,
+            }
+            raise ValidationError({'non_field_errors': [msg]})
+
+        operations = BulkItemOperations(
+            tenant=request.user,
+            rows=rows,
+            batch_size=settings.ITEMS_BULK_BATCH_SIZE,
+        )
+        results = operations.run()
+        if operations.has_errors:
+            return Response(results, status=status.HTTP_400_BAD_REQUEST)
+
+        if settings.ITEMS_STATS_SUMMARY:
+            refresh_item_summary.enqueue(request.user.pk)
+
+        return Response(results, status=status.HTTP_200_OK)
+
+    @action(
+        detail=False,
+        methods=['get'],
+        renderer_classes=[renderers.NDJSONRenderer, renderers.CSVRenderer],
+    )
+    def export(self, request):
+        """Stream every item of the tenant as NDJSON or CSV."""
+        renderer = request.accepted_renderer
+        rows = self.get_queryset().values_list(*EXPORT_FIELDS).iterator(
+            chunk_size=settings.ITEMS_EXPORT_CHUNK_SIZE,
+        )
+
+        response = StreamingHttpResponse(
+            renderer.stream(EXPORT_FIELDS, rows),
+            content_type=f'{renderer.media_type}; charset={renderer.charset}',
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="items.{renderer.format}"'
+        )
+        return response
+
+    @action(detail=False, methods=['get'])
+    def changes(self, request):
+        """Return the tenant's item changes after the `since` sequence number.
+
+        Clients start from `since=0` and pass the returned `seq` back until
+        `has_more` is false, so an incremental sync reads only the items
+        created, updated or deleted since the last one.
+        """
+        number_late_items(request.user.pk)
+        latest, _modified_at = self.get_validators(request)
+        since = self.get_int_param('since', 0, 0, latest)
+        page_size = self.get_int_param(
+            'page_size',
+            settings.ITEMS_CHANGES_PAGE_SIZE,
+            1,
+            settings.ITEMS_CHANGES_MAX_PAGE_SIZE,
+        )
+
+        return Response(
+            get_item_changes(request.user.pk, since, latest, page_size),
+        )
+
+    def get_int_param(self, name, default, min_value, max_value):
+        """Return an integer query parameter, validating its range."""
+        try:
+            value = int(self.request.query_params.get(name, default))
+        except ValueError:
+            value = min_value - 1
+        if not min_value <= value <= max_value:
+            msg = _('Ensure this value is between %(min)d and %(max)d.') % {
+                'min': min_value,
+                'max': max_value,
+            }
+            raise ValidationError({name: [msg]})
+        return value
+
+    @action(detail=False, methods=['get'])
+    def stats(self, request):
+        """Return aggregate statistics of the tenant's items."""
+        not_modified = self.get_not_modified_response(request)
+        if not_modified is not None:
+            return not_modified
+
+        return Response(self.get_cached_data(request, self.get_stats_data))
+
+    def get_stats_data(self):
+        """Return the item statistics, from the summary row if possible."""
+        buckets = self.get_int_param('buckets', 10, 1, MAX_HISTOGRAM_BUCKETS)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        filtered = any(
+            param in self.request.query_params for param in ItemFilter.filters
+        )
+        if settings.ITEMS_STATS_SUMMARY and not filtered:
+            # Keep summary reads O(1) unless a histogram is asked for.
+            if 'buckets' not in self.request.query_params:
+                buckets = None
+            return get_summary_stats(self.request.user.pk, queryset, buckets)
+
+        return get_item_stats(queryset, buckets)
@@ -0,0 +1,33 @@
+"""
+Move tenants' items into their own PostgreSQL schema.
+"""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from tenants.schemas import move_items_to_schema
+
+
+class Command(BaseCommand):
+    """Move the items of the given tenants out of the shared table."""
+    help = 'Move tenants into schema-per-tenant isolation.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'emails',
+            nargs='+',
+            help='Email addresses of the tenants to move.',
+        )
+
+    def handle(self, *args, **options):
+        if settings.TENANCY_MODE != 'schema':
+            raise CommandError('TENANCY_MODE must be "schema" to move tenants.')
+
+        for email in options['emails']:
+            try:
+                tenant = get_user_model().objects.get(email=email)
+            except get_user_model().DoesNotExist:
+                raise CommandError(f'Tenant "{email}" does not exist.')
+
+            moved = move_items_to_schema(tenant, verbosity=options['verbosity'])
+            self.stdout.write(f'{email}: moved {moved} items.')
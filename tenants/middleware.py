@@ -0,0 +1,37 @@
+"""
+Middleware for the tenants app.
+"""
+from django.conf import settings
+from django.db import connections
+
+from core.authentication import get_token_user
+from tenants.schemas import get_schema_name
+
+
+class TenantSchemaMiddleware:
+    """Route each request to the schema of the tenant sending it.
+
+    The tenant is identified by its API token, resolved through the same
+    token cache DRF uses later, so this costs no extra query on a cache
+    hit. Anonymous requests and tenants without a ready schema stay on the
+    public schema, where the shared item table lives. Read replicas are
+    switched along with the primary.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        aliases = ('default', *settings.DATABASE_REPLICAS)
+        for alias in aliases:
+            connections[alias].set_schema_to_public()
+        schema_name = self.get_schema_name(request)
+        if schema_name:
+            for alias in aliases:
+                connections[alias].set_schema(schema_name)
+
+        return self.get_response(request)
+
+    def get_schema_name(self, request):
+        tenant = get_token_user(request)
+        return get_schema_name(tenant.pk) if tenant else None
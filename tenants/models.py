@@ -0,0 +1,24 @@
+"""
+Database models for the tenants app.
+"""
+from django.conf import settings
+from django.db import models
+from django_tenants.models import TenantMixin
+
+
+class TenantSchema(TenantMixin):
+    """PostgreSQL schema holding the items of one tenant.
+
+    Only used when `TENANCY_MODE` is `schema`. Tenants without a ready
+    schema keep their items in the shared `core_item` table.
+    """
+    owner = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='schema',
+    )
+    is_ready = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.schema_name
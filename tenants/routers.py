@@ -0,0 +1,30 @@
+"""
+Database routers for the tenants app.
+"""
+from django.db import connections
+from django_tenants.routers import TenantSyncRouter
+from django_tenants.utils import get_public_schema_name
+
+
+class ItemSchemaRouter(TenantSyncRouter):
+    """Migrate only the item table of the `core` app into tenant schemas.
+
+    `core` holds both shared models (users, summaries) and the per-tenant
+    `Item`. Tenant schemas get just `core_item`, whose foreign key then
+    resolves to `public.core_user`, so users are never shadowed by an
+    empty per-schema copy.
+    """
+    tenant_models = {'core': {'item'}}
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        connection = connections[db]
+        in_tenant_schema = connection.schema_name != get_public_schema_name()
+        if (
+            in_tenant_schema
+            and model_name is not None
+            and app_label in self.tenant_models
+            and model_name not in self.tenant_models[app_label]
+        ):
+            return False
+
+        return super().allow_migrate(db, app_label, model_name, **hints)
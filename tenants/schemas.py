@@ -0,0 +1,95 @@
+"""
+Schema-per-tenant isolation of items.
+"""
+from django.core.cache import cache
+from django.db import connection, transaction
+
+from core.models import Item
+from tenants.models import TenantSchema
+
+
+SCHEMA_CACHE_TIMEOUT = 300
+
+
+def schema_cache_key(tenant_id):
+    return f'tenants:schema:{tenant_id}'
+
+
+def get_schema_name(tenant_id):
+    """Return the ready schema of a tenant, or `None` if it is shared.
+
+    The answer is cached, so schema mode needs a cache shared by all
+    workers (`REDIS_URL`) for a move to take effect everywhere at once.
+    A move stores its schema in the cache when it commits; until then
+    tenants being moved are looked up on every request, and a shared
+    answer read before the commit never replaces the schema.
+    """
+    key = schema_cache_key(tenant_id)
+    schema_name = cache.get(key)
+    if schema_name is None:
+        schema = TenantSchema.objects.filter(
+            owner_id=tenant_id,
+        ).values_list('schema_name', 'is_ready').first()
+        if schema is None:
+            schema_name = ''
+            cache.add(key, schema_name, SCHEMA_CACHE_TIMEOUT)
+        elif schema[1]:
+            schema_name = schema[0]
+            cache.set(key, schema_name, SCHEMA_CACHE_TIMEOUT)
+        else:
+            schema_name = ''
+
+    return schema_name or None
+
+
+def move_items_to_schema(tenant, verbosity=0):
+    """Move a tenant's items out of the shared table into its own schema.
+
+    Creating the `TenantSchema` creates the schema and runs the tenant
+    migrations in it. The rows are then copied and deleted from the shared
+    table in one transaction: reads keep being served from the shared
+    table until it commits, and only this tenant's item writes wait on
+    its row locks. Running it again for a tenant already moved moves the
+    rows written to the shared table by requests that were still routed
+    there. Returns the number of items moved.
+    """
+    tenant_schema, _created = TenantSchema.objects.get_or_create(
+        owner=tenant,
+        defaults={'schema_name': f'tenant_{tenant.pk}'},
+    )
+    schema_name = tenant_schema.schema_name
+
+    quote = connection.ops.quote_name
+    table = quote(Item._meta.db_table)
+    source = f'{quote("public")}.{table}'
+    target = f'{quote(schema_name)}.{table}'
+    columns = ', '.join(quote(field.column) for field in Item._meta.concrete_fields)
+
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {target} ({columns}) '
+                f'SELECT {columns} FROM {source} WHERE tenant_id = %s',
+                [tenant.pk],
+            )
+            moved = cursor.rowcount
+            # Never move the sequence back over ids the schema already used.
+            cursor.execute(
+                'SELECT setval(sequence, GREATEST('
+                f'COALESCE((SELECT MAX(id) FROM {target}), 0) + 1, '
+                'nextval(sequence)), false) '
+                "FROM pg_get_serial_sequence(%s, 'id') AS sequence",
+                [f'{schema_name}.{Item._meta.db_table}'],
+            )
+            cursor.execute(f'DELETE FROM {source} WHERE tenant_id = %s', [tenant.pk])
+
+        if not tenant_schema.is_ready:
+            tenant_schema.is_ready = True
+            tenant_schema.save(verbosity=verbosity, update_fields=['is_ready'])
+        transaction.on_commit(lambda: cache.set(
+            schema_cache_key(tenant.pk),
+            schema_name,
+            SCHEMA_CACHE_TIMEOUT,
+        ))
+
+    return moved
@@ -5,8 +5,11 @@ from django.contrib.auth import get_user_model, authenticate
 from django.utils.translation import gettext as _
 from rest_framework import serializers
 
+from core.metrics import TimedSerializerMixin
+from core.models import AuthToken
 
-class TenantSerializer(serializers.ModelSerializer):
+
+class TenantSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Serializer for the tenant object."""
 
     class Meta:
@@ -19,15 +22,22 @@ class TenantSerializer(serializers.ModelSerializer):
         return get_user_model().objects.create_user(**validated_data)
 
     def update(self, instance, validated_data):
-        """Update and return a tenant with encrypted password."""
+        """Update and return a tenant with encrypted password.
+
+        Only the given fields are saved: the instance may be a cached copy
+        of the tenant, whose other fields can be out of date.
+        """
         password = validated_data.pop('password', None)
-        tenant = super().update(instance, validated_data)
+        for field, value in validated_data.items():
+            setattr(instance, field, value)
+        update_fields = [*validated_data, 'updated_at']
 
         if password:
-            tenant.set_password(password)
-            tenant.save()
+            instance.set_password(password)
+            update_fields.append('password')
 
-        return tenant
+        instance.save(update_fields=update_fields)
+        return instance
 
 
 class AuthTokenSerializer(serializers.Serializer):
@@ -53,3 +63,13 @@ class AuthTokenSerializer(serializers.Serializer):
 
         attrs['user'] = tenant
         return attrs
+
+
+class TokenSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    """Serializer for an issued auth token."""
+    token = serializers.CharField(source='key', read_only=True)
+
+    class Meta:
+        model = AuthToken
+        fields = ['token', 'expires_at']
+        read_only_fields = ['expires_at']
@@ -0,0 +1,24 @@
+"""
+Background tasks of the tenant API.
+"""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+
+from core.purge import TenantPurge
+from core.tasks import task
+
+
+@task
+def purge_tenant(tenant_id):
+    """Delete the data of a deactivated tenant in batches.
+
+    Does nothing if the tenant was purged already or reactivated; an
+    attempt interrupted midway is resumed by the retry.
+    """
+    tenant = get_user_model().objects.pending_purge().filter(pk=tenant_id).first()
+    if tenant is None:
+        return
+    options = settings.TENANT_PURGE
+    purge = TenantPurge(tenant, options['BATCH_SIZE'], options['PAUSE'])
+    for _progress in purge.run():
+        pass
@@ -0,0 +1,157 @@
+"""
+Tests for schema-per-tenant isolation.
+"""
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import (
+    RequestFactory,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+
+from core.authentication import token_cache
+from core.models import AuthToken, Item
+from tenants.middleware import TenantSchemaMiddleware
+from tenants.models import TenantSchema
+from tenants.routers import ItemSchemaRouter
+from tenants.schemas import get_schema_name, move_items_to_schema
+
+
+@override_settings(SHARED_APPS=['core', 'tenants'], TENANT_APPS=['core'])
+class ItemSchemaRouterTests(TestCase):
+    """Test which models are migrated into tenant schemas."""
+
+    def allow_migrate(self, schema_name, app_label, model_name):
+        """Return the router's decision while connected to a schema."""
+        connections = {'default': SimpleNamespace(schema_name=schema_name)}
+        with mock.patch('tenants.routers.connections', connections), \
+                mock.patch('django.db.connections', connections):
+            return ItemSchemaRouter().allow_migrate(
+                'default',
+                app_label,
+                model_name=model_name,
+            )
+
+    def test_only_items_in_tenant_schema(self):
+        """Test tenant schemas get the item table and nothing else."""
+        self.assertIsNone(self.allow_migrate('tenant_1', 'core', 'item'))
+        self.assertFalse(self.allow_migrate('tenant_1', 'core', 'user'))
+        self.assertFalse(self.allow_migrate('tenant_1', 'core', 'itemsummary'))
+        self.assertFalse(self.allow_migrate('tenant_1', 'tenants', 'tenantschema'))
+
+    def test_shared_models_in_public_schema(self):
+        """Test the public schema gets all shared models."""
+        self.assertIsNone(self.allow_migrate('public', 'core', 'user'))
+        self.assertIsNone(self.allow_migrate('public', 'core', 'item'))
+        self.assertIsNone(self.allow_migrate('public', 'tenants', 'tenantschema'))
+
+
+class TenantSchemaRoutingTests(TestCase):
+    """Test resolving the schema of a request's tenant."""
+
+    def setUp(self):
+        cache.clear()
+        token_cache.clear()
+        self.tenant = get_user_model().objects.create_user(
+            email='test@example.com',
+            password='testpass123',
+        )
+        self.token = AuthToken.objects.issue(self.tenant)
+        self.middleware = TenantSchemaMiddleware(lambda request: None)
+
+    def get_request_schema(self, **headers):
+        """Return the schema the middleware picks for a request."""
+        request = RequestFactory().get('/api/items/items/', **headers)
+        return self.middleware.get_schema_name(request)
+
+    def test_shared_tenant_stays_public(self):
+        """Test tenants without a ready schema use the shared table."""
+        TenantSchema.objects.create(owner=self.tenant, schema_name='tenant_1')
+
+        schema_name = self.get_request_schema(
+            HTTP_AUTHORIZATION=f'Token {self.token.key}',
+        )
+
+        self.assertIsNone(schema_name)
+
+    def test_tenant_routed_to_ready_schema(self):
+        """Test a tenant with a ready schema is routed to it."""
+        TenantSchema.objects.create(
+            owner=self.tenant,
+            schema_name='tenant_1',
+            is_ready=True,
+        )
+
+        schema_name = self.get_request_schema(
+            HTTP_AUTHORIZATION=f'Token {self.token.key}',
+        )
+
+        self.assertEqual(schema_name, 'tenant_1')
+
+    def test_anonymous_and_invalid_tokens_stay_public(self):
+        """Test requests without a valid token use the public schema."""
+        self.assertIsNone(self.get_request_schema())
+        self.assertIsNone(self.get_request_schema(HTTP_AUTHORIZATION='Token bad'))
+
+    def test_schema_lookup_cached(self):
+        """Test the schema of a tenant is looked up once."""
+        get_schema_name(self.tenant.pk)
+
+        with self.assertNumQueries(0):
+            self.assertIsNone(get_schema_name(self.tenant.pk))
+
+    def test_schema_being_moved_not_cached(self):
+        """Test a tenant whose move has not committed is looked up again."""
+        TenantSchema.objects.create(owner=self.tenant, schema_name='tenant_1')
+        self.assertIsNone(get_schema_name(self.tenant.pk))
+
+        TenantSchema.objects.filter(owner=self.tenant).update(is_ready=True)
+
+        self.assertEqual(get_schema_name(self.tenant.pk), 'tenant_1')
+
+
+@unittest.skipUnless(
+    connection.vendor == 'postgresql' and settings.TENANCY_MODE == 'schema',
+    'Requires PostgreSQL in schema mode.',
+)
+class MoveItemsToSchemaTests(TransactionTestCase):
+    """Test moving a tenant's items into its schema."""
+
+    def setUp(self):
+        cache.clear()
+        self.tenant = get_user_model().objects.create_user(
+            email='test@example.com',
+            password='testpass123',
+        )
+
+    def test_items_moved_and_schema_cached(self):
+        """Test the items leave the shared table and the move is cached."""
+        Item.objects.create(tenant=self.tenant, name='A', price=1)
+        get_schema_name(self.tenant.pk)
+
+        moved = move_items_to_schema(self.tenant)
+
+        self.assertEqual(moved, 1)
+        self.assertFalse(Item.objects.filter(tenant=self.tenant).exists())
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                get_schema_name(self.tenant.pk),
+                f'tenant_{self.tenant.pk}',
+            )
+
+    def test_leftover_items_moved_again(self):
+        """Test items written to the shared table after the move are moved."""
+        move_items_to_schema(self.tenant)
+        Item.objects.create(tenant=self.tenant, name='Late', price=1)
+
+        moved = move_items_to_schema(self.tenant)
+
+        self.assertEqual(moved, 1)
+        self.assertFalse(Item.objects.filter(tenant=self.tenant).exists())
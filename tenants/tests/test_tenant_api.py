@@ -1,17 +1,28 @@
 """
 Tests for the tenant API.
 """
-from django.test import TestCase
+from datetime import timedelta
+
+from django.conf import settings
+from django.test import TestCase, override_settings
 from django.contrib.auth import get_user_model
 from django.urls import reverse
+from django.utils import timezone
 
 from rest_framework.test import APIClient
 from rest_framework import status
 
+from core.authentication import revoked_tokens, token_cache
+from core.models import AuthToken, Item
+from core.tasks import get_backend
+from core.testing import QueryBudgetMixin
+
 
 CREATE_TENANT_URL = reverse('tenants:create')
 TOKEN_URL = reverse('tenants:token')
 ME_URL = reverse('tenants:me')
+ROTATE_TOKEN_URL = reverse('tenants:token-rotate')
+ITEMS_URL = reverse('items:item-list')
 
 
 def create_tenant(**params):
@@ -84,6 +95,35 @@ class PublicTenantApiTests(TestCase):
         self.assertIn('token', res.data)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
 
+    def test_create_token_reuses_existing_token(self):
+        """Test logging in again returns the existing token in one query."""
+        payload = {'email': 'test@example.com', 'password': 'testpass123'}
+        tenant = create_tenant(**payload)
+        token = AuthToken.objects.issue(tenant)
+
+        with self.assertNumQueries(1):
+            res = self.client.post(TOKEN_URL, payload)
+
+        self.assertEqual(res.data['token'], token.key)
+        self.assertEqual(AuthToken.objects.count(), 1)
+
+    def test_create_token_rotates_old_token(self):
+        """Test a login after the rotation age issues a new token."""
+        payload = {'email': 'test@example.com', 'password': 'testpass123'}
+        tenant = create_tenant(**payload)
+        token = AuthToken.objects.issue(tenant)
+        AuthToken.objects.filter(pk=token.pk).update(
+            created=timezone.now() - timedelta(
+                seconds=settings.AUTH_TOKEN['ROTATE_AFTER'] + 1,
+            ),
+        )
+
+        res = self.client.post(TOKEN_URL, payload)
+
+        self.assertNotEqual(res.data['token'], token.key)
+        self.assertIn('expires_at', res.data)
+        self.assertEqual(AuthToken.objects.valid().count(), 2)
+
     def test_create_token_bad_credentials(self):
         """Test returns error if credentials invalid."""
         create_tenant(email='test@example.com', password='goodpass')
@@ -150,3 +190,132 @@ class PrivateTenantApiTests(TestCase):
         self.assertEqual(self.tenant.name, payload['name'])
         self.assertTrue(self.tenant.check_password(payload['password']))
         self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_retrieve_profile_not_modified(self):
+        """Test an unchanged profile is answered with 304."""
+        res = self.client.get(ME_URL)
+
+        res = self.client.get(ME_URL, HTTP_IF_NONE_MATCH=res['ETag'])
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_retrieve_profile_modified_after_update(self):
+        """Test updating the profile changes its ETag."""
+        token = AuthToken.objects.issue(self.tenant)
+        self.client.force_authenticate(user=None)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        res = self.client.get(ME_URL)
+        etag = res['ETag']
+
+        self.client.patch(ME_URL, {'name': 'New Name'})
+        res = self.client.get(ME_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['name'], 'New Name')
+
+    def test_update_profile_keeps_items_version(self):
+        """Test updating the profile does not roll back the items' ETag."""
+        etag = self.client.get(ITEMS_URL)['ETag']
+        for i in range(3):
+            Item.objects.create(tenant=self.tenant, name=f'Item {i}', price=1)
+
+        self.client.patch(ME_URL, {'name': 'New Name'})
+        res = self.client.get(ITEMS_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res['ETag'], etag)
+        self.tenant.refresh_from_db()
+        self.assertEqual(self.tenant.items_version, 3)
+
+
+class TokenRotationApiTests(TestCase):
+    """Test rotating the token of an authenticated tenant."""
+
+    def setUp(self):
+        self.tenant = create_tenant(email='test@example.com', password='test123')
+        self.token = AuthToken.objects.issue(self.tenant)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_delete_deactivates_tenant(self):
+        """Test deleting the profile deactivates the tenant at once."""
+        res = self.client.delete(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.tenant.refresh_from_db()
+        self.assertFalse(self.tenant.is_active)
+        self.assertIsNotNone(self.tenant.deactivated_at)
+        self.assertFalse(AuthToken.objects.valid().exists())
+        self.assertEqual(
+            self.client.get(ME_URL).status_code,
+            status.HTTP_401_UNAUTHORIZED,
+        )
+
+    @override_settings(TASKS={
+        **settings.TASKS,
+        'BACKEND': 'core.tasks.InMemoryBackend',
+    })
+    def test_delete_queues_purge(self):
+        """Test the data of a deleted tenant is purged in the background."""
+        get_backend().clear()
+        Item.objects.create(tenant=self.tenant, name='Item', price=1)
+
+        self.client.delete(ME_URL)
+        self.assertTrue(Item.objects.filter(tenant=self.tenant).exists())
+        get_backend().run_pending()
+
+        self.assertFalse(Item.objects.filter(tenant=self.tenant).exists())
+        self.tenant.refresh_from_db()
+        self.assertIsNotNone(self.tenant.purged_at)
+
+    def test_rotate_token(self):
+        """Test rotating returns a new token and revokes the old one."""
+        res = self.client.post(ROTATE_TOKEN_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res.data['token'], self.token.key)
+        self.assertEqual(
+            self.client.get(ME_URL).status_code,
+            status.HTTP_401_UNAUTHORIZED,
+        )
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {res.data["token"]}')
+        self.assertEqual(self.client.get(ME_URL).status_code, status.HTTP_200_OK)
+
+
+class TenantQueryBudgetTests(QueryBudgetMixin, TestCase):
+    """Test tenant endpoints do not query more with more items."""
+
+    def setUp(self):
+        self.payload = {'email': 'test@example.com', 'password': 'testpass123'}
+        self.tenant = create_tenant(**self.payload)
+        self.token = AuthToken.objects.issue(self.tenant)
+        self.client = APIClient()
+
+    def prepare_budget_request(self):
+        token_cache.clear()
+        revoked_tokens.clear()
+
+    def seed(self, count):
+        """Add `count` items to the tenant."""
+        Item.objects.bulk_create([
+            Item(tenant=self.tenant, name=f'Item {i}', price=1)
+            for i in range(count)
+        ])
+
+    def test_token_budget(self):
+        """Test logging in with an existing token."""
+        def request():
+            res = self.client.post(TOKEN_URL, self.payload)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        self.assertQueryBudget('token', 1, self.seed, request)
+
+    def test_me_budget(self):
+        """Test retrieving the profile with a token."""
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+        def request():
+            res = self.client.get(ME_URL)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        self.assertQueryBudget('me', 1, self.seed, request)
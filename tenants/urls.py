@@ -11,5 +11,10 @@ app_name = 'tenants'
 urlpatterns = [
     path('create/', views.CreateTenantView.as_view(), name='create'),
     path('token/', views.CreateTokenView.as_view(), name='token'),
+    path(
+        'token/rotate/',
+        views.RotateTokenView.as_view(),
+        name='token-rotate',
+    ),
     path('me/', views.ManageTenantView.as_view(), name='me'),
 ]
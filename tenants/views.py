@@ -1,11 +1,21 @@
 """
 Views for the tenant API.
 """
-from rest_framework import generics, authentication, permissions
+from django.contrib.auth import get_user_model
+from rest_framework import generics, permissions
 from rest_framework.authtoken.views import ObtainAuthToken
+from rest_framework.response import Response
 from rest_framework.settings import api_settings
 
-from tenants.serializers import TenantSerializer, AuthTokenSerializer
+from core.authentication import CachedTokenAuthentication
+from core.mixins import ConditionalGetMixin, RateLimitHeadersMixin
+from core.models import AuthToken
+from tenants.serializers import (
+    AuthTokenSerializer,
+    TenantSerializer,
+    TokenSerializer,
+)
+from tenants.tasks import purge_tenant
 
 
 class CreateTenantView(generics.CreateAPIView):
@@ -13,17 +23,78 @@ class CreateTenantView(generics.CreateAPIView):
     serializer_class = TenantSerializer
 
 
-class CreateTokenView(ObtainAuthToken):
+class CreateTokenView(RateLimitHeadersMixin, ObtainAuthToken):
     """Create a new auth token for the tenant."""
     serializer_class = AuthTokenSerializer
     renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES
+    throttle_classes = api_settings.DEFAULT_THROTTLE_CLASSES
+    throttle_scope = 'login'
 
-class ManageTenantView(generics.RetrieveUpdateAPIView):
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        return Response(self.get_token_data(serializer.validated_data['user']))
+
+    def get_token_data(self, user):
+        """Return the tenant's current token, issuing one only if needed.
+
+        The current token was loaded along with the user, so reusing it
+        costs no query.
+        """
+        key = getattr(user, 'current_token_key', None)
+        if key is not None:
+            return {'token': key, 'expires_at': user.current_token_expires_at}
+
+        return TokenSerializer(AuthToken.objects.issue(user)).data
+
+
+class RotateTokenView(RateLimitHeadersMixin, generics.GenericAPIView):
+    """Replace the request's token with a new one and revoke it."""
+    serializer_class = TokenSerializer
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [permissions.IsAuthenticated]
+    throttle_scope = 'tenants'
+
+    def post(self, request):
+        token = AuthToken.objects.rotate(request.auth)
+        return Response(self.get_serializer(token).data)
+
+
+class ManageTenantView(
+    RateLimitHeadersMixin,
+    ConditionalGetMixin,
+    generics.RetrieveUpdateDestroyAPIView,
+):
     """Manage the authenticated tenant."""
     serializer_class = TenantSerializer
-    authentication_classes = [authentication.TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [permissions.IsAuthenticated]
+    throttle_scope = 'tenants'
 
     def get_object(self):
-        """Retrieve and return the authenticated tenant."""
-        return self.request.user
+        """Retrieve and return the authenticated tenant.
+
+        `request.user` may be a cached copy, which is only good enough to
+        read; writes start from the current row.
+        """
+        if self.request.method in permissions.SAFE_METHODS:
+            return self.request.user
+        return get_user_model().objects.get(pk=self.request.user.pk)
+
+    def get_validators(self, request):
+        """Return the tenant's last update time as both validators."""
+        return request.user.updated_at.isoformat(), request.user.updated_at
+
+    def retrieve(self, request, *args, **kwargs):
+        """Retrieve the tenant unless the client's copy is current."""
+        not_modified = self.get_not_modified_response(request)
+        if not_modified is not None:
+            return not_modified
+
+        return super().retrieve(request, *args, **kwargs)
+
+    def perform_destroy(self, instance):
+        """Deactivate the tenant and queue the purge of its data."""
+        instance.deactivate()
+        purge_tenant.enqueue(instance.pk)